@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from core.indicators import compute_indicators
 
 class BaseStrategy(ABC):
     def __init__(self, name, symbol):
@@ -6,6 +7,30 @@ class BaseStrategy(ABC):
         self.symbol = symbol
         # State is now managed externally (Single Source of Truth)
 
+        # Shared indicator graph (optional). Without one, indicators are computed locally.
+        self.indicator_graph = None
+        self.timeframe = None
+
+    def required_indicators(self):
+        """Indicator specs (core.indicators.spec) read in on_candle_closed."""
+        return []
+
+    def bind_indicators(self, graph, timeframe):
+        self.indicator_graph = graph
+        self.timeframe = timeframe
+        graph.subscribe(self.symbol, timeframe, self, self.required_indicators())
+
+    def unbind_indicators(self):
+        if self.indicator_graph is not None:
+            self.indicator_graph.unsubscribe(self.symbol, self.timeframe, self)
+        self.indicator_graph = None
+
+    def indicators(self, df):
+        specs = self.required_indicators()
+        if self.indicator_graph is None:
+            return compute_indicators(df, specs)
+        return self.indicator_graph.compute(self.symbol, self.timeframe, df, specs)
+
     @abstractmethod
     def on_tick(self, ltp, current_qty, entry_price):
         pass
@@ -1,6 +1,7 @@
 import numpy as np
 import pandas as pd
 from Strategies.base import BaseStrategy
+from core.indicators import spec
 
 class RSIChandelierStrategy(BaseStrategy):
     def __init__(self, symbol):
@@ -10,29 +11,26 @@ class RSIChandelierStrategy(BaseStrategy):
         self.rsi_long = 15
         self.atr_per = 22
         self.mult = 3
+        self.oversold_level = 50.0
         self.current_rsi = 0.0
 
+    def required_indicators(self):
+        return [
+            spec("rsi", period=self.rsi_short),
+            spec("rsi", period=self.rsi_long),
+            spec("atr", period=self.atr_per),
+            spec("highest_high", period=self.atr_per),
+        ]
+
     def _calc(self, df):
         df = df.copy()
-        delta = df['Close'].diff()
-        
-        gain = (delta.where(delta > 0, 0)).ewm(com=self.rsi_short-1).mean()
-        loss = (-delta.where(delta < 0, 0)).ewm(com=self.rsi_short-1).mean()
-        rs_s = gain / (loss + 1e-10)
-        
-        gain_l = (delta.where(delta > 0, 0)).ewm(com=self.rsi_long-1).mean()
-        loss_l = (-delta.where(delta < 0, 0)).ewm(com=self.rsi_long-1).mean()
-        rs_l = gain_l / (loss_l + 1e-10)
-        
-        df['RSI'] = ( (100 - (100/(1+rs_s))) + (100 - (100/(1+rs_l))) ) / 2
+        ind = self.indicators(df)
+
+        df['RSI'] = (ind[spec("rsi", period=self.rsi_short)] + ind[spec("rsi", period=self.rsi_long)]) / 2
 
-        high_low = df['High'] - df['Low']
-        high_close = np.abs(df['High'] - df['Close'].shift())
-        low_close = np.abs(df['Low'] - df['Close'].shift())
-        tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        atr = tr.ewm(com=self.atr_per-1).mean()
+        atr = ind[spec("atr", period=self.atr_per)]
         df['ATR'] = atr
-        df['Chand'] = df['High'].rolling(self.atr_per).max() - (atr * self.mult)
+        df['Chand'] = ind[spec("highest_high", period=self.atr_per)] - (atr * self.mult)
         return df
 
     def on_tick(self, ltp, current_qty, entry_price):
@@ -54,7 +52,7 @@ class RSIChandelierStrategy(BaseStrategy):
             if not np.isnan(curr_chand) and curr_chand > self.trailing_stop:
                 self.trailing_stop = curr_chand
         # Only buy if ltp > curr_chand + 1 * atr
-        elif curr_rsi < 50 and curr_rsi > df['RSI'].iloc[-2] and ltp > (curr_chand + curr_atr):
+        elif curr_rsi < self.oversold_level and curr_rsi > df['RSI'].iloc[-2] and ltp > (curr_chand + curr_atr):
             self.trailing_stop = curr_chand
             return "BUY", "Signal"
         
@@ -1,6 +1,7 @@
 import numpy as np
 import pandas as pd
 from Strategies.base import BaseStrategy
+from core.indicators import spec
 
 class RSIChandelierStrategy(BaseStrategy):
     def __init__(self, symbol):
@@ -16,34 +17,33 @@ class RSIChandelierStrategy(BaseStrategy):
         self.mult_standard = 3.0   # Normal breathing room
         self.mult_tight = 1.0      # Tight trail when RSI is hot
         self.be_trigger = 1.5      # Move to BE if profit > 1.5 ATR
+        self.oversold_level = 50.0 # Entries only while dual RSI is below this
         
         self.current_rsi = 0.0
 
+    def required_indicators(self):
+        return [
+            spec("rsi", period=self.rsi_short),
+            spec("rsi", period=self.rsi_long),
+            spec("atr", period=self.atr_per),
+            spec("highest_high", period=self.atr_per),
+        ]
+
     def _calc(self, df):
         df = df.copy()
-        delta = df['Close'].diff()
+        # Shared with any other strategy on this symbol via the indicator graph
+        ind = self.indicators(df)
         
         # RSI Calculation
-        gain = (delta.where(delta > 0, 0)).ewm(com=self.rsi_short-1).mean()
-        loss = (-delta.where(delta < 0, 0)).ewm(com=self.rsi_short-1).mean()
-        rs_s = gain / (loss + 1e-10)
-        
-        gain_l = (delta.where(delta > 0, 0)).ewm(com=self.rsi_long-1).mean()
-        loss_l = (-delta.where(delta < 0, 0)).ewm(com=self.rsi_long-1).mean()
-        rs_l = gain_l / (loss_l + 1e-10)
-        
-        df['RSI'] = ( (100 - (100/(1+rs_s))) + (100 - (100/(1+rs_l))) ) / 2
+        df['RSI'] = (ind[spec("rsi", period=self.rsi_short)] + ind[spec("rsi", period=self.rsi_long)]) / 2
 
         # ATR Calculation
-        high_low = df['High'] - df['Low']
-        high_close = np.abs(df['High'] - df['Close'].shift())
-        low_close = np.abs(df['Low'] - df['Close'].shift())
-        tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        df['ATR'] = tr.ewm(com=self.atr_per-1).mean()
+        df['ATR'] = ind[spec("atr", period=self.atr_per)]
+        df['HighestHigh'] = ind[spec("highest_high", period=self.atr_per)]
         
         # We calculate the basic Chandelier here for visualization, 
         # but the specific stop value is handled dynamically in on_candle_closed
-        df['Chand'] = df['High'].rolling(self.atr_per).max() - (df['ATR'] * self.mult_standard)
+        df['Chand'] = df['HighestHigh'] - (df['ATR'] * self.mult_standard)
         
         return df
 
@@ -64,7 +64,7 @@ class RSIChandelierStrategy(BaseStrategy):
         curr_atr = df['ATR'].iloc[-1]
         
         # Calculate Highest High for Chandelier logic
-        highest_high = df['High'].rolling(self.atr_per).max().iloc[-1]
+        highest_high = df['HighestHigh'].iloc[-1]
 
         # --- EXIT & TRAILING LOGIC ---
         if current_qty > 0:
@@ -101,8 +101,8 @@ class RSIChandelierStrategy(BaseStrategy):
             
             prev_rsi = df['RSI'].iloc[-2]
             
-            # Buy if RSI < 50, RSI is increasing, and Price > Chandelier + 1 ATR
-            if curr_rsi < 50 and curr_rsi > prev_rsi and ltp > (entry_chand + curr_atr):
+            # Buy if RSI < oversold_level, RSI is increasing, and Price > Chandelier + 1 ATR
+            if curr_rsi < self.oversold_level and curr_rsi > prev_rsi and ltp > (entry_chand + curr_atr):
                 self.trailing_stop = entry_chand
                 return "BUY", "Signal"
         
@@ -18,9 +18,20 @@ from numpy import nan
 from pyotp import TOTP
 
 from re import compile
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from threading import Event
+from threading import Lock
+from threading import Thread
+from threading import local
+from contextlib import contextmanager
+from time import monotonic
+from time import perf_counter
 
 
 from requests.sessions import session as req_session
+from requests.adapters import HTTPAdapter
 from requests.models import Response
 from requests.exceptions import HTTPError
 from requests.exceptions import Timeout
@@ -36,6 +47,7 @@ from Upstox.base.errors import ResponseError
 from Upstox.base.errors import RequestTimeout
 from Upstox.base.errors import NetworkError
 from Upstox.base.errors import BrokerError
+from Upstox.base.errors import RateLimitError
 
 options.mode.chained_assignment = None
 
@@ -55,6 +67,48 @@ class Broker:
     expiry_dates = {}
     cookies = {}
     _session = None
+    _session_lock = Lock()
+
+    # Connection pooling: every thread shares one session, whose adapters keep a
+    # thread-safe pool of keep-alive connections per host, so concurrent calls reuse
+    # established TCP+TLS connections. pool_sizes overrides pool_maxsize per host.
+    pool_maxsize = 10
+    pool_sizes = {}
+
+    # Hosts warm_connections() connects to before the first order ("scheme://host")
+    warm_hosts = []
+    warm_stats = {}
+
+    # Retries per endpoint class (endpoint_class()). retries: extra attempts after
+    # a timeout, dropped connection, 429 or 5xx; backoff: first wait in seconds,
+    # doubled per attempt; hedge_after: a GET unanswered after this many seconds
+    # is sent again on another connection, first answer wins (None = off).
+    retry_policies = {
+        "read": {"retries": 2, "backoff": 0.1, "hedge_after": 0.5},
+        "order": {"retries": 1, "backoff": 0.1, "hedge_after": None},
+    }
+    _hedge_pool = None
+
+    # Circuit breaker: breaker_threshold failed requests in a row (timeouts,
+    # connection errors, 5xx) and requests fail fast with NetworkError for
+    # breaker_cooldown seconds; then one trial request closes or reopens it.
+    breaker_threshold = 5
+    breaker_cooldown = 10.0
+    _breaker = {"failures": 0, "opened_at": None}
+    _breaker_lock = Lock()
+
+    # Quotas per endpoint family (endpoint_family()): { family: limiter } with
+    # acquire(n) / try_acquire(n) / release(n), e.g. core.rate_limit.RateLimiter.
+    # Every HTTP call takes a token, retries and hedges included; families without
+    # a limiter are not metered. rate_mode "block": wait for the token,
+    # "reject": raise RateLimitError.
+    rate_limiters = {}
+    rate_mode = "block"
+    _prepaid = local()
+
+    # requests, retries, hedged, hedge_wins, deduped, failures, fast_failed, breaker_opened,
+    # rate_waits, rate_wait_s, rate_rejected
+    fetch_stats = {}
 
     nfo_url = "https://www.nseindia.com/api/option-chain-indices"
     bfo_url = "https://api.bseindia.com/BseIndiaAPI/api/ddlExpiry_IV/w"
@@ -63,14 +117,373 @@ class Broker:
         return f"Upstox.{self.id}()"
 
     @staticmethod
-    def _create_session():
+    def _create_session(
+        pool_maxsize: int = 10,
+        pool_sizes: dict[str, int] | None = None,
+    ):
         """
-        Creates A request Session.
+        Creates A request Session with keep-alive connection pools.
+
+        Parameters:
+            pool_maxsize (int, optional): Connections kept open per host. Defaults to 10.
+            pool_sizes (dict[str, int] | None, optional): { "scheme://host": connections } for hosts needing their own size. Defaults to None.
 
         Returns:
             requests.sessions.session: returns a reqeusts.sessions.session Object
         """
-        return req_session()
+        session = req_session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        for prefix, size in (pool_sizes or {}).items():
+            session.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=size))
+        return session
+
+    @classmethod
+    def session(cls):
+        """
+        The session shared by every thread, created on first use.
+
+        Returns:
+            requests.sessions.session: The Broker's session.
+        """
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    cls._session = cls._create_session(cls.pool_maxsize, cls.pool_sizes)
+        return cls._session
+
+    @classmethod
+    def reset_session(cls) -> None:
+        """
+        Drops cookies from the shared session without closing its pooled connections
+        (threads may be using them).
+        """
+        cls.session().cookies.clear()
+
+    @classmethod
+    def warm_connections(
+        cls,
+        per_host: int = 1,
+        hosts: list[str] | None = None,
+        timeout: int = 5,
+    ) -> dict[str, float | None]:
+        """
+        Opens `per_host` pooled connections to each host (DNS, TCP and TLS setup)
+        so the first real request of the day goes out on a ready connection.
+
+        Parameters:
+            per_host (int, optional): Connections to open per host, e.g. one per order worker. Defaults to 1.
+            hosts (list[str] | None, optional): "scheme://host" URLs. Defaults to None (cls.warm_hosts).
+            timeout (int, optional): Seconds to wait per connection. Defaults to 5.
+
+        Returns:
+            dict[str, float | None]: { host: slowest connect in ms, None if unreachable }.
+        """
+        hosts = hosts if hosts is not None else cls.warm_hosts
+        session = cls.session()
+
+        def connect(host):
+            started = perf_counter()
+            try:
+                # Any status will do: the response is read, so the connection goes back to the pool
+                session.request(method="HEAD", url=f"{host}/", timeout=timeout)
+                return host, (perf_counter() - started) * 1000
+            except RequestException:
+                return host, None
+
+        jobs = [host for host in hosts for _ in range(max(1, per_host))]
+        if not jobs:
+            return {}
+        stats = {host: 0.0 for host in hosts}
+        # All of a host's connects run at once, so each gets a connection of its own
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            for host, ms in pool.map(connect, jobs):
+                if ms is None or stats[host] is None:
+                    stats[host] = None
+                else:
+                    stats[host] = round(max(stats[host], ms), 1)
+        cls.warm_stats = stats
+        return stats
+
+    @classmethod
+    def keep_warm(
+        cls,
+        every: float = 30.0,
+        per_host: int = 1,
+    ) -> Event:
+        """
+        Re-warms the pools every `every` seconds, so idle connections closed by the
+        server are replaced before they are needed.
+
+        Parameters:
+            every (float, optional): Seconds between warmups. Defaults to 30.0.
+            per_host (int, optional): Connections per host. Defaults to 1.
+
+        Returns:
+            Event: set() it to stop.
+        """
+        stop = Event()
+
+        def run():
+            while not stop.wait(every):
+                cls.warm_connections(per_host)
+
+        Thread(target=run, daemon=True).start()
+        return stop
+
+    @classmethod
+    def endpoint_class(
+        cls,
+        method: str,
+        url: str,
+    ) -> str:
+        """
+        Endpoint class of a request, naming its entry in retry_policies.
+
+        Parameters:
+            method (str): Request Method.
+            url (str): URL of the Request.
+
+        Returns:
+            str: "read" for GETs, "order" for everything else.
+        """
+        return "read" if method.upper() == "GET" else "order"
+
+    @classmethod
+    def endpoint_family(
+        cls,
+        method: str,
+        url: str,
+    ) -> str | None:
+        """
+        Rate-limit family of a request, naming its entry in rate_limiters.
+
+        Parameters:
+            method (str): Request Method.
+            url (str): URL of the Request.
+
+        Returns:
+            str | None: Family name, or None for unmetered requests.
+        """
+        return None
+
+    @classmethod
+    @contextmanager
+    def prepaid(
+        cls,
+        family: str,
+        n: int,
+    ):
+        """
+        Calls this thread makes in the block spend `n` tokens the caller already took
+        from rate_limiters[family] (e.g. the order dispatcher); unspent ones are released.
+
+        Parameters:
+            family (str): Rate-limit family the tokens came from.
+            n (int): Tokens taken.
+        """
+        credit = {family: n}
+        cls._prepaid.credit = credit
+        try:
+            yield
+        finally:
+            cls._prepaid.credit = None
+            limiter = cls.rate_limiters.get(family)
+            if limiter is not None and credit[family] > 0:
+                limiter.release(credit[family])
+
+    @classmethod
+    def _take_token(
+        cls,
+        method: str,
+        url: str,
+        block: bool = True,
+    ) -> bool:
+        """
+        Takes the request's token from its family's limiter (or the thread's prepaid credit).
+        block=False: never waits or raises, returns whether a token was taken.
+        """
+        family = cls.endpoint_family(method, url)
+        limiter = cls.rate_limiters.get(family)
+        if limiter is None:
+            return True
+        credit = getattr(cls._prepaid, "credit", None)
+        if credit and credit.get(family, 0) > 0:
+            credit[family] -= 1
+            return True
+        if not block or cls.rate_mode == "reject":
+            if limiter.try_acquire():
+                return True
+            if not block:
+                return False
+            raise RateLimitError(" ".join([cls.id, method, url, f"{family} quota exhausted"]))
+        started = perf_counter()
+        limiter.acquire()
+        waited = perf_counter() - started
+        if waited > 0.001:
+            cls._count("rate_waits")
+            with cls._breaker_lock:
+                cls.fetch_stats["rate_wait_s"] = round(cls.fetch_stats.get("rate_wait_s", 0.0) + waited, 3)
+        return True
+
+    @classmethod
+    def _find_duplicate(
+        cls,
+        method: str,
+        url: str,
+        headers: dict[Any, Any] | None,
+        body: dict[Any, Any] | str | None,
+        params: dict[Any, Any] | None,
+    ) -> Response | None:
+        """
+        Before an order request is sent again: the response it should have got if
+        the first attempt reached the broker after all, or None if it is safe to resend.
+
+        Parameters:
+            method (str): Request Method.
+            url (str): URL of the Request.
+            headers (dict[Any, Any] | None): Request Headers.
+            body (dict[Any, Any] | str | None): Request Body (the json or data argument).
+            params (dict[Any, Any] | None): Query String.
+
+        Returns:
+            Response | None: Response standing in for the lost one, or None.
+        """
+        return None
+
+    @staticmethod
+    def _stand_in_response(
+        url: str,
+        data: dict[Any, Any],
+    ) -> Response:
+        """
+        A 200 response carrying {"status": "success", "data": data}, returned in place
+        of a lost response to a request the broker did execute.
+        """
+        response = Response()
+        response.status_code = 200
+        response.url = url
+        response.encoding = "utf-8"
+        response._content = dumps({"status": "success", "data": data}).encode()
+        return response
+
+    @classmethod
+    def _count(
+        cls,
+        key: str,
+        n: int = 1,
+    ) -> None:
+        with cls._breaker_lock:
+            cls.fetch_stats[key] = cls.fetch_stats.get(key, 0) + n
+
+    @classmethod
+    def _breaker_allow(cls) -> bool:
+        """Closed: True. Open: False until the cooldown ends, then True once (the trial request)."""
+        with cls._breaker_lock:
+            opened_at = cls._breaker["opened_at"]
+            if opened_at is None:
+                return True
+            if monotonic() - opened_at < cls.breaker_cooldown:
+                return False
+            cls._breaker["opened_at"] = monotonic()
+            return True
+
+    @classmethod
+    def _breaker_record(
+        cls,
+        ok: bool,
+    ) -> None:
+        with cls._breaker_lock:
+            if ok:
+                cls._breaker["failures"] = 0
+                cls._breaker["opened_at"] = None
+                return
+            cls._breaker["failures"] += 1
+            if cls._breaker["failures"] >= cls.breaker_threshold and cls._breaker["opened_at"] is None:
+                cls._breaker["opened_at"] = monotonic()
+                cls.fetch_stats["breaker_opened"] = cls.fetch_stats.get("breaker_opened", 0) + 1
+                print(f"🔌 {cls.id}: {cls._breaker['failures']} failed requests in a row; "
+                      f"failing fast for {cls.breaker_cooldown:g}s")
+
+    @classmethod
+    def breaker_state(cls) -> str:
+        """
+        Returns:
+            str: "closed", "open" or "half-open" (cooldown over, next request is the trial).
+        """
+        with cls._breaker_lock:
+            opened_at = cls._breaker["opened_at"]
+        if opened_at is None:
+            return "closed"
+        return "open" if monotonic() - opened_at < cls.breaker_cooldown else "half-open"
+
+    @staticmethod
+    def _retryable(exc: Exception) -> bool:
+        """Timeouts, dropped connections, throttling and broker-side (5xx) errors."""
+        if isinstance(exc, HTTPError):
+            return exc.response is not None and exc.response.status_code in (429, 500, 502, 503, 504)
+        return isinstance(exc, (Timeout, requestsConnectionError, ConnectionResetError))
+
+    @staticmethod
+    def _broker_down(exc: Exception) -> bool:
+        """Failures that say the broker is unreachable (not a rejected or throttled request)."""
+        if isinstance(exc, HTTPError):
+            return exc.response is not None and exc.response.status_code >= 500
+        return isinstance(exc, (Timeout, requestsConnectionError, ConnectionResetError, SSLError))
+
+    @classmethod
+    def _request(
+        cls,
+        **request: Any,
+    ) -> Response:
+        response = cls.session().request(**request)
+        response.raise_for_status()
+        return response
+
+    @classmethod
+    def _send(
+        cls,
+        **request: Any,
+    ) -> Response:
+        cls._take_token(request["method"], request["url"])
+        return cls._request(**request)
+
+    @classmethod
+    def _send_hedged(
+        cls,
+        hedge_after: float,
+        **request: Any,
+    ) -> Response:
+        """
+        Sends an idempotent request; if it has not answered within `hedge_after`
+        seconds, sends it again on another connection and takes the first success.
+        The duplicate is only sent if its rate-limit family has a token to spare.
+        """
+        if cls._hedge_pool is None:
+            with cls._session_lock:
+                if cls._hedge_pool is None:
+                    cls._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix=f"{cls.id}-hedge")
+        # Metered here, so time spent waiting for quota never looks like a slow answer
+        cls._take_token(request["method"], request["url"])
+        first = cls._hedge_pool.submit(cls._request, **request)
+        done, _ = wait([first], timeout=hedge_after)
+        if done or not cls._take_token(request["method"], request["url"], block=False):
+            return first.result()
+
+        cls._count("hedged")
+        second = cls._hedge_pool.submit(cls._request, **request)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        cls._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
 
     @classmethod
     def fetch(
@@ -88,6 +501,11 @@ class Broker:
         A Wrapper for Python Requests module,
         sending requests over a session which persists the cookies over the entire session.
 
+        Failed requests are retried under the endpoint class's retry_policies entry
+        (order requests only after _find_duplicate finds no trace of the first attempt),
+        slow reads are hedged, and while the circuit breaker is open requests fail fast.
+        Each HTTP call is metered by its endpoint family's rate limiter.
+
         Parameters:
             method (str): Request Method: 'GET', 'POST', 'PUT', 'DELETE', 'GET', etc.
             url (str): URL of the Request
@@ -100,28 +518,75 @@ class Broker:
 
         Raises:
             RequestTimeout: If the Request Times Out
-            NetworkError: If Network Unavailable.
+            NetworkError: If Network Unavailable, or the circuit breaker is open.
+            RateLimitError: If rate_mode is "reject" and the endpoint family's quota is used up.
             BrokerError: If Error on Behalf of the Broker or Some Error on behalf of the User sending the Request.
 
         Returns:
             Response: Response Object
         """
+        if not cls._breaker_allow():
+            cls._count("fast_failed")
+            raise NetworkError(" ".join([cls.id, method, url, "circuit breaker open"]))
 
-        try:
-            response = cls._session.request(
-                method=method,
-                url=url,
-                headers=headers,
-                data=data,
-                json=json,
-                params=params,
-                auth=auth,
-                timeout=timeout,
-            )
+        policy = cls.retry_policies.get(cls.endpoint_class(method, url), {})
+        hedge_after = policy.get("hedge_after") if method.upper() == "GET" else None
+        request = dict(method=method, url=url, headers=headers, data=data, json=json,
+                       params=params, auth=auth, timeout=timeout)
+        cls._count("requests")
 
-            response.raise_for_status()
+        attempt = 0
+        while True:
+            try:
+                if hedge_after is not None:
+                    response = cls._send_hedged(hedge_after, **request)
+                else:
+                    response = cls._send(**request)
+                cls._breaker_record(True)
+                return response
+
+            except RateLimitError:
+                cls._count("rate_rejected")
+                raise
+
+            except Exception as exc:
+                if attempt < policy.get("retries", 0) and cls._retryable(exc):
+                    if method.upper() != "GET":
+                        try:
+                            body = json if json is not None else data
+                            duplicate = cls._find_duplicate(method, url, headers, body, params)
+                        except (RequestTimeout, NetworkError, BrokerError, ResponseError, RateLimitError):
+                            # Unknown whether the first attempt went through (lookup failed or
+                            # had no quota in "reject" mode): never send it twice
+                            cls._count("failures")
+                            cls._raise_error(exc, method, url)
+                        if duplicate is not None:
+                            cls._count("deduped")
+                            cls._breaker_record(True)
+                            return duplicate
+                    cls._count("retries")
+                    sleep(policy.get("backoff", 0.0) * 2 ** attempt)
+                    attempt += 1
+                    continue
+
+                cls._count("failures")
+                if cls._broker_down(exc):
+                    cls._breaker_record(False)
+                else:
+                    # The broker answered (4xx, bad payload): it is up
+                    cls._breaker_record(True)
+                cls._raise_error(exc, method, url)
 
-            return response
+    @classmethod
+    def _raise_error(
+        cls,
+        exc: Exception,
+        method: str,
+        url: str,
+    ) -> None:
+        """Translates a requests exception into the package's errors."""
+        try:
+            raise exc
 
         except Timeout as exc:
             details = " ".join([cls.id, method, url])
@@ -136,6 +601,7 @@ class Broker:
             raise BrokerError(details) from exc
 
         except HTTPError as exc:
+            response = exc.response
             details = " ".join(
                 [cls.id, method, str(response.status_code), url, response.text]
             )
@@ -5,6 +5,7 @@ __all__ = [
     "RequestTimeout",
     "NetworkError",
     "BrokerError",
+    "RateLimitError",
 ]
 
 
@@ -29,4 +30,8 @@ class NetworkError(Exception):
 
 
 class BrokerError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class RateLimitError(Exception):
+    pass
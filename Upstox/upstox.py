@@ -4,6 +4,7 @@ from typing import TYPE_CHECKING
 from typing import Any
 
 import time
+from threading import Lock
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -58,7 +59,27 @@ class upstox(Broker):
         "pin",
     ]
     id = "upstox"
-    _session = Broker._create_session()
+    # Order workers, the stop manager and order tracker all share these pools
+    # (built by Broker.session() on first use, so pool_sizes set at startup apply)
+    pool_maxsize = 16
+    _session = None
+
+    # True: every order call re-fetches the order and returns its current state.
+    # False: order calls return the placement acknowledgement (status PENDING)
+    # without the second request; fills arrive via core.order_tracker.
+    confirm_orders = True
+
+    # Most orders the multi-order endpoint accepts per request
+    multi_order_limit = 25
+
+    # Open orders: order_id -> the fields modify_order has to resend (price, trigger_price,
+    # quantity, order_type, validity). Fed by placements, order fetches and order updates,
+    # so a modify is a single PUT. Orders that complete, cancel or reject drop out.
+    # Written by order workers, the tracker and the stop manager: always under the lock.
+    order_cache = {}
+    _order_cache_lock = Lock()
+    cache_fields = ("price", "trigger_price", "quantity", "order_type", "validity")
+    closed_statuses = ("complete", "cancelled", "rejected", "cancelled after market order")
 
     # Base URLs
 
@@ -75,6 +96,7 @@ class upstox(Broker):
 
     urls = {
         "place_order": f"{base_urls['base']}/order/place",
+        "multi_place_order": f"{base_urls['base']}/order/multi/place",
         "modify_order": f"{base_urls['base']}/order/modify",
         "cancel_order": f"{base_urls['base']}/order/cancel",
         "order_history": f"{base_urls['base']}/order/history",
@@ -86,6 +108,133 @@ class upstox(Broker):
         "profile": f"{base_urls['base']}/user/profile",
     }
 
+    # Order host and market-data host, connected before the first signal (warm_connections)
+    warm_hosts = ["https://api-sandbox.upstox.com", "https://api.upstox.com"]
+
+    @classmethod
+    def use_base_url(
+        cls,
+        api_base: str,
+        assets_base: str | None = None,
+        sandbox: bool = False,
+    ) -> None:
+        """
+        Point the driver at another host serving the Upstox API (e.g. core.mock_upstox).
+
+        Parameters:
+            api_base (str): Scheme and host, e.g. "http://127.0.0.1:8765"; "/v2" is appended.
+            assets_base (str | None, optional): Host serving the instrument master. Defaults to None (unchanged).
+            sandbox (bool, optional): Keep sandbox behaviour (fetch_order reports every order complete). Defaults to False.
+        """
+        global mode
+        old_base = cls.base_urls["base"]
+        new_base = f"{api_base.rstrip('/')}/v2"
+        cls.base_urls["base"] = new_base
+        cls.urls = {name: url.replace(old_base, new_base) for name, url in cls.urls.items()}
+        cls.warm_hosts = [api_base.rstrip("/")]
+        if assets_base:
+            cls.base_urls["market_data"] = (
+                f"{assets_base.rstrip('/')}/market-quote/instruments/exchange/complete.csv.gz"
+            )
+        mode = "sandbox" if sandbox else "live"
+
+    # Broker.retry_policies, plus baskets: a lost multi-order response is never
+    # resent, as its legs cannot be told apart from an earlier attempt's
+    retry_policies = {
+        **Broker.retry_policies,
+        "basket": {"retries": 0, "backoff": 0.0, "hedge_after": None},
+    }
+
+    @classmethod
+    def endpoint_class(
+        cls,
+        method: str,
+        url: str,
+    ) -> str:
+        """
+        Endpoint class of a request, naming its entry in retry_policies.
+
+        Parameters:
+            method (str): Request Method.
+            url (str): URL of the Request.
+
+        Returns:
+            str: "basket" for the multi-order endpoint, otherwise "read" / "order".
+        """
+        if url == cls.urls["multi_place_order"]:
+            return "basket"
+        return super().endpoint_class(method, url)
+
+    @classmethod
+    def endpoint_family(
+        cls,
+        method: str,
+        url: str,
+    ) -> str | None:
+        """
+        Rate-limit family of a request, naming its entry in rate_limiters.
+
+        Parameters:
+            method (str): Request Method.
+            url (str): URL of the Request.
+
+        Returns:
+            str | None: "basket", "orders" (placing, changing and reading orders), "history",
+                "quotes", "portfolio", or None (login, instrument master).
+        """
+        if url == cls.urls["multi_place_order"]:
+            return "basket"
+        if "/order/" in url:
+            return "orders"
+        if "/historical-candle/" in url:
+            return "history"
+        if "/market-quote/" in url and not url.endswith(".csv.gz"):
+            return "quotes"
+        if "/portfolio/" in url or "/user/" in url:
+            return "portfolio"
+        return None
+
+    @classmethod
+    def _find_duplicate(
+        cls,
+        method: str,
+        url: str,
+        headers: dict[Any, Any] | None,
+        body: dict[Any, Any] | str | None,
+        params: dict[Any, Any] | None,
+    ) -> Response | None:
+        """
+        Checks whether a failed order request reached Upstox before it is resent:
+        a placement is found in the orderbook by its tag (unique_id), a
+        cancellation by the order already being cancelled.
+
+        Parameters:
+            method (str): Request Method.
+            url (str): URL of the Request.
+            headers (dict[Any, Any] | None): Request Headers.
+            body (dict[Any, Any] | str | None): Request Body (json or serialized json).
+            params (dict[Any, Any] | None): Query String.
+
+        Returns:
+            Response | None: The order's placement/cancel response, or None if it is safe to resend.
+        """
+        if isinstance(body, (str, bytes)):
+            body = json.loads(body)
+
+        if url == cls.urls["place_order"] and body and body.get("tag"):
+            response = cls.fetch(method="GET", url=cls.urls["orderbook"], headers=headers)
+            for order in cls._json_parser(response).get("data") or []:
+                if order.get("tag") == body["tag"] and order.get("instrument_token") == body.get("instrument_token"):
+                    return cls._stand_in_response(url, {"order_id": order["order_id"]})
+
+        elif url == cls.urls["cancel_order"] and params:
+            response = cls.fetch(method="GET", url=cls.urls["single_order"], params=params, headers=headers)
+            order = cls._json_parser(response).get("data") or {}
+            if order.get("status") in ("cancelled", "cancelled after market order"):
+                return cls._stand_in_response(url, {"order_id": order["order_id"]})
+
+        return None
+
     # Request Parameters Dictionaries
 
     req_exchange = {
@@ -425,7 +574,7 @@ class upstox(Broker):
             }
         }
 
-        cls._session = cls._create_session()
+        cls.reset_session()
 
         return headers
 
@@ -542,6 +691,7 @@ class upstox(Broker):
         cls,
         response: Response,
         headers: dict,
+        request: dict | None = None,
     ) -> dict[Any, Any]:
         """
         Parse Json Response Obtained from Broker After Placing Order to get order_id
@@ -550,6 +700,7 @@ class upstox(Broker):
         Parameters:
             response (Response): Json Repsonse Obtained from broker after Placing an Order.
             headers (dict): headers to send order request with.
+            request (dict | None, optional): Order payload sent, kept in the order cache. Defaults to None.
 
         Returns:
             dict: Unified Upstox Order Response.
@@ -558,10 +709,65 @@ class upstox(Broker):
 
         order_id = info["data"]["order_id"]
         print(f"⏱️ Placed Order ID: {order_id}")
+        if request is not None:
+            cls.cache_order({**request, "order_id": order_id})
+        if not cls.confirm_orders:
+            return cls._order_ack_parser(order_id=order_id, info=info)
+
         order = cls.fetch_order(order_id=order_id, headers=headers)
 
         return order
 
+    @classmethod
+    def cache_order(
+        cls,
+        order: dict,
+    ) -> None:
+        """
+        Keep the Order Cache current from a raw order (placement payload, order detail,
+        orderbook row or portfolio stream order update).
+
+        Parameters:
+            order (dict): Raw Broker Order, must carry order_id.
+        """
+        order_id = order.get("order_id")
+        if not order_id:
+            return
+        with cls._order_cache_lock:
+            if order.get("status") in cls.closed_statuses:
+                cls.order_cache.pop(order_id, None)
+                return
+            cached = cls.order_cache.get(order_id, {})
+            cls.order_cache[order_id] = {
+                **cached,
+                **{key: order[key] for key in cls.cache_fields if order.get(key) is not None},
+            }
+
+    @classmethod
+    def _order_ack_parser(
+        cls,
+        order_id: str,
+        info: dict,
+    ) -> dict[Any, Any]:
+        """
+        Unified Order Response built from the placement acknowledgement alone
+        (no fetch_order round-trip). The order's fill or rejection is delivered later.
+
+        Parameters:
+            order_id (str): id of the placed order.
+            info (dict): Json Response Obtained from Broker after Placing the Order.
+
+        Returns:
+            dict: Upstox Unified Order Response with status PENDING.
+        """
+        return {
+            Order.ID: order_id,
+            Order.STATUS: Status.PENDING,
+            Order.FILLEDQTY: 0,
+            Order.AVGPRICE: None,
+            Order.INFO: info,
+        }
+
     # Order Functions
 
     @classmethod
@@ -641,7 +847,7 @@ class upstox(Broker):
             headers=headers["headers"],
         )
 
-        return cls._create_order_parser(response=response, headers=headers)
+        return cls._create_order_parser(response=response, headers=headers, request=json_data)
 
     @classmethod
     def market_order(
@@ -707,7 +913,7 @@ class upstox(Broker):
             headers=headers["headers"],
         )
 
-        return cls._create_order_parser(response=response, headers=headers)
+        return cls._create_order_parser(response=response, headers=headers, request=json_data)
 
     @classmethod
     def limit_order(
@@ -775,7 +981,7 @@ class upstox(Broker):
             headers=headers["headers"],
         )
 
-        return cls._create_order_parser(response=response, headers=headers)
+        return cls._create_order_parser(response=response, headers=headers, request=json_data)
 
     @classmethod
     def sl_order(
@@ -845,7 +1051,7 @@ class upstox(Broker):
             headers=headers["headers"],
         )
 
-        return cls._create_order_parser(response=response, headers=headers)
+        return cls._create_order_parser(response=response, headers=headers, request=json_data)
 
     @classmethod
     def slm_order(
@@ -913,7 +1119,7 @@ class upstox(Broker):
             headers=headers["headers"],
         )
 
-        return cls._create_order_parser(response=response, headers=headers)
+        return cls._create_order_parser(response=response, headers=headers, request=json_data)
 
     # Equity Order Functions
 
@@ -992,7 +1198,7 @@ class upstox(Broker):
             headers=headers["headers"],
         )
 
-        return cls._create_order_parser(response=response, headers=headers)
+        return cls._create_order_parser(response=response, headers=headers, request=json_data)
 
     @classmethod
     def market_order_eq(
@@ -1065,7 +1271,7 @@ class upstox(Broker):
         )
         # PRINT(f"Response Status Code: {response.status_code}")
         print(f"Response Text: {response.text}")
-        return cls._create_order_parser(response=response, headers=headers)
+        return cls._create_order_parser(response=response, headers=headers, request=json_data)
 
     @classmethod
     def limit_order_eq(
@@ -1131,7 +1337,7 @@ class upstox(Broker):
             headers=headers["headers"],
         )
 
-        return cls._create_order_parser(response=response, headers=headers)
+        return cls._create_order_parser(response=response, headers=headers, request=json_data)
 
     @classmethod
     def sl_order_eq(
@@ -1199,7 +1405,7 @@ class upstox(Broker):
             headers=headers["headers"],
         )
 
-        return cls._create_order_parser(response=response, headers=headers)
+        return cls._create_order_parser(response=response, headers=headers, request=json_data)
 
     @classmethod
     def slm_order_eq(
@@ -1265,7 +1471,151 @@ class upstox(Broker):
             headers=headers["headers"],
         )
 
-        return cls._create_order_parser(response=response, headers=headers)
+        return cls._create_order_parser(response=response, headers=headers, request=json_data)
+
+    @classmethod
+    def basket_order_eq(
+        cls,
+        orders: list[dict],
+        headers: dict,
+    ) -> list[dict[Any, Any]]:
+        """
+        Place Multiple Orders in NSE/BSE Equity Segment through the Multi Order endpoint,
+        multi_order_limit legs per request.
+
+        Parameters:
+            orders (list[dict]): One dict per leg with the keys of the single order functions:
+                exchange, symbol, quantity, side, unique_id and optionally
+                price, trigger_price, order_type (Defaults to OrderType.MARKET),
+                product (Defaults to Product.MIS), validity (Defaults to Validity.DAY),
+                variety (Defaults to Variety.REGULAR).
+            headers (dict): headers to send order request with.
+
+        Returns:
+            list[dict]: Upstox Unified Order Response per leg, in the order of `orders`.
+                Legs the broker refused come back with status REJECTED and the reason.
+        """
+        if not cls.eq_tokens:
+            cls.create_eq_tokens()
+
+        results = [None] * len(orders)
+        legs = []
+
+        for i, order in enumerate(orders):
+            try:
+                exchange = cls._key_mapper(cls.req_exchange, order["exchange"], "exchange")
+                detail = cls._eq_mapper(cls.eq_tokens[exchange], order["symbol"])
+                variety = order.get("variety", Variety.REGULAR)
+                legs.append((i, {
+                    # Legs are matched back to their results by correlation_id
+                    "correlation_id": str(i),
+                    "instrument_token": detail["Token"],
+                    "price": order.get("price", 0),
+                    "trigger_price": order.get("trigger_price", 0),
+                    "quantity": order["quantity"],
+                    "transaction_type": cls._key_mapper(cls.req_side, order["side"], "side"),
+                    "order_type": cls.req_order_type[order.get("order_type", OrderType.MARKET)],
+                    "product": cls._key_mapper(cls.req_product, order.get("product", Product.MIS), "product"),
+                    "validity": cls._key_mapper(cls.req_validity, order.get("validity", Validity.DAY), "validity"),
+                    "is_amo": (
+                        False
+                        if cls._key_mapper(cls.req_variety, variety, "variety") != Variety.AMO
+                        else True
+                    ),
+                    "tag": order["unique_id"],
+                    "disclosed_quantity": 0,
+                    "slice": False,
+                }))
+            except Exception as exc:
+                results[i] = cls._basket_reject_parser(reason=str(exc), info={})
+
+        req_headers = headers["headers"].copy()
+        req_headers["Content-Type"] = "application/json"
+
+        for start in range(0, len(legs), cls.multi_order_limit):
+            chunk = dict(legs[start:start + cls.multi_order_limit])
+            try:
+                response = cls.fetch(
+                    method="POST",
+                    url=cls.urls["multi_place_order"],
+                    data=json.dumps(list(chunk.values())),
+                    headers=req_headers,
+                )
+                info = cls.on_json_response(response)
+            except Exception as exc:
+                for i in chunk:
+                    results[i] = cls._basket_reject_parser(reason=str(exc), info={})
+                continue
+
+            for leg, order_id in cls._basket_json_parser(info).items():
+                i = int(leg)
+                if i not in chunk:
+                    continue
+                if order_id is None:
+                    error = next(e for e in info.get("errors") or [] if e.get("correlation_id") == leg)
+                    results[i] = cls._basket_reject_parser(reason=error.get("message", ""), info=error)
+                else:
+                    results[i] = cls._order_ack_parser(order_id=order_id, info=info)
+                    if cls.confirm_orders:
+                        try:
+                            results[i] = cls.fetch_order(order_id=order_id, headers=headers)
+                        except Exception as exc:
+                            # Placed but not confirmed: the leg stays PENDING rather than failing the basket
+                            print(f"⚠️ Basket leg {order_id} confirm failed: {exc}")
+
+            for i in chunk:
+                if results[i] is None:
+                    results[i] = cls._basket_reject_parser(reason="leg missing from multi order response", info=info)
+
+        print(f"⏱️ Placed Basket: {sum(r[Order.ID] is not None for r in results)}/{len(orders)} legs accepted")
+        return results
+
+    @classmethod
+    def _basket_json_parser(
+        cls,
+        info: dict,
+    ) -> dict[str, str | None]:
+        """
+        Parses the Multi Order Response ("success", "partial_success" or "error").
+
+        Parameters:
+            info (dict): Json Response Obtained from Broker after Placing the Basket.
+
+        Returns:
+            dict: correlation_id -> order_id, None for the legs the broker refused.
+        """
+        legs = {}
+        for placed in info.get("data") or []:
+            legs[placed["correlation_id"]] = placed["order_id"]
+        for error in info.get("errors") or []:
+            if error.get("correlation_id") is not None:
+                legs.setdefault(error["correlation_id"], None)
+        return legs
+
+    @classmethod
+    def _basket_reject_parser(
+        cls,
+        reason: str,
+        info: dict,
+    ) -> dict[Any, Any]:
+        """
+        Unified Order Response for a basket leg that was never placed.
+
+        Parameters:
+            reason (str): Why the leg was refused.
+            info (dict): Broker error for the leg, if any.
+
+        Returns:
+            dict: Upstox Unified Order Response with status REJECTED.
+        """
+        return {
+            Order.ID: None,
+            Order.STATUS: Status.REJECTED,
+            Order.FILLEDQTY: 0,
+            Order.AVGPRICE: None,
+            Order.REJECTREASON: reason,
+            Order.INFO: info,
+        }
 
     # NFO Order Functions
 
@@ -1357,7 +1707,7 @@ class upstox(Broker):
             headers=headers["headers"],
         )
 
-        return cls._create_order_parser(response=response, headers=headers)
+        return cls._create_order_parser(response=response, headers=headers, request=json_data)
 
     @classmethod
     def market_order_fno(
@@ -1434,7 +1784,7 @@ class upstox(Broker):
             headers=headers["headers"],
         )
 
-        return cls._create_order_parser(response=response, headers=headers)
+        return cls._create_order_parser(response=response, headers=headers, request=json_data)
 
     @classmethod
     def limit_order_fno(
@@ -1513,7 +1863,7 @@ class upstox(Broker):
             headers=headers["headers"],
         )
 
-        return cls._create_order_parser(response=response, headers=headers)
+        return cls._create_order_parser(response=response, headers=headers, request=json_data)
 
     @classmethod
     def sl_order_fno(
@@ -1594,7 +1944,7 @@ class upstox(Broker):
             headers=headers["headers"],
         )
 
-        return cls._create_order_parser(response=response, headers=headers)
+        return cls._create_order_parser(response=response, headers=headers, request=json_data)
 
     @classmethod
     def slm_order_fno(
@@ -1673,7 +2023,7 @@ class upstox(Broker):
             headers=headers["headers"],
         )
 
-        return cls._create_order_parser(response=response, headers=headers)
+        return cls._create_order_parser(response=response, headers=headers, request=json_data)
 
     # Order Details, OrderBook & TradeBook
 
@@ -1696,7 +2046,10 @@ class upstox(Broker):
             url=cls.urls["orderbook"],
             headers=headers["headers"],
         )
-        return cls._json_parser(response)
+        info = cls._json_parser(response)
+        for order in info.get("data") or []:
+            cls.cache_order(order)
+        return info
 
     @classmethod
     def fetch_raw_orderhistory(
@@ -1757,7 +2110,9 @@ class upstox(Broker):
             if "Order not found" in str(e):
                 raise InputError({"This order_id does not exist."})
 
-        return cls._json_parser(response)
+        info = cls._json_parser(response)
+        cls.cache_order(info["data"])
+        return info
 
     @classmethod
     def fetch_orderbook(
@@ -1907,12 +2262,16 @@ class upstox(Broker):
 
         Returns:
             dict: Upstox Unified Order Response.
+                Status PENDING without a re-fetch when the order was in the Order Cache.
         """
-        order_info = cls.fetch_raw_order(order_id=order_id, headers=headers)
-        order_info = order_info["data"]
+        with cls._order_cache_lock:
+            order_info = cls.order_cache.get(order_id)
+        cached = order_info is not None and all(key in order_info for key in cls.cache_fields)
+        if not cached:
+            order_info = cls.fetch_raw_order(order_id=order_id, headers=headers)["data"]
 
         json_data = {
-            "order_id": order_info["order_id"],
+            "order_id": order_id,
             "price": price or order_info["price"],
             "trigger_price": trigger or order_info["trigger_price"],
             "quantity": quantity or order_info["quantity"],
@@ -1929,14 +2288,30 @@ class upstox(Broker):
             "disclosed_quantity": 0,
         }
 
-        response = cls.fetch(
-            method="PUT",
-            url=cls.urls["modify_order"],
-            json=json_data,
-            headers=headers["headers"],
-        )
+        try:
+            response = cls.fetch(
+                method="PUT",
+                url=cls.urls["modify_order"],
+                json=json_data,
+                headers=headers["headers"],
+            )
+        except Exception:
+            # Most likely the order is no longer open: next time, ask the broker
+            with cls._order_cache_lock:
+                cls.order_cache.pop(order_id, None)
+            raise
 
-        return cls._create_order_parser(response=response, headers=headers)
+        if not cached:
+            return cls._create_order_parser(response=response, headers=headers, request=json_data)
+
+        info = cls._json_parser(response)
+        cls.cache_order(json_data)
+        return {
+            **cls._order_ack_parser(order_id=order_id, info=info),
+            Order.PRICE: json_data["price"],
+            Order.TRIGGERPRICE: json_data["trigger_price"],
+            Order.QUANTITY: json_data["quantity"],
+        }
 
     @classmethod
     def cancel_order(
@@ -1962,7 +2337,10 @@ class upstox(Broker):
             headers=headers["headers"],
         )
 
-        return cls._create_order_parser(response=response, headers=headers)
+        order = cls._create_order_parser(response=response, headers=headers)
+        with cls._order_cache_lock:
+            cls.order_cache.pop(order_id, None)
+        return order
 
     # Positions, Account Limits & Profile
 
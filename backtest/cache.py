@@ -0,0 +1,183 @@
+"""
+Content-addressed on-disk cache for backtest intermediates and results.
+
+Keys are sha1 digests of everything that determines a value: the raw bytes of
+the input bars, the source code of the strategy / indicator functions that
+produce it, and the parameters. Change any of them and the key changes, so
+there is nothing to invalidate by hand.
+
+Arrays are stored as .npy (read back memory-mapped), anything else is pickled.
+The cache is bounded by size; when full, the least recently used entries go.
+Writes are atomic, so pool workers can share one cache directory.
+"""
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import threading
+import numpy as np
+
+CACHE_DIR = os.getenv("BACKTEST_CACHE_DIR", ".backtest_cache")
+CACHE_MB = float(os.getenv("BACKTEST_CACHE_MB", 2048))
+
+
+# --- KEYS ---
+
+def digest(*parts):
+    """sha1 over a mix of arrays, bytes and JSON-able values."""
+    h = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            h.update(str(part.dtype).encode())
+            h.update(str(part.shape).encode())
+            h.update(np.ascontiguousarray(part).tobytes())
+        elif isinstance(part, bytes):
+            h.update(part)
+        else:
+            h.update(json.dumps(part, sort_keys=True, default=str).encode())
+        h.update(b"|")
+    return h.hexdigest()
+
+
+def frame_key(df):
+    """Identity of a bar DataFrame's contents (index + OHLC values)."""
+    return digest(df.index.values.astype('datetime64[ns]').view(np.int64),
+                  df[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=np.float64))
+
+
+_source_keys = {}
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _repo_modules(obj):
+    """
+    Modules whose source decides obj's behaviour: its own module, the modules of its
+    base classes, and the repo modules those import from (Strategies/base.py,
+    core/indicators.py, ...). Library modules are left out.
+    """
+    def in_repo(module):
+        path = getattr(module, "__file__", None)
+        return path is not None and os.path.abspath(path).startswith(_REPO_ROOT)
+
+    owners = [inspect.getmodule(cls) for cls in getattr(obj, "__mro__", (obj,))]
+    found = {}
+    for module in filter(None, owners):
+        if not in_repo(module):
+            continue
+        found[module.__name__] = module
+        for value in vars(module).values():
+            dep = value if inspect.ismodule(value) else inspect.getmodule(value)
+            if dep is not None and in_repo(dep):
+                found.setdefault(dep.__name__, dep)
+    return [found[name] for name in sorted(found)]
+
+
+def code_key(obj):
+    """Changes whenever the source of a class/function, its modules, or repo code they import changes."""
+    name = f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', repr(obj))}"
+    if name not in _source_keys:
+        sources = []
+        for module in _repo_modules(obj) or [obj]:
+            try:
+                sources.append(inspect.getsource(module))
+            except (OSError, TypeError):
+                sources.append(getattr(module, "__name__", name))
+        _source_keys[name] = digest(name, sources, getattr(obj, "VERSION", None))
+    return _source_keys[name]
+
+
+# --- STORE ---
+
+class ContentCache:
+    """
+    get(key) / put(key, value) / get_or_compute(key, fn) over <root>/<key[:2]>/<key>.(npy|pkl).
+    Recency is the file mtime (bumped on every hit), so LRU order survives restarts
+    and is shared by every process using the directory.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_mb=CACHE_MB):
+        self.root = root
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+        self.total = sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith((".npy", ".pkl")):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, key[:2], f"{key}.{ext}")
+
+    def get(self, key, default=None):
+        for ext in ("npy", "pkl"):
+            path = self._path(key, ext)
+            try:
+                if ext == "npy":
+                    value = np.load(path, mmap_mode='r')
+                else:
+                    with open(path, 'rb') as f:
+                        value = pickle.load(f)
+            except (FileNotFoundError, EOFError, ValueError, pickle.UnpicklingError):
+                continue
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self.hits += 1
+            return value
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        is_array = isinstance(value, np.ndarray)
+        path = self._path(key, "npy" if is_array else "pkl")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_file, 'wb') as f:
+            if is_array:
+                np.save(f, value)
+            else:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        size = os.path.getsize(temp_file)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        os.replace(temp_file, path)
+        with self.lock:
+            self.total += size - replaced
+            if self.total > self.max_bytes:
+                self._evict()
+        return value
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, compute())
+        return value
+
+    def _evict(self):
+        """Drops least recently used entries down to 90% of the budget."""
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        self.total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for path, size, _ in entries:
+            if self.total <= target:
+                break
+            try:
+                os.remove(path)
+                self.total -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "mb": round(self.total / 1024 / 1024, 1)}
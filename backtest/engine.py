@@ -0,0 +1,445 @@
+"""
+Event-driven backtester for the live Strategies/* classes.
+
+Replays 1m bars through any BaseStrategy subclass using the same contract the
+live loop uses: on_tick() for intrabar exits, on_candle_closed() on every
+closed timeframe bar. Trades come out in the production_trades.csv schema.
+
+    python -m backtest.engine --csv bars.csv --symbol NSE_EQ:MARUTI \
+        --strategy Strategies.rsi_chandelier_tight:RSIChandelierStrategy --out bt_trades.csv
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import math
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.indicators import compute_indicator
+from core.history_downloader import DataLake, MANIFEST
+from backtest.cache import ContentCache, digest, frame_key, code_key
+
+OHLC = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}
+TRADE_COLUMNS = ["Timestamp", "Action", "Symbol", "Price", "Quantity", "PnL", "Balance", "Reason"]
+ONE_MINUTE = np.timedelta64(1, 'm')
+
+
+# --- ARRAY-BACKED BARS ---
+
+class ArrayColumn(np.ndarray):
+    """ndarray that also answers .iloc, so strategy code written against pandas runs unchanged."""
+
+    @property
+    def iloc(self):
+        return self
+
+    @property
+    def values(self):
+        return np.asarray(self)
+
+
+def as_column(values):
+    return np.ascontiguousarray(values, dtype=np.float64).view(ArrayColumn)
+
+
+class ArrayFrame:
+    """
+    Stand-in for the resampled DataFrame handed to on_candle_closed.
+
+    len() is the true number of closed bars so warmup checks behave as live,
+    but columns are views over only the last `lookback` bars: strategies read
+    iloc[-1] / iloc[-2], and column math on a short window keeps each call O(1)
+    instead of O(history). Columns assigned by the strategy stay local to the frame.
+    """
+
+    def __init__(self, columns, index, end, lookback):
+        self.base = columns        # { name: full-length ArrayColumn }
+        self.base_index = index
+        self.end = end
+        self.start = max(0, end - lookback)
+        self.local = {}
+
+    def __len__(self):
+        return self.end
+
+    @property
+    def empty(self):
+        return self.end == 0
+
+    @property
+    def index(self):
+        return self.base_index[self.start:self.end]
+
+    def __getitem__(self, name):
+        if name in self.local:
+            return self.local[name]
+        return self.base[name][self.start:self.end]
+
+    def __setitem__(self, name, value):
+        if np.ndim(value) == 0:
+            value = np.full(self.end - self.start, value)
+        self.local[name] = as_column(value)
+
+    def __contains__(self, name):
+        return name in self.local or name in self.base
+
+    def copy(self):
+        frame = ArrayFrame(self.base, self.base_index, self.end, self.end - self.start)
+        frame.local = dict(self.local)
+        return frame
+
+
+class PrecomputedIndicators:
+    """
+    IndicatorGraph stand-in for a backtest.
+
+    Every spec is computed once over the whole run (the indicators are causal,
+    so row i only depends on rows <= i) and served as windowed views matching
+    the ArrayFrame the strategy passes in. Share one instance between
+    strategies replaying the same bars to reuse the arrays; with a ContentCache
+    the arrays also persist across runs and processes.
+    """
+
+    def __init__(self, bars, cache=None, data_key=None):
+        self.bars = bars           # resampled OHLC DataFrame
+        self.cache = cache
+        self.data_key = data_key
+        self.arrays = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _compute(self, indicator_spec):
+        return compute_indicator(self.bars, indicator_spec).to_numpy(dtype=np.float64)
+
+    def get(self, indicator_spec):
+        arr = self.arrays.get(indicator_spec)
+        if arr is None:
+            self.misses += 1
+            if self.cache is None:
+                arr = self._compute(indicator_spec)
+            else:
+                if self.data_key is None:
+                    self.data_key = frame_key(self.bars)
+                key = digest("indicator", self.data_key, indicator_spec, code_key(compute_indicator))
+                arr = self.cache.get_or_compute(key, lambda: self._compute(indicator_spec))
+            arr = as_column(arr)
+            self.arrays[indicator_spec] = arr
+        else:
+            self.hits += 1
+        return arr
+
+    def subscribe(self, symbol, timeframe, subscriber, specs):
+        for s in specs:
+            self.get(s)
+
+    def unsubscribe(self, symbol, timeframe, subscriber):
+        pass
+
+    def compute(self, symbol, timeframe, df, specs):
+        return {s: self.get(s)[df.start:df.end] for s in specs}
+
+
+# --- SIMULATED ACCOUNT ---
+
+class SimTradeManager:
+    """In-memory TradeManager: same position calls as main.TradeManager, no state file."""
+
+    def __init__(self):
+        self.positions = {}
+        self.order_seq = 0
+
+    def generate_unique_id(self, prefix="BT"):
+        self.order_seq += 1
+        return f"{prefix}-{self.order_seq}"
+
+    def register_buy(self, symbol, qty, order_id, entry_price, entry_time=None):
+        self.positions[symbol] = {
+            "qty": qty,
+            "order_id": order_id,
+            "entry_price": entry_price,
+            "entry_time": entry_time
+        }
+
+    def cleanup_position(self, symbol):
+        self.positions.pop(symbol, None)
+
+    def get_holdings_qty(self, symbol):
+        return self.positions.get(symbol, {}).get('qty', 0)
+
+    def get_entry_price(self, symbol):
+        return self.positions.get(symbol, {}).get('entry_price', 0.0)
+
+
+class SimRecorder:
+    """Collects trades in TradeRecorder's schema (running Balance = capital + realised PnL)."""
+
+    def __init__(self, initial_capital):
+        self.balance = initial_capital
+        self.rows = []
+
+    def log_trade(self, ts, action, symbol, price, qty, pnl=0.0, reason=""):
+        self.balance += pnl
+        self.rows.append((pd.Timestamp(ts).strftime("%Y-%m-%d %H:%M:%S"), action, symbol,
+                          round(price, 2), qty, round(pnl, 2), round(self.balance, 2), reason))
+
+    def to_frame(self):
+        return pd.DataFrame(self.rows, columns=TRADE_COLUMNS)
+
+
+# --- INTRABAR PATH ---
+
+def intrabar_path(o, h, l, c):
+    """
+    Price path assumed inside one 1m bar: an up bar dips first (O-L-H-C),
+    a down bar rallies first (O-H-L-C).
+    """
+    if c >= o:
+        return (o, l, h, c)
+    return (o, h, l, c)
+
+
+def tick_exit(strategy, o, h, l, c, qty, entry):
+    """
+    Walks one 1m bar's path through on_tick(). Returns (fill price, reason) of
+    the first SELL, else None. A stop that trips between two path points fills
+    at the strategy's trailing_stop; a gap through it fills at the worse price.
+    """
+    prev = None
+    for price in intrabar_path(o, h, l, c):
+        action, reason = strategy.on_tick(price, qty, entry)
+        if action == "SELL":
+            stop = getattr(strategy, 'trailing_stop', 0.0)
+            if prev is not None and price < stop <= prev:
+                price = stop
+            return price, reason
+        prev = price
+    return None
+
+
+# --- ENGINE ---
+
+def load_strategy(path):
+    """'package.module:ClassName' -> class"""
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def resample_bars(bars_1m, timeframe):
+    return bars_1m.resample(timeframe).agg(OHLC).dropna()
+
+
+class Backtester:
+    """
+    Replays 1m bars through one strategy instance for one symbol.
+
+    - Every 1m bar with an open position walks intrabar_path() through
+      on_tick() (see tick_exit for the fill rule).
+    - Every closed `timeframe` bar calls on_candle_closed() with ltp = bar close;
+      a BUY fills at that close, sized floor(capital / ltp) like main.queue_signal.
+    """
+
+    def __init__(self, strategy_cls, symbol, bars_1m, timeframe='3min', capital=100000.0,
+                 strategy_params=None, slippage=0.0, lookback=64, close_at_end=True,
+                 indicators=None, quiet=True, cache=None):
+        self.strategy_cls = strategy_cls
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.capital = capital
+        self.strategy_params = strategy_params or {}
+        self.slippage = slippage
+        self.lookback = lookback
+        self.close_at_end = close_at_end
+        self.quiet = quiet
+        self.cache = cache
+
+        bars_1m = bars_1m[['Open', 'High', 'Low', 'Close']].sort_index()
+        self.ts = bars_1m.index.values.astype('datetime64[ns]')
+        self.o, self.h, self.l, self.c = (bars_1m[col].to_numpy(dtype=np.float64)
+                                          for col in ['Open', 'High', 'Low', 'Close'])
+
+        if cache is None:
+            self.data_key = None
+            bars_tf = resample_bars(bars_1m, timeframe)
+        else:
+            self.data_key = frame_key(bars_1m)
+            # resample_bars' source (and OHLC, same module) is part of the key: edits never serve stale bars
+            bars_tf = cache.get_or_compute(digest("resample", self.data_key, timeframe, code_key(resample_bars)),
+                                           lambda: resample_bars(bars_1m, timeframe))
+        if indicators is None:
+            tf_key = None if cache is None else digest("bars", self.data_key, timeframe, code_key(resample_bars))
+            indicators = PrecomputedIndicators(bars_tf, cache, tf_key)
+        self.indicators = indicators
+        self.tf_columns = {col: as_column(bars_tf[col].to_numpy()) for col in ['Open', 'High', 'Low', 'Close']}
+        self.tf_index = bars_tf.index.values
+
+        # Timeframe bar each 1m bar belongs to; a bar closes on its last 1m bar
+        self.bucket = np.searchsorted(self.tf_index, self.ts, side='right') - 1
+        self.closes_bar = np.append(self.bucket[1:] != self.bucket[:-1], True)
+
+    def make_strategy(self, strategy_params=None):
+        strategy = self.strategy_cls(self.symbol)
+        params = self.strategy_params if strategy_params is None else strategy_params
+        for key, value in params.items():
+            setattr(strategy, key, value)
+        strategy.bind_indicators(self.indicators, self.timeframe)
+        return strategy
+
+    def window(self, start=None, end=None):
+        """1m bar positions [i0, i1) covering timestamps [start, end)."""
+        i0 = 0 if start is None else int(np.searchsorted(self.ts, np.datetime64(pd.Timestamp(start), 'ns')))
+        i1 = len(self.ts) if end is None else int(np.searchsorted(self.ts, np.datetime64(pd.Timestamp(end), 'ns')))
+        return i0, i1
+
+    def run(self, strategy_params=None, start=None, end=None):
+        """
+        Returns the trades DataFrame (production_trades.csv columns).
+        strategy_params overrides the constructor's for this run only, so one
+        Backtester (bars, resample, indicator arrays) can replay many parameter sets.
+        start/end limit trading to [start, end); indicators still see all history
+        before start, so a window needs no separate warmup.
+        """
+        i0, i1 = self.window(start, end)
+        if self.cache is not None:
+            params = self.strategy_params if strategy_params is None else strategy_params
+            key = digest("run", self.data_key, code_key(self.strategy_cls), code_key(Backtester), params,
+                         self.timeframe, self.capital, self.slippage, self.lookback, self.close_at_end, i0, i1)
+            trades = self.cache.get(key)
+            if trades is not None:
+                return trades.copy()
+
+        output = contextlib.redirect_stdout(io.StringIO()) if self.quiet else contextlib.nullcontext()
+        with output:
+            trades = self._run(strategy_params, i0, i1)
+        if self.cache is not None:
+            self.cache.put(key, trades)
+        return trades
+
+    def _run(self, strategy_params, i0, i1):
+        symbol = self.symbol
+        strategy = self.make_strategy(strategy_params)
+        trade_manager = SimTradeManager()
+        recorder = SimRecorder(self.capital)
+        o, h, l, c, ts = self.o, self.h, self.l, self.c, self.ts
+        bucket, closes_bar = self.bucket, self.closes_bar
+        qty, entry = 0, 0.0
+
+        def sell(t, price, reason):
+            fill = price * (1 - self.slippage)
+            recorder.log_trade(t, "SELL", symbol, fill, qty, (fill - entry) * qty, reason)
+            trade_manager.cleanup_position(symbol)
+
+        for i in range(i0, i1):
+            if qty > 0:
+                exit_ = tick_exit(strategy, o[i], h[i], l[i], c[i], qty, entry)
+                if exit_ is not None:
+                    sell(ts[i], *exit_)
+                    qty, entry = 0, 0.0
+
+            if not closes_bar[i] or bucket[i] < 0:
+                continue
+
+            frame = ArrayFrame(self.tf_columns, self.tf_index, bucket[i] + 1, self.lookback)
+            ltp = c[i]
+            action, reason = strategy.on_candle_closed(frame, ltp, qty, entry)
+            if action == "BUY" and qty == 0:
+                fill = ltp * (1 + self.slippage)
+                buy_qty = math.floor(self.capital / fill)
+                if buy_qty >= 1:
+                    qty, entry = buy_qty, fill
+                    trade_manager.register_buy(symbol, qty, trade_manager.generate_unique_id(), entry, ts[i])
+                    recorder.log_trade(ts[i] + ONE_MINUTE, "BUY", symbol, fill, qty, 0.0, reason)
+            elif action == "SELL" and qty > 0:
+                sell(ts[i] + ONE_MINUTE, ltp, reason)
+                qty, entry = 0, 0.0
+
+        if qty > 0 and self.close_at_end:
+            sell(ts[i1 - 1] + ONE_MINUTE, c[i1 - 1], "End of Data")
+
+        return recorder.to_frame()
+
+
+def summarize(trades, initial_capital):
+    """Headline stats for a trades frame produced by Backtester.run()."""
+    sells = trades[trades["Action"] == "SELL"]
+    pnl = sells["PnL"].to_numpy()
+    balance = np.concatenate([[initial_capital], initial_capital + np.cumsum(pnl)])
+    drawdown = balance - np.maximum.accumulate(balance)
+    wins = pnl[pnl > 0].sum()
+    losses = -pnl[pnl < 0].sum()
+    return {
+        "trades": len(pnl),
+        "net_pnl": round(float(pnl.sum()), 2),
+        "win_rate": round(float((pnl > 0).mean()) * 100, 2) if len(pnl) else 0.0,
+        "profit_factor": round(float(wins / losses), 3) if losses > 0 else float('inf') if wins > 0 else 0.0,
+        "max_drawdown": round(float(drawdown.min()), 2),
+    }
+
+
+def load_universe(data_dir, symbols=None):
+    """
+    { "NSE_EQ:MARUTI": bars } from a data lake (core.history_downloader, has a
+    manifest.json) or from <data_dir>/MARUTI.csv files.
+    """
+    universe = {}
+    if os.path.exists(os.path.join(data_dir, MANIFEST)):
+        lake = DataLake(data_dir)
+        for symbol in symbols or lake.symbols():
+            bars = lake.load_bars(symbol)
+            if bars is None:
+                print(f"⚠️ No history for {symbol} in {data_dir}; skipping.")
+                continue
+            universe[symbol] = bars[['Open', 'High', 'Low', 'Close']]
+        return universe
+
+    if symbols is None:
+        symbols = [f"NSE_EQ:{name[:-4]}" for name in sorted(os.listdir(data_dir)) if name.endswith(".csv")]
+    for symbol in symbols:
+        path = os.path.join(data_dir, f"{symbol.split(':')[-1]}.csv")
+        if not os.path.exists(path):
+            print(f"⚠️ No history for {symbol} ({path}); skipping.")
+            continue
+        universe[symbol] = load_bars(path)[['Open', 'High', 'Low', 'Close']]
+    return universe
+
+
+def load_bars(path):
+    """1m OHLC CSV with a timestamp column (Upstox candle layout) -> DataFrame indexed by time."""
+    df = pd.read_csv(path)
+    ts_col = 'timestamp' if 'timestamp' in df.columns else df.columns[0]
+    df[ts_col] = pd.to_datetime(df[ts_col])
+    return df.set_index(ts_col).sort_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay 1m bars through a live strategy class.")
+    parser.add_argument("--csv", required=True, help="1m OHLC bars")
+    parser.add_argument("--symbol", default="NSE_EQ:SYMBOL")
+    parser.add_argument("--strategy", default="Strategies.rsi_chandelier_tight:RSIChandelierStrategy")
+    parser.add_argument("--timeframe", default="3min")
+    parser.add_argument("--capital", type=float, default=100000)
+    parser.add_argument("--slippage", type=float, default=0.0, help="fraction of price, e.g. 0.0005")
+    parser.add_argument("--out", default="backtest_trades.csv")
+    parser.add_argument("--no-cache", action="store_true", help="skip the content-addressed cache")
+    args = parser.parse_args()
+
+    bars = load_bars(args.csv)
+    start = time.perf_counter()
+    bt = Backtester(load_strategy(args.strategy), args.symbol, bars, args.timeframe,
+                    args.capital, slippage=args.slippage, cache=None if args.no_cache else ContentCache())
+    trades = bt.run()
+    elapsed = time.perf_counter() - start
+
+    trades.to_csv(args.out, index=False)
+    print(f"✅ {len(bars)} bars in {elapsed:.2f}s -> {args.out}")
+    for key, value in summarize(trades, args.capital).items():
+        print(f"   {key:>14}: {value}")
+
+
+if __name__ == "__main__":
+    main()
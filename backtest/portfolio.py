@@ -0,0 +1,218 @@
+"""
+Portfolio backtest: every symbol stepped on one shared 1m time axis with
+main.py's capital rules.
+
+- Capital per symbol is ALLOCATED_CAPITAL / len(universe), and a BUY is sized
+  floor(capital_per_symbol / ltp) exactly like main.queue_signal.
+- Available cash is capital + realized PnL - margin in open positions (the
+  dashboard's account math); a BUY that does not fit in it is skipped.
+- Within a minute, exits are processed before entries so freed cash is reusable.
+
+    python -m backtest.portfolio --data-dir data/ --capital 5000000 --out portfolio_trades.csv
+"""
+import argparse
+import contextlib
+import io
+import math
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.engine import (Backtester, ArrayFrame, SimTradeManager, SimRecorder, tick_exit,
+                             load_strategy, load_universe, summarize, ONE_MINUTE)
+
+
+class PortfolioBacktester:
+    """
+    Aligns all symbols into 2-D [symbol, minute] arrays and steps them together.
+    Per-symbol resampling and indicator arrays come from one Backtester each.
+    """
+
+    def __init__(self, strategy_cls, universe, timeframe='3min', capital=100000.0,
+                 strategy_params=None, slippage=0.0, lookback=64, quiet=True):
+        self.symbols = list(universe)
+        self.capital = capital
+        self.capital_per_symbol = capital / len(self.symbols)
+        self.slippage = slippage
+        self.quiet = quiet
+
+        self.books = [Backtester(strategy_cls, symbol, universe[symbol], timeframe, self.capital_per_symbol,
+                                 strategy_params, slippage, lookback, quiet=quiet)
+                      for symbol in self.symbols]
+
+        # Common time axis = union of every symbol's 1m timestamps
+        self.axis = np.unique(np.concatenate([bt.ts for bt in self.books]))
+        shape = (len(self.symbols), len(self.axis))
+        self.O, self.H, self.L, self.C = (np.full(shape, np.nan) for _ in range(4))
+        self.bucket = np.full(shape, -1, dtype=np.int64)
+        self.closes = np.zeros(shape, dtype=bool)
+        for s, bt in enumerate(self.books):
+            pos = np.searchsorted(self.axis, bt.ts)
+            self.O[s, pos], self.H[s, pos], self.L[s, pos], self.C[s, pos] = bt.o, bt.h, bt.l, bt.c
+            self.bucket[s, pos] = bt.bucket
+            self.closes[s, pos] = bt.closes_bar & (bt.bucket >= 0)
+
+    def run(self):
+        """Returns (trades DataFrame in production_trades.csv schema, equity DataFrame)."""
+        output = contextlib.redirect_stdout(io.StringIO()) if self.quiet else contextlib.nullcontext()
+        with output:
+            return self._run()
+
+    def _run(self):
+        n_sym, n_t = self.C.shape
+        strategies = [bt.make_strategy() for bt in self.books]
+        trade_manager = SimTradeManager()
+        recorder = SimRecorder(self.capital)
+        qty = np.zeros(n_sym, dtype=np.int64)
+        entry = np.zeros(n_sym)
+        realized = 0.0
+        used_margin = 0.0
+        held = set()
+        skipped = 0
+
+        # Position changes, replayed into [symbol, minute] arrays for the equity curve
+        events = []
+
+        # Bar-close events per minute, found in one pass instead of scanning symbols every minute
+        # (nonzero on the transpose comes out sorted by minute)
+        close_t, close_sym = np.nonzero(self.closes.T)
+        bounds = np.searchsorted(close_t, np.arange(n_t + 1))
+
+        O, H, L, C, axis = self.O, self.H, self.L, self.C, self.axis
+        for t in range(n_t):
+            # 1. Exits along each held symbol's intrabar path
+            for s in sorted(held):
+                if np.isnan(C[s, t]):
+                    continue
+                exit_ = tick_exit(strategies[s], O[s, t], H[s, t], L[s, t], C[s, t], qty[s], entry[s])
+                if exit_ is not None:
+                    pnl, margin = self._sell(s, exit_[0], exit_[1], qty, entry, trade_manager, recorder, axis[t])
+                    realized += pnl
+                    used_margin -= margin
+                    held.discard(s)
+                    events.append((s, t, 0, 0.0, pnl))
+
+            # 2. Candle logic for every symbol whose timeframe bar closed this minute
+            buys = []
+            for s in close_sym[bounds[t]:bounds[t + 1]]:
+                bt = self.books[s]
+                frame = ArrayFrame(bt.tf_columns, bt.tf_index, self.bucket[s, t] + 1, bt.lookback)
+                ltp = C[s, t]
+                action, reason = strategies[s].on_candle_closed(frame, ltp, qty[s], entry[s])
+                if action == "SELL" and qty[s] > 0:
+                    pnl, margin = self._sell(s, ltp, reason, qty, entry, trade_manager, recorder,
+                                             axis[t] + ONE_MINUTE)
+                    realized += pnl
+                    used_margin -= margin
+                    held.discard(s)
+                    events.append((s, t, 0, 0.0, pnl))
+                elif action == "BUY" and qty[s] == 0:
+                    buys.append((s, ltp, reason))
+
+            for s, ltp, reason in buys:
+                fill = ltp * (1 + self.slippage)
+                buy_qty = math.floor(self.capital_per_symbol / fill)
+                available_cash = self.capital + realized - used_margin
+                if buy_qty < 1 or buy_qty * fill > available_cash:
+                    skipped += 1
+                    continue
+                qty[s], entry[s] = buy_qty, fill
+                used_margin += buy_qty * fill
+                held.add(s)
+                symbol = self.symbols[s]
+                trade_manager.register_buy(symbol, buy_qty, trade_manager.generate_unique_id(), fill, axis[t])
+                recorder.log_trade(axis[t] + ONE_MINUTE, "BUY", symbol, fill, buy_qty, 0.0, reason)
+                events.append((s, t, buy_qty, fill, 0.0))
+
+        for s in sorted(held):
+            last = np.flatnonzero(~np.isnan(C[s]))[-1]
+            pnl, margin = self._sell(s, C[s, last], "End of Data", qty, entry, trade_manager, recorder,
+                                     axis[-1] + ONE_MINUTE)
+            events.append((s, n_t - 1, 0, 0.0, pnl))
+
+        self.skipped_buys = skipped
+        return recorder.to_frame(), self._equity(events)
+
+    def _sell(self, s, price, reason, qty, entry, trade_manager, recorder, ts):
+        """Books the exit; returns (realized pnl, margin released)."""
+        fill = price * (1 - self.slippage)
+        pnl = (fill - entry[s]) * qty[s]
+        margin = qty[s] * entry[s]
+        recorder.log_trade(ts, "SELL", self.symbols[s], fill, int(qty[s]), pnl, reason)
+        trade_manager.cleanup_position(self.symbols[s])
+        qty[s], entry[s] = 0, 0.0
+        return pnl, margin
+
+    def _equity(self, events):
+        """Minute-by-minute equity, exposure and drawdown from the position events."""
+        n_sym, n_t = self.C.shape
+        qty = np.full((n_sym, n_t), np.nan)
+        entry = np.full((n_sym, n_t), np.nan)
+        qty[:, 0], entry[:, 0] = 0, 0.0
+        realized = np.zeros(n_t)
+        for s, t, q, e, pnl in events:
+            qty[s, t], entry[s, t] = q, e
+            realized[t] += pnl
+
+        qty = pd.DataFrame(qty.T).ffill().to_numpy().T
+        entry = pd.DataFrame(entry.T).ffill().to_numpy().T
+        close = pd.DataFrame(self.C.T).ffill().fillna(0.0).to_numpy().T
+
+        market_value = (qty * close).sum(axis=0)
+        unrealized = (qty * (close - entry)).sum(axis=0)
+        equity = self.capital + np.cumsum(realized) + unrealized
+        peak = np.maximum.accumulate(equity)
+        return pd.DataFrame({
+            "equity": equity,
+            "exposure": market_value / equity,
+            "positions": (qty > 0).sum(axis=0),
+            "drawdown": equity - peak,
+            "drawdown_pct": (equity - peak) / peak * 100,
+        }, index=pd.DatetimeIndex(self.axis))
+
+
+def portfolio_summary(trades, equity, capital):
+    stats = summarize(trades, capital)
+    stats.update({
+        "final_equity": round(float(equity["equity"].iloc[-1]), 2),
+        "max_drawdown_pct": round(float(equity["drawdown_pct"].min()), 2),
+        "avg_exposure_pct": round(float(equity["exposure"].mean()) * 100, 2),
+        "max_positions": int(equity["positions"].max()),
+    })
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared-capital backtest across a universe of symbols.")
+    parser.add_argument("--data-dir", required=True, help="data lake root or directory of <SYMBOL>.csv 1m bars")
+    parser.add_argument("--symbols", nargs="*")
+    parser.add_argument("--strategy", default="Strategies.rsi_chandelier_tight:RSIChandelierStrategy")
+    parser.add_argument("--timeframe", default="3min")
+    parser.add_argument("--capital", type=float, default=100000, help="ALLOCATED_CAPITAL")
+    parser.add_argument("--slippage", type=float, default=0.0)
+    parser.add_argument("--out", default="portfolio_trades.csv")
+    parser.add_argument("--equity-out", default="portfolio_equity.csv")
+    args = parser.parse_args()
+
+    universe = load_universe(args.data_dir, args.symbols)
+    start = time.perf_counter()
+    pbt = PortfolioBacktester(load_strategy(args.strategy), universe, args.timeframe, args.capital,
+                              slippage=args.slippage)
+    trades, equity = pbt.run()
+    elapsed = time.perf_counter() - start
+
+    trades.to_csv(args.out, index=False)
+    equity.to_csv(args.equity_out)
+    print(f"✅ {len(universe)} symbols x {len(pbt.axis)} minutes in {elapsed:.1f}s -> {args.out}")
+    for key, value in portfolio_summary(trades, equity, args.capital).items():
+        print(f"   {key:>16}: {value}")
+    if pbt.skipped_buys:
+        print(f"   {'skipped buys':>16}: {pbt.skipped_buys} (insufficient cash)")
+
+
+if __name__ == "__main__":
+    main()
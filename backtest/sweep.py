@@ -0,0 +1,177 @@
+"""
+Parallel parameter sweep for the live strategies on top of backtest.engine.
+
+The 1m bars are copied once into shared memory (core.parallel_eval.SharedBars);
+each pool worker attaches, builds one Backtester and reuses its indicator arrays
+for every combination it runs, so combos sharing RSI/ATR periods share the math.
+
+    python -m backtest.sweep --csv bars.csv --workers 8
+    python -m backtest.sweep --csv bars.csv --random 200 \
+        --space '{"mult_standard": [2.0, 4.0], "be_trigger": [1.0, 3.0], "rsi_short": [7, 9, 11]}'
+"""
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.parallel_eval import SharedBars
+from backtest.engine import Backtester, summarize, load_strategy, load_bars
+from backtest.cache import ContentCache
+
+# Attribute names on the strategy classes. RsiMeanReversion's tunables map onto
+# them: short/long_rsi_period -> rsi_short/rsi_long, atr_period -> atr_per,
+# atr_multiplier -> mult (V3) / mult_standard (V4), oversold_level -> oversold_level.
+DEFAULT_SPACES = {
+    "Strategies.rsi_chandelier:RSIChandelierStrategy": {
+        "rsi_short": [7, 9, 11],
+        "rsi_long": [14, 15, 21],
+        "atr_per": [14, 22],
+        "mult": [2.0, 2.5, 3.0, 3.5],
+        "oversold_level": [40.0, 45.0, 50.0],
+    },
+    "Strategies.rsi_chandelier_tight:RSIChandelierStrategy": {
+        "rsi_short": [9],
+        "rsi_long": [15],
+        "atr_per": [14, 22],
+        "mult_standard": [2.0, 2.5, 3.0, 3.5],
+        "mult_tight": [0.5, 1.0, 1.5],
+        "be_trigger": [1.0, 1.5, 2.0],
+        "oversold_level": [45.0, 50.0],
+    },
+}
+
+
+# --- SEARCH SPACES ---
+
+def grid(space):
+    """Every combination of a { param: [values] } space."""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def random_search(space, n, seed=0):
+    """
+    n random combinations. A list is sampled as choices; a 2-element
+    [lo, hi] of floats is sampled uniformly (ints: integers in [lo, hi]).
+    """
+    rng = np.random.default_rng(seed)
+    combos = []
+    for _ in range(n):
+        combo = {}
+        for key, values in space.items():
+            if len(values) == 2 and all(isinstance(v, float) for v in values):
+                combo[key] = round(float(rng.uniform(values[0], values[1])), 4)
+            elif len(values) == 2 and all(isinstance(v, int) for v in values) and values[1] - values[0] > 1:
+                combo[key] = int(rng.integers(values[0], values[1] + 1))
+            else:
+                combo[key] = values[int(rng.integers(len(values)))]
+        combos.append(combo)
+    return combos
+
+
+def indicator_key(strategy_cls, params):
+    """Specs a combo needs; combos with equal keys hit the same cached arrays."""
+    strategy = strategy_cls("SWEEP")
+    for key, value in params.items():
+        setattr(strategy, key, value)
+    return tuple(sorted(strategy.required_indicators()))
+
+
+# --- WORKER ---
+
+_WORKER = {}
+
+
+def _init_worker(names, n_bars, strategy_path, symbol, timeframe, capital, slippage, use_cache):
+    bars = SharedBars(1, n_bars, names=names)
+    df = bars.read(0)
+    _WORKER["bars"] = bars
+    _WORKER["capital"] = capital
+    # With the cache, combos already run in an earlier session are not replayed at all
+    _WORKER["backtester"] = Backtester(load_strategy(strategy_path), symbol, df, timeframe, capital,
+                                       slippage=slippage, cache=ContentCache() if use_cache else None)
+
+
+def _run_combo(params):
+    bt = _WORKER["backtester"]
+    try:
+        stats = summarize(bt.run(params), _WORKER["capital"])
+    except Exception as e:
+        stats = {"error": str(e)}
+    return {**params, **stats}
+
+
+# --- DRIVER ---
+
+def run_sweep(bars_1m, strategy_path, combos, workers=None, symbol="NSE_EQ:SWEEP", timeframe='3min',
+              capital=100000.0, slippage=0.0, rank_by="net_pnl", use_cache=True):
+    """Runs every combo across a process pool and returns results ranked best-first."""
+    strategy_cls = load_strategy(strategy_path)
+    workers = workers or os.cpu_count()
+
+    # Neighbouring combos share indicator specs, so contiguous chunks reuse a worker's arrays
+    combos = sorted(combos, key=lambda p: indicator_key(strategy_cls, p))
+    chunksize = max(1, len(combos) // (workers * 4))
+
+    bars_1m = bars_1m[['Open', 'High', 'Low', 'Close']].sort_index()
+    shared = SharedBars(1, len(bars_1m))
+    shared.write(0, bars_1m)
+    try:
+        try:
+            ctx = mp.get_context("fork")
+        except ValueError:
+            ctx = mp.get_context()
+        initargs = (shared.names, len(bars_1m), strategy_path, symbol, timeframe, capital, slippage, use_cache)
+        with ctx.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+            results = list(pool.imap_unordered(_run_combo, combos, chunksize=chunksize))
+    finally:
+        shared.close()
+
+    table = pd.DataFrame(results)
+    if rank_by in table.columns:
+        # Higher is better for every summarize() metric (max_drawdown is negative)
+        table = table.sort_values(rank_by, ascending=False).reset_index(drop=True)
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parameter sweep for a live strategy class.")
+    parser.add_argument("--csv", required=True, help="1m OHLC bars")
+    parser.add_argument("--strategy", default="Strategies.rsi_chandelier_tight:RSIChandelierStrategy")
+    parser.add_argument("--space", help="JSON { param: [values] }; defaults to DEFAULT_SPACES")
+    parser.add_argument("--random", type=int, default=0, help="sample N combos instead of the full grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--timeframe", default="3min")
+    parser.add_argument("--capital", type=float, default=100000)
+    parser.add_argument("--slippage", type=float, default=0.0)
+    parser.add_argument("--rank-by", default="net_pnl")
+    parser.add_argument("--out", default="sweep_results.csv")
+    parser.add_argument("--no-cache", action="store_true", help="skip the content-addressed cache")
+    args = parser.parse_args()
+
+    space = json.loads(args.space) if args.space else DEFAULT_SPACES[args.strategy]
+    combos = random_search(space, args.random, args.seed) if args.random else grid(space)
+    bars = load_bars(args.csv)
+
+    print(f"🔍 Sweeping {len(combos)} combos over {len(bars)} bars...")
+    start = time.perf_counter()
+    table = run_sweep(bars, args.strategy, combos, args.workers, timeframe=args.timeframe,
+                      capital=args.capital, slippage=args.slippage, rank_by=args.rank_by,
+                      use_cache=not args.no_cache)
+    elapsed = time.perf_counter() - start
+
+    table.to_csv(args.out, index=False)
+    print(f"✅ {len(combos)} combos in {elapsed:.1f}s ({len(combos) / elapsed:.2f}/s) -> {args.out}")
+    print(table.head(10).to_string())
+
+
+if __name__ == "__main__":
+    main()
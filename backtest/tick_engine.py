@@ -0,0 +1,200 @@
+"""
+Tick-accurate backtests from recorded feed ticks.
+
+The bar engine fills stops along an assumed O-L-H-C path; here every recorded
+tick goes through on_tick() while a position is open (as the live StopEngine /
+TICK_STOPS path does), so a stop fills at the first traded price at or through
+it. 1m bars are aggregated from the same ticks, resampled to the strategy
+timeframe, and on_candle_closed() runs on each closed bar as in the bar engine.
+
+Divergence from live: the live loop calls on_candle_closed() about every 0.5s
+with the still-forming bar as the last row, so entries/exits there can fire
+intra-bar. Here it runs once per closed bar (priced at the bar's last tick),
+so only the stop path (on_tick) is tick-accurate; bar signals are not.
+
+Tick file format (one file per symbol, memory-mappable, 12 bytes/tick):
+
+    <dir>/<SYMBOL>.ticks   packed records: ts int64 (ns, IST wall time), price int32 (paise)
+
+    python -m backtest.tick_engine --ticks ticks/ --symbol NSE_EQ:MARUTI --history data_lake
+    python -m backtest.tick_engine --store tick_store --from 2025-01-02 --to 2025-01-03 --symbol NSE_EQ:MARUTI
+"""
+import argparse
+import contextlib
+import io
+import math
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.tick_store import TickStore
+from backtest.engine import (Backtester, ArrayFrame, SimTradeManager, SimRecorder,
+                             load_strategy, load_universe, summarize)
+
+TICK_DTYPE = np.dtype([('ts', '<i8'), ('price', '<i4')])
+MINUTE_NS = 60 * 10**9
+
+
+# --- TICK FILES ---
+
+def tick_path(directory, symbol):
+    return os.path.join(directory, f"{symbol.split(':')[-1]}.ticks")
+
+
+def write_ticks(path, ts, ltp, append=False):
+    """ts: datetime64[ns] or int64 ns; ltp: rupees."""
+    records = np.empty(len(ts), dtype=TICK_DTYPE)
+    records['ts'] = np.asarray(ts).astype('datetime64[ns]').view(np.int64)
+    records['price'] = np.rint(np.asarray(ltp, dtype=np.float64) * 100).astype(np.int32)
+    with open(path, 'ab' if append else 'wb') as f:
+        records.tofile(f)
+
+
+def read_ticks(path):
+    """(ts int64 ns, ltp float64) from a .ticks file; the records stay memory-mapped."""
+    records = np.memmap(path, dtype=TICK_DTYPE, mode='r')
+    return records['ts'], records['price'] / 100.0
+
+
+def ticks_to_bars(ts, ltp):
+    """1m OHLC bars from ticks (same buckets the broker's 1m candles use)."""
+    minute = ts // MINUTE_NS
+    starts = np.flatnonzero(np.diff(minute, prepend=minute[0] - 1))
+    index = pd.DatetimeIndex((minute[starts] * MINUTE_NS).astype('datetime64[ns]'))
+    return pd.DataFrame({
+        'Open': ltp[starts],
+        'High': np.maximum.reduceat(ltp, starts),
+        'Low': np.minimum.reduceat(ltp, starts),
+        'Close': ltp[np.append(starts[1:], len(ltp)) - 1],
+    }, index=index), starts
+
+
+# --- ENGINE ---
+
+class TickBacktester:
+    """
+    Replays one symbol's ticks through a strategy.
+
+    history: optional 1m bars before the first tick (live warms up on ~5 days of
+    candles), so indicators are already formed when the ticks start.
+    """
+
+    def __init__(self, strategy_cls, symbol, ts, ltp, history=None, timeframe='3min', capital=100000.0,
+                 strategy_params=None, slippage=0.0, lookback=64, close_at_end=True, quiet=True):
+        order = np.argsort(ts, kind='stable')
+        self.ts = np.asarray(ts)[order]
+        self.ltp = np.asarray(ltp, dtype=np.float64)[order]
+        self.symbol = symbol
+        self.capital = capital
+        self.slippage = slippage
+        self.close_at_end = close_at_end
+        self.quiet = quiet
+
+        tick_bars, self.tick_starts = ticks_to_bars(self.ts, self.ltp)
+        bars = tick_bars
+        if history is not None and not history.empty:
+            history = history[['Open', 'High', 'Low', 'Close']]
+            bars = pd.concat([history[history.index < tick_bars.index[0]], tick_bars])
+        self.first_tick_bar = len(bars) - len(tick_bars)
+
+        # The bar engine provides resampling, bucket mapping and the indicator arrays
+        self.bars = Backtester(strategy_cls, symbol, bars, timeframe, capital, strategy_params,
+                               slippage, lookback, quiet=quiet)
+
+    def run(self, strategy_params=None):
+        output = contextlib.redirect_stdout(io.StringIO()) if self.quiet else contextlib.nullcontext()
+        with output:
+            return self._run(strategy_params)
+
+    def _run(self, strategy_params):
+        # on_candle_closed() sees closed bars only, unlike live (see module docstring)
+        symbol = self.symbol
+        bt = self.bars
+        strategy = bt.make_strategy(strategy_params)
+        trade_manager = SimTradeManager()
+        recorder = SimRecorder(self.capital)
+        ts, ltp = self.ts, self.ltp
+        ends = np.append(self.tick_starts[1:], len(ltp))
+        qty, entry = 0, 0.0
+        on_tick = strategy.on_tick
+
+        for b, (t0, t1) in enumerate(zip(self.tick_starts, ends)):
+            i = self.first_tick_bar + b
+            if qty > 0:
+                # Every tick, in order: exactly what the live tick-stop path sees
+                for k in range(t0, t1):
+                    action, reason = on_tick(ltp[k], qty, entry)
+                    if action == "SELL":
+                        fill = ltp[k] * (1 - self.slippage)
+                        recorder.log_trade(ts[k], "SELL", symbol, fill, qty, (fill - entry) * qty, reason)
+                        trade_manager.cleanup_position(symbol)
+                        qty, entry = 0, 0.0
+                        break
+
+            if not bt.closes_bar[i] or bt.bucket[i] < 0:
+                continue
+            frame = ArrayFrame(bt.tf_columns, bt.tf_index, bt.bucket[i] + 1, bt.lookback)
+            price = ltp[t1 - 1]
+            action, reason = strategy.on_candle_closed(frame, price, qty, entry)
+            if action == "BUY" and qty == 0:
+                fill = price * (1 + self.slippage)
+                buy_qty = math.floor(self.capital / fill)
+                if buy_qty >= 1:
+                    qty, entry = buy_qty, fill
+                    trade_manager.register_buy(symbol, qty, trade_manager.generate_unique_id(), entry, ts[t1 - 1])
+                    recorder.log_trade(ts[t1 - 1], "BUY", symbol, fill, qty, 0.0, reason)
+            elif action == "SELL" and qty > 0:
+                fill = price * (1 - self.slippage)
+                recorder.log_trade(ts[t1 - 1], "SELL", symbol, fill, qty, (fill - entry) * qty, reason)
+                trade_manager.cleanup_position(symbol)
+                qty, entry = 0, 0.0
+
+        if qty > 0 and self.close_at_end:
+            fill = ltp[-1] * (1 - self.slippage)
+            recorder.log_trade(ts[-1], "SELL", symbol, fill, qty, (fill - entry) * qty, "End of Data")
+
+        return recorder.to_frame()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded ticks through a live strategy class.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--ticks", help="directory of <SYMBOL>.ticks files")
+    source.add_argument("--store", help="core.tick_store root")
+    parser.add_argument("--from", dest="start", help="with --store: first tick time")
+    parser.add_argument("--to", dest="end", help="with --store: end time (exclusive)")
+    parser.add_argument("--symbol", required=True)
+    parser.add_argument("--history", help="data lake root / CSV dir with 1m bars for indicator warmup")
+    parser.add_argument("--strategy", default="Strategies.rsi_chandelier_tight:RSIChandelierStrategy")
+    parser.add_argument("--timeframe", default="3min")
+    parser.add_argument("--capital", type=float, default=100000)
+    parser.add_argument("--slippage", type=float, default=0.0)
+    parser.add_argument("--out", default="tick_backtest_trades.csv")
+    args = parser.parse_args()
+
+    if args.store:
+        ts, ltp = TickStore(args.store).query(args.symbol, args.start, args.end)
+    else:
+        ts, ltp = read_ticks(tick_path(args.ticks, args.symbol))
+    history = None
+    if args.history:
+        history = load_universe(args.history, [args.symbol]).get(args.symbol)
+
+    start = time.perf_counter()
+    tbt = TickBacktester(load_strategy(args.strategy), args.symbol, ts, ltp, history, args.timeframe,
+                         args.capital, slippage=args.slippage)
+    trades = tbt.run()
+    elapsed = time.perf_counter() - start
+
+    trades.to_csv(args.out, index=False)
+    print(f"✅ {len(ts):,} ticks in {elapsed:.2f}s ({len(ts) / elapsed * 60:,.0f} ticks/min) -> {args.out}")
+    for key, value in summarize(trades, args.capital).items():
+        print(f"   {key:>14}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Walk-forward optimization across the trading universe.
+
+For every symbol, history is split into rolling (or anchored) train/test
+windows of whole trading days. Each fold picks the best parameter combo on its
+train window and replays it out-of-sample on the test window. Folds of all
+symbols run concurrently in a process pool.
+
+Fold results are cached on disk under a key built from the fold boundaries,
+the search setup, the strategy's and engine's source and a hash of every bar
+up to the fold's end, so extending history by a day only runs the folds that
+did not exist before (--no-cache recomputes them all).
+
+    python -m backtest.walkforward --data-dir data/ --train-days 20 --test-days 5
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.engine import Backtester, summarize, load_strategy, load_universe
+from backtest.sweep import DEFAULT_SPACES, grid, random_search
+from backtest.cache import ContentCache, code_key
+
+CACHE_DIR = "walkforward_cache"
+ONE_DAY = pd.Timedelta(days=1)
+
+
+# --- DATA ---
+
+def day_hashes(bars):
+    """
+    { day: hash of every bar up to the end of that day }, chained day by day
+    so each prefix hash costs one pass over the data.
+    """
+    hashes = {}
+    digest = hashlib.sha1()
+    days = bars.index.normalize()
+    ohlc = bars.to_numpy(dtype=np.float64)
+    ts = bars.index.values.astype('datetime64[ns]').view(np.int64)
+    bounds = np.flatnonzero(np.append(days[1:] != days[:-1], True)) + 1
+    start = 0
+    for end in bounds:
+        digest.update(ts[start:end].tobytes())
+        digest.update(ohlc[start:end].tobytes())
+        hashes[days[end - 1]] = digest.copy().hexdigest()
+        start = end
+    return hashes
+
+
+# --- FOLDS ---
+
+def make_folds(days, train_days, test_days, step_days=None, anchored=False):
+    """[(train_start, test_start, test_end)] over trading days; test_end is exclusive."""
+    step = step_days or test_days
+    folds = []
+    start = 0
+    while start + train_days + test_days <= len(days):
+        train_start = days[0] if anchored else days[start]
+        test_start = days[start + train_days]
+        test_end = days[start + train_days + test_days - 1] + ONE_DAY
+        folds.append((train_start, test_start, test_end))
+        start += step
+    return folds
+
+
+def fold_key(setup, symbol, fold, data_hash):
+    payload = json.dumps({"setup": setup, "symbol": symbol,
+                          "fold": [str(t) for t in fold], "data": data_hash}, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+# --- WORKER ---
+
+_WORKER = {}
+
+
+def _init_worker(universe, strategy_path, timeframe, capital, slippage, use_cache):
+    _WORKER.update(universe=universe, strategy_cls=load_strategy(strategy_path), timeframe=timeframe,
+                   capital=capital, slippage=slippage, backtesters={},
+                   cache=ContentCache() if use_cache else None)
+
+
+def _backtester(symbol):
+    # One Backtester per symbol: its indicator arrays cover the full history and
+    # are shared by every fold and combo this worker runs for the symbol (and,
+    # through the content cache, by later runs over the same history).
+    bt = _WORKER["backtesters"].get(symbol)
+    if bt is None:
+        bt = Backtester(_WORKER["strategy_cls"], symbol, _WORKER["universe"][symbol],
+                        _WORKER["timeframe"], _WORKER["capital"], slippage=_WORKER["slippage"],
+                        cache=_WORKER["cache"])
+        _WORKER["backtesters"][symbol] = bt
+    return bt
+
+
+def _run_fold(task):
+    key, symbol, (train_start, test_start, test_end), combos, rank_by = task
+    bt = _backtester(symbol)
+    capital = _WORKER["capital"]
+
+    best, best_stats = None, None
+    for params in combos:
+        stats = summarize(bt.run(params, start=train_start, end=test_start), capital)
+        if best_stats is None or stats[rank_by] > best_stats[rank_by]:
+            best, best_stats = params, stats
+
+    test_stats = summarize(bt.run(best, start=test_start, end=test_end), capital)
+    row = {"symbol": symbol, "train_start": str(train_start.date()), "test_start": str(test_start.date()),
+           "test_end": str((test_end - ONE_DAY).date()), "params": json.dumps(best),
+           f"train_{rank_by}": best_stats[rank_by]}
+    row.update({f"test_{k}": v for k, v in test_stats.items()})
+    return key, row
+
+
+# --- DRIVER ---
+
+def run_walkforward(universe, strategy_path, combos, train_days=20, test_days=5, step_days=None,
+                    anchored=False, workers=None, timeframe='3min', capital=100000.0, slippage=0.0,
+                    rank_by="net_pnl", cache_dir=CACHE_DIR, use_cache=True):
+    """
+    Returns one row per (symbol, fold) with the chosen params and out-of-sample stats.
+    use_cache=False recomputes every fold (and bypasses the content cache); results are still saved.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    # Code versions too: editing the strategy or the engine invalidates every cached fold
+    setup = {"strategy": strategy_path, "combos": combos, "rank_by": rank_by, "timeframe": timeframe,
+             "capital": capital, "slippage": slippage, "anchored": anchored,
+             "strategy_code": code_key(load_strategy(strategy_path)), "engine_code": code_key(Backtester)}
+
+    rows, tasks = [], []
+    for symbol, bars in universe.items():
+        hashes = day_hashes(bars)
+        days = list(hashes)
+        for fold in make_folds(days, train_days, test_days, step_days, anchored):
+            key = fold_key(setup, symbol, fold, hashes[fold[2] - ONE_DAY])
+            path = os.path.join(cache_dir, f"{key}.json")
+            if use_cache and os.path.exists(path):
+                with open(path) as f:
+                    rows.append(json.load(f))
+            else:
+                tasks.append((key, symbol, fold, combos, rank_by))
+
+    print(f"🧭 Walk-forward: {len(rows) + len(tasks)} folds, {len(rows)} cached, {len(tasks)} to run.")
+    if tasks:
+        workers = workers or os.cpu_count()
+        try:
+            ctx = mp.get_context("fork")
+        except ValueError:
+            ctx = mp.get_context()
+        chunksize = max(1, len(tasks) // (workers * 4))
+        initargs = (universe, strategy_path, timeframe, capital, slippage, use_cache)
+        with ctx.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+            # Tasks are grouped by symbol, so a chunk reuses one worker's Backtester
+            for key, row in pool.imap_unordered(_run_fold, tasks, chunksize=chunksize):
+                # Written as each fold lands, so an interrupted run resumes where it stopped
+                with open(os.path.join(cache_dir, f"{key}.json"), "w") as f:
+                    json.dump(row, f)
+                rows.append(row)
+
+    table = pd.DataFrame(rows)
+    if not table.empty:
+        table = table.sort_values(["symbol", "test_start"]).reset_index(drop=True)
+    return table
+
+
+def summarize_oos(table):
+    """Per-symbol out-of-sample totals across folds."""
+    return table.groupby("symbol").agg(
+        folds=("test_start", "count"),
+        trades=("test_trades", "sum"),
+        net_pnl=("test_net_pnl", "sum"),
+        worst_fold_dd=("test_max_drawdown", "min"),
+    ).sort_values("net_pnl", ascending=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward optimization over a universe of symbols.")
+    parser.add_argument("--data-dir", required=True, help="data lake root or directory of <SYMBOL>.csv 1m bars")
+    parser.add_argument("--symbols", nargs="*", help="e.g. NSE_EQ:MARUTI (default: every file)")
+    parser.add_argument("--strategy", default="Strategies.rsi_chandelier_tight:RSIChandelierStrategy")
+    parser.add_argument("--space", help="JSON { param: [values] }; defaults to sweep.DEFAULT_SPACES")
+    parser.add_argument("--random", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--train-days", type=int, default=20)
+    parser.add_argument("--test-days", type=int, default=5)
+    parser.add_argument("--step-days", type=int, default=None)
+    parser.add_argument("--anchored", action="store_true", help="expanding train window")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--timeframe", default="3min")
+    parser.add_argument("--capital", type=float, default=100000)
+    parser.add_argument("--slippage", type=float, default=0.0)
+    parser.add_argument("--rank-by", default="net_pnl")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true", help="recompute every fold, skipping both caches")
+    parser.add_argument("--out", default="walkforward_results.csv")
+    args = parser.parse_args()
+
+    space = json.loads(args.space) if args.space else DEFAULT_SPACES[args.strategy]
+    combos = random_search(space, args.random, args.seed) if args.random else grid(space)
+    universe = load_universe(args.data_dir, args.symbols)
+
+    start = time.perf_counter()
+    table = run_walkforward(universe, args.strategy, combos, args.train_days, args.test_days,
+                            args.step_days, args.anchored, args.workers, args.timeframe,
+                            args.capital, args.slippage, args.rank_by, args.cache_dir,
+                            use_cache=not args.no_cache)
+    elapsed = time.perf_counter() - start
+
+    table.to_csv(args.out, index=False)
+    print(f"✅ {len(table)} folds in {elapsed:.1f}s -> {args.out}")
+    if not table.empty:
+        print(summarize_oos(table).to_string())
+
+
+if __name__ == "__main__":
+    main()
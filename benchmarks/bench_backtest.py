@@ -0,0 +1,85 @@
+"""
+Backtest engine throughput on synthetic 1m bars.
+
+    python -m benchmarks.bench_backtest --days 250               # one symbol
+    python -m benchmarks.bench_backtest --days 63 --symbols 50   # shared-capital portfolio
+    python -m benchmarks.bench_backtest --days 20 --tick-rate 200 # ticks per minute, tick engine
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.engine import Backtester, summarize, load_strategy
+from backtest.portfolio import PortfolioBacktester, portfolio_summary
+from backtest.tick_engine import TickBacktester
+
+BARS_PER_DAY = 375  # 09:15 - 15:30
+
+
+def make_bars(days, seed=7):
+    rng = np.random.default_rng(seed)
+    index = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(day + pd.Timedelta("9h15min"), periods=BARS_PER_DAY, freq="1min").values
+        for day in pd.bdate_range("2024-01-01", periods=days)
+    ]))
+    n = len(index)
+    close = 1000 + np.cumsum(rng.normal(0, 0.5, n))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.4, n))
+    return pd.DataFrame({'Open': open_, 'High': np.maximum(open_, close) + spread,
+                         'Low': np.minimum(open_, close) - spread, 'Close': close}, index=index)
+
+
+def make_ticks(days, per_minute, seed=7):
+    """Random-walk ticks on the 0.05 grid, per_minute ticks in every market minute."""
+    rng = np.random.default_rng(seed)
+    minutes = make_bars(days, seed).index.values.astype('datetime64[ns]').view(np.int64)
+    offsets = np.sort(rng.integers(0, 60 * 10**9, (len(minutes), per_minute)), axis=1)
+    ts = (minutes[:, None] + offsets).ravel()
+    ltp = np.round((1000 + np.cumsum(rng.normal(0, 0.05, len(ts)))) / 0.05) * 0.05
+    return ts, ltp
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=250)
+    parser.add_argument("--symbols", type=int, default=1, help=">1 runs the portfolio backtester")
+    parser.add_argument("--tick-rate", type=int, default=0, help="ticks per minute; runs the tick engine")
+    parser.add_argument("--strategy", default="Strategies.rsi_chandelier_tight:RSIChandelierStrategy")
+    args = parser.parse_args()
+
+    if args.tick_rate:
+        ts, ltp = make_ticks(args.days, args.tick_rate)
+        start = time.perf_counter()
+        trades = TickBacktester(load_strategy(args.strategy), "NSE_EQ:SYNTH", ts, ltp).run()
+        elapsed = time.perf_counter() - start
+        print(f"{len(ts):,} ticks | {elapsed:.2f}s | {len(ts) / elapsed * 60:,.0f} ticks/min")
+        print(summarize(trades, 100000))
+        return
+
+    if args.symbols > 1:
+        universe = {f"NSE_EQ:SYM{i:03d}": make_bars(args.days, seed=i) for i in range(args.symbols)}
+        capital = 100000 * args.symbols
+        start = time.perf_counter()
+        trades, equity = PortfolioBacktester(load_strategy(args.strategy), universe, capital=capital).run()
+        elapsed = time.perf_counter() - start
+        n_bars = sum(len(bars) for bars in universe.values())
+        print(f"{args.symbols} symbols | {n_bars} bars | {elapsed:.2f}s | {n_bars / elapsed:,.0f} bars/s")
+        print(portfolio_summary(trades, equity, capital))
+        return
+
+    bars = make_bars(args.days)
+    start = time.perf_counter()
+    trades = Backtester(load_strategy(args.strategy), "NSE_EQ:SYNTH", bars).run()
+    elapsed = time.perf_counter() - start
+    print(f"{len(bars)} bars | {elapsed:.2f}s | {len(bars) / elapsed:,.0f} bars/s")
+    print(summarize(trades, 100000))
+
+
+if __name__ == "__main__":
+    main()
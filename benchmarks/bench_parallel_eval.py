@@ -0,0 +1,93 @@
+"""
+Strategy evaluation throughput: main-loop (sequential) vs ParallelEvaluator.
+
+Every cycle advances each symbol by one fresh 1m bar, so both paths do the full
+resample + indicator + signal work a live bar close costs.
+
+    python -m benchmarks.bench_parallel_eval --sizes 50 200 500 --workers 0 2 4
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.indicators import IndicatorGraph
+from core.parallel_eval import ParallelEvaluator
+from Strategies.rsi_chandelier_tight import RSIChandelierStrategy
+
+TIMEFRAME = '3min'
+OHLC = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}
+
+
+def make_universe(n_symbols, n_bars, seed=7):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2025-01-01 09:15", periods=n_bars, freq="1min")
+    universe = {}
+    for i in range(n_symbols):
+        close = 100 + np.cumsum(rng.normal(0, 0.2, n_bars))
+        spread = np.abs(rng.normal(0, 0.1, n_bars))
+        universe[f"NSE_EQ:SYM{i:04d}"] = pd.DataFrame(
+            {'Open': close, 'High': close + spread, 'Low': close - spread, 'Close': close}, index=index)
+    return universe
+
+
+def run_sequential(universe, window, cycles):
+    graph = IndicatorGraph()
+    strategies = {s: RSIChandelierStrategy(s) for s in universe}
+    for strategy in strategies.values():
+        strategy.bind_indicators(graph, TIMEFRAME)
+
+    start = time.perf_counter()
+    for c in range(cycles):
+        for symbol, full in universe.items():
+            df = full.iloc[c:c + window].resample(TIMEFRAME).agg(OHLC).dropna()
+            ltp = df['Close'].iloc[-1]
+            strategy = strategies[symbol]
+            strategy.on_tick(ltp, 0, 0.0)
+            strategy.on_candle_closed(df, ltp, 0, 0.0)
+    return time.perf_counter() - start
+
+
+def run_parallel(universe, window, cycles, workers):
+    evaluator = ParallelEvaluator(list(universe), RSIChandelierStrategy, TIMEFRAME, workers)
+    try:
+        start = time.perf_counter()
+        for c in range(cycles):
+            requests = []
+            for symbol, full in universe.items():
+                bars = full.iloc[c:c + window]
+                evaluator.publish(symbol, bars)
+                requests.append((symbol, bars['Close'].iloc[-1], 0, 0.0))
+            evaluator.evaluate(requests)
+        return time.perf_counter() - start
+    finally:
+        evaluator.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--bars", type=int, default=1500, help="1m bars per symbol in the window")
+    parser.add_argument("--cycles", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'SYMBOLS':>8} | {'WORKERS':>7} | {'SECONDS':>8} | {'SYMBOL-EVALS/S':>14}")
+    print("-" * 48)
+    for size in args.sizes:
+        universe = make_universe(size, args.bars + args.cycles)
+        for workers in args.workers:
+            if workers == 0:
+                elapsed = run_sequential(universe, args.bars, args.cycles)
+            else:
+                elapsed = run_parallel(universe, args.bars, args.cycles, workers)
+            rate = size * args.cycles / elapsed
+            print(f"{size:>8} | {workers or 'main':>7} | {elapsed:>8.2f} | {rate:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from core.clock import SYSTEM_CLOCK
+
+class AsyncRuntime:
+    """
+    Event-driven replacement for main.py's polling loops.
+
+    Coroutines, all woken by events instead of fixed sleeps:
+      - evaluation: woken by feed ticks (bridged from the websocket thread),
+        runs only the symbols that actually ticked, in an eval thread so the
+        loop keeps serving the feed, bar clock and reconcile meanwhile
+      - bar clock:  sleeps until the next 1m boundary, fills gaps for stale
+                    symbols in an I/O executor and re-evaluates them on the fresh bar
+      - dashboard:  exports only after state changed (throttled)
+      - reconcile:  periodic resting-stop reconciliation (exchange stop mode)
+
+    Orders go through the ExecutionEngine's dispatcher (worker threads, per-symbol
+    ordering, rate-limited); finished orders wake the dashboard. The per-symbol
+    logic is supplied by main.py (evaluate_symbol/evaluate_pool), so both
+    runtimes trade identically.
+    """
+
+    BAR_SETTLE = 2.0      # seconds after the minute before the broker has the new candle
+    STALE_RETRY = 10.0    # re-check still-stale symbols this often within a minute
+
+    def __init__(self, data_feed, execution_engine, symbols, timeframe, evaluate_symbol,
+                 evaluate_pool=None, export_dashboard=None, reconcile=None, reconcile_every=5.0,
+                 dashboard_every=0.5, io_workers=5, clock=None):
+        self.data_feed = data_feed
+        # Bar boundaries and reconcile periods are in clock time (a scaled replay
+        # clock shortens them); broker pacing stays in real time
+        self.clock = clock or SYSTEM_CLOCK
+        self.execution_engine = execution_engine
+        self.symbols = list(symbols)
+        self.timeframe = timeframe
+        self.evaluate_symbol = evaluate_symbol
+        self.evaluate_pool = evaluate_pool
+        self.export_dashboard = export_dashboard
+        self.reconcile = reconcile
+        self.reconcile_every = reconcile_every
+        self.dashboard_every = dashboard_every
+
+        self.io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="io")
+        # Strategy evaluation (pandas resample + indicators) stays off the loop, on one
+        # thread so strategy state is still only touched by one evaluator at a time
+        self.eval_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="eval")
+
+        self.loop = None
+        self.dirty = set()
+        self.pending_since = None
+        self.retry_stale = False
+
+        # Observability
+        self.wakeups = 0
+        self.evaluations = 0
+        self.latencies = deque(maxlen=10000)  # tick receipt -> evaluation done (seconds)
+
+    # --- THREAD BRIDGES ---
+
+    def _on_ticks(self, ticks):
+        """Feed-thread listener: hand the ticked symbols to the loop."""
+        try:
+            self.loop.call_soon_threadsafe(self._mark_dirty, list(ticks), time.perf_counter())
+        except RuntimeError:
+            pass  # Loop already closed (shutdown)
+
+    def _on_order_done(self, task):
+        """Dispatcher-worker callback: order state changed, refresh the dashboard."""
+        try:
+            self.loop.call_soon_threadsafe(self.state_event.set)
+        except RuntimeError:
+            pass
+
+    def _mark_dirty(self, symbols, received_at):
+        self.dirty.update(symbols)
+        if self.pending_since is None:
+            self.pending_since = received_at
+        self.tick_event.set()
+
+    def _evaluate_batch(self, symbols, eval_requests):
+        """Eval-thread: runs the per-symbol logic; pooled requests collect in eval_requests."""
+        for symbol in symbols:
+            self.evaluate_symbol(symbol, eval_requests)
+            self.evaluations += 1
+
+    # --- COROUTINES ---
+
+    async def _evaluate_loop(self):
+        while True:
+            await self.tick_event.wait()
+            self.tick_event.clear()
+            self.wakeups += 1
+
+            if not self.data_feed.is_healthy:
+                continue
+
+            symbols, self.dirty = self.dirty, set()
+            since, self.pending_since = self.pending_since, None
+
+            eval_requests = []
+            await self.loop.run_in_executor(self.eval_pool, self._evaluate_batch, symbols, eval_requests)
+
+            if eval_requests and self.evaluate_pool is not None:
+                await self.loop.run_in_executor(self.io_pool, self.evaluate_pool, eval_requests)
+
+            if since is not None:
+                self.latencies.append(time.perf_counter() - since)
+            self.state_event.set()
+
+    async def _bar_clock(self):
+        while True:
+            now = self.clock.time()
+            delay = (now // 60 + 1) * 60 + self.BAR_SETTLE - now
+            if self.retry_stale:
+                delay = min(delay, self.STALE_RETRY)
+            await asyncio.sleep(delay / self.clock.speed)
+
+            stale = self.data_feed.stale_symbols(self.clock.now())
+            if not stale:
+                self.retry_stale = False
+                continue
+
+            await asyncio.gather(*[
+                self.loop.run_in_executor(self.io_pool, self.data_feed._recover_sync, symbol)
+                for symbol in stale
+            ], return_exceptions=True)
+            self.retry_stale = bool(self.data_feed.stale_symbols(self.clock.now()))
+
+            # Bar-close event: evaluate candle logic on the freshly filled bars
+            self._mark_dirty(stale, time.perf_counter())
+
+    async def _dashboard_loop(self):
+        if self.export_dashboard is None:
+            return
+        while True:
+            await self.state_event.wait()
+            self.state_event.clear()
+            await self.loop.run_in_executor(self.io_pool, self.export_dashboard)
+            await asyncio.sleep(self.dashboard_every)  # throttle, not a poll
+
+    async def _reconcile_loop(self):
+        if self.reconcile is None:
+            return
+        while True:
+            await asyncio.sleep(self.reconcile_every / self.clock.speed)
+            self.reconcile()
+
+    async def _main(self):
+        self.loop = asyncio.get_running_loop()
+        self.tick_event = asyncio.Event()
+        self.state_event = asyncio.Event()
+
+        self.execution_engine.dispatcher.on_done.append(self._on_order_done)
+        self.data_feed.tick_listeners.append(self._on_ticks)
+        self.data_feed.start_feed(watchdog=False)
+
+        tasks = [
+            asyncio.create_task(self._evaluate_loop()),
+            asyncio.create_task(self._bar_clock()),
+            asyncio.create_task(self._dashboard_loop()),
+            asyncio.create_task(self._reconcile_loop()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def run(self):
+        try:
+            asyncio.run(self._main())
+        finally:
+            self.io_pool.shutdown(wait=False)
+            self.eval_pool.shutdown(wait=False)
+            self.report()
+
+    def report(self):
+        if not self.latencies:
+            print(f"📈 Async Runtime: {self.wakeups} wakeups, no evaluations.")
+            return
+        lat = np.array(self.latencies) * 1000
+        print(f"📈 Async Runtime: {self.wakeups} wakeups | {self.evaluations} symbol evals | "
+              f"reaction p50 {np.percentile(lat, 50):.2f}ms p99 {np.percentile(lat, 99):.2f}ms")
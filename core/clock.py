@@ -0,0 +1,127 @@
+"""
+Injectable clocks for the runtime.
+
+Everything that reads the time or waits on it (staleness checks, watchdog,
+bar boundaries, order / log timestamps, main-loop pacing) takes a clock
+instead of calling datetime.now() / time.time() / time.sleep() directly:
+
+    RealClock        wall time (the default everywhere: SYSTEM_CLOCK)
+    ScaledClock      starts at a given instant and runs `speed` x real time
+    SimulatedClock   only moves when the driving thread sleeps or advance()s;
+                     other threads' sleeps block until simulated time reaches them
+
+All clocks speak local wall time, like datetime.now(). Pacing of real network
+calls (broker / REST rate limits) stays on real time.
+"""
+import threading
+import time
+from datetime import datetime
+
+
+def to_datetime(ns):
+    return datetime.fromtimestamp(ns / 1e9)
+
+
+class RealClock:
+    speed = 1.0
+
+    def time_ns(self):
+        return time.time_ns()
+
+    def time(self):
+        return time.time()
+
+    def now(self):
+        return datetime.now()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+SYSTEM_CLOCK = RealClock()
+
+
+class ScaledClock(RealClock):
+    """Time flows `speed` x faster than real time from `start_ns` (epoch ns)."""
+
+    def __init__(self, start_ns, speed=1.0):
+        self.start_ns = int(start_ns)
+        self.speed = float(speed)
+        self.real_start = time.monotonic()
+
+    def time_ns(self):
+        return self.start_ns + int((time.monotonic() - self.real_start) * self.speed * 1e9)
+
+    def time(self):
+        return self.time_ns() / 1e9
+
+    def now(self):
+        return to_datetime(self.time_ns())
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds / self.speed)
+
+
+class SimulatedClock(RealClock):
+    """
+    Discrete simulated time. The driver thread (the creator, unless reassigned)
+    moves time forward with sleep()/advance(); `on_advance(ns)` hooks run first
+    (a replay delivers every record up to the new time there). Any other thread's
+    sleep() waits until simulated time has passed its wake-up point.
+    """
+
+    speed = 0.0
+
+    def __init__(self, start_ns=None):
+        self.sim_ns = int(start_ns) if start_ns is not None else time.time_ns()
+        self.driver = threading.get_ident()
+        self.on_advance = []
+        self.cond = threading.Condition()
+        self.stopped = False
+
+    def time_ns(self):
+        return self.sim_ns
+
+    def time(self):
+        return self.sim_ns / 1e9
+
+    def now(self):
+        return to_datetime(self.sim_ns)
+
+    def set(self, ns):
+        """Jumps to an absolute time (e.g. the first record of a replay)."""
+        with self.cond:
+            self.sim_ns = int(ns)
+            self.cond.notify_all()
+
+    def advance(self, seconds):
+        target = self.sim_ns + int(seconds * 1e9)
+        for hook in self.on_advance:
+            hook(target)
+        self.set(max(target, self.sim_ns))
+
+    def sleep(self, seconds):
+        if threading.get_ident() == self.driver:
+            self.advance(max(seconds, 0.0))
+            return
+        wake = self.sim_ns + int(seconds * 1e9)
+        with self.cond:
+            while self.sim_ns < wake and not self.stopped:
+                self.cond.wait(1.0)
+
+    def stop(self):
+        """Releases every non-driver sleeper (shutdown)."""
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+
+def make_clock(start_ns=None, speed=1.0):
+    """speed 1 from now: RealClock; speed 0: SimulatedClock; otherwise ScaledClock."""
+    if speed <= 0:
+        return SimulatedClock(start_ns)
+    if start_ns is None and speed == 1.0:
+        return SYSTEM_CLOCK
+    return ScaledClock(start_ns if start_ns is not None else time.time_ns(), speed)
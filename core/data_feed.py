@@ -161,6 +161,8 @@ from datetime import datetime, timedelta
 import json
 from concurrent.futures import ThreadPoolExecutor
 
+from core.clock import SYSTEM_CLOCK
+
 # --- SDK IMPORT FIX ---
 # We attempt to import the V3 Streamer correctly.
 SDK_AVAILABLE = False
@@ -176,10 +178,13 @@ except ImportError as e:
     SDK_AVAILABLE = False
 
 class RobustDataFeed:
-    def __init__(self, access_token, symbol_map):
+    def __init__(self, access_token, symbol_map, clock=None, api_base="https://api.upstox.com", limiter=None):
         """
         symbol_map: dict { "SYMBOL_NAME": "INSTRUMENT_KEY" }
         Example: { "NSE_EQ:MARUTI": "NSE_EQ|INE...", "NSE_EQ:RELIANCE": "NSE_EQ|INE..." }
+        clock: core.clock instance for freshness stamps and watchdog timing (wall clock by default)
+        api_base: REST host for history and the feed authorization (core.mock_upstox for load tests)
+        limiter: core.rate_limit.RateLimiter for the history endpoints (shared with the driver's "history" family)
         """
         self.access_token = access_token
         self.symbol_map = symbol_map
@@ -198,11 +203,19 @@ class RobustDataFeed:
         self.stop_event = threading.Event()
         self.streamer = None 
         self.executor = ThreadPoolExecutor(max_workers=5)
+        # Callables fed { symbol: ltp } for every message, from the websocket thread
+        self.tick_listeners = []
+        # Optional core.feed_recorder.FeedRecorder: messages and REST candles are logged for replay
+        self.recorder = None
+        self.clock = clock or SYSTEM_CLOCK
+        self.api_base = api_base.rstrip("/")
+        self.limiter = limiter
         
         # Setup Upstox Config
         if SDK_AVAILABLE:
             self.config = upstox_client.Configuration()
             self.config.access_token = self.access_token
+            self.config.host = self.api_base
         
         # REST Session for History (Gap Filling)
         self.session = requests.Session()
@@ -218,13 +231,15 @@ class RobustDataFeed:
         
         # 1. Fetch Last 5 Days History (Only if requested)
         if full_history:
-            now = datetime.now()
+            now = self.clock.now()
             to_date = now.strftime("%Y-%m-%d")
             from_date = (now - timedelta(days=5)).strftime("%Y-%m-%d")
             
-            hist_url = f"https://api.upstox.com/v3/historical-candle/{encoded_key}/minutes/1/{to_date}/{from_date}"
+            hist_url = f"{self.api_base}/v3/historical-candle/{encoded_key}/minutes/1/{to_date}/{from_date}"
             
             try:
+                if self.limiter is not None:
+                    self.limiter.acquire()
                 response = self.session.get(hist_url, timeout=5)
                 if response.status_code == 200:
                     data = response.json().get('data', {}).get('candles', [])
@@ -239,9 +254,11 @@ class RobustDataFeed:
                 pass
 
         # 2. Fetch Intraday Data (Today)
-        intra_url = f"https://api.upstox.com/v3/historical-candle/intraday/{encoded_key}/minutes/1"
+        intra_url = f"{self.api_base}/v3/historical-candle/intraday/{encoded_key}/minutes/1"
         
         try:
+            if self.limiter is not None:
+                self.limiter.acquire()
             response = self.session.get(intra_url, timeout=5)
             if response.status_code == 200:
                 data = response.json().get('data', {}).get('candles', [])
@@ -278,12 +295,8 @@ class RobustDataFeed:
             print(f"   ⏳ Fetching history for {symbol}...")
             df = self._get_v3_history(key, full_history=True)
             if df is not None and not df.empty:
-                with self.lock:
-                    self.dfs[symbol] = df
-                    self.last_candle_times[symbol] = df.index[-1]
-                    self.ltps[symbol] = df['Close'].iloc[-1]
+                self._apply_bars(symbol, df)
                 success_count += 1
-            time.sleep(0.02) # Rate limit protection
 
         if success_count > 0:
             self.is_healthy = True
@@ -299,16 +312,22 @@ class RobustDataFeed:
         df = self._get_v3_history(key, full_history=False)
         
         if df is not None:
-            with self.lock:
-                current_df = self.dfs[symbol]
-                updated_df = pd.concat([current_df, df])
-                # Remove duplicates and keep last 5000
-                self.dfs[symbol] = updated_df[~updated_df.index.duplicated(keep='last')].iloc[-5000:]
-                self.last_candle_times[symbol] = self.dfs[symbol].index[-1]
-                
-                # Update LTP if 0
-                if self.ltps[symbol] == 0: 
-                    self.ltps[symbol] = df['Close'].iloc[-1]
+            self._apply_bars(symbol, df)
+
+    def _apply_bars(self, symbol, df):
+        """Merges REST candles into the symbol's frame (warmup and gap fills)."""
+        if self.recorder is not None:
+            self.recorder.record_bars(symbol, df)
+        with self.lock:
+            current_df = self.dfs[symbol]
+            updated_df = pd.concat([current_df, df]) if not current_df.empty else df
+            # Remove duplicates and keep last 5000
+            self.dfs[symbol] = updated_df[~updated_df.index.duplicated(keep='last')].iloc[-5000:]
+            self.last_candle_times[symbol] = self.dfs[symbol].index[-1]
+            
+            # Update LTP if 0
+            if self.ltps[symbol] == 0: 
+                self.ltps[symbol] = df['Close'].iloc[-1]
 
     # --- TRUE V3 WEBSOCKET IMPLEMENTATION ---
 
@@ -331,7 +350,11 @@ class RobustDataFeed:
     def on_message(self, message):
         """Handles V3 Protobuf Message."""
         try:
+            if self.recorder is not None:
+                self.recorder.record_message(message)
+
             feeds = message.get('feeds', {})
+            ticks = {}
             
             with self.lock:
                 for key, feed in feeds.items():
@@ -345,33 +368,45 @@ class RobustDataFeed:
                         if new_ltp:
                             # print(f"   🔄 {symbol}: {new_ltp}", end='\r')
                             self.ltps[symbol] = new_ltp
+                            ticks[symbol] = new_ltp
                             # update per-symbol tick time for freshness checks
                             try:
-                                self.last_tick_times[symbol] = datetime.now()
+                                self.last_tick_times[symbol] = self.now()
                             except Exception:
                                 pass
                             self.is_healthy = True
             
+            # Tick consumers (e.g. StopEngine) run outside the data lock
+            if ticks:
+                for listener in self.tick_listeners:
+                    listener(ticks)
+
             # Sync logic moved to Watchdog
                 
         except Exception as e:
             print(f"⚠️ Parse Error: {e}")
 
+    def stale_symbols(self, now):
+        """Symbols whose latest 1m candle is old enough to need a gap fill."""
+        stale = []
+        for symbol in self.symbol_map:
+            last_time = self.last_candle_times.get(symbol)
+            if last_time and (now - last_time).seconds > 65:
+                stale.append(symbol)
+        return stale
+
     def _run_watchdog(self):
         """Background Monitor to check for stale data."""
         print("🐶 Watchdog started.")
         while not self.stop_event.is_set():
             try:
-                now = datetime.now()
-                for symbol in self.symbol_map:
-                    last_time = self.last_candle_times.get(symbol)
-                    if last_time and (now - last_time).seconds > 65:
-                        # Trigger sync for this symbol in background using ThreadPool
-                        self.executor.submit(self._recover_sync, symbol)
+                for symbol in self.stale_symbols(self.clock.now()):
+                    # Trigger sync for this symbol in background using ThreadPool
+                    self.executor.submit(self._recover_sync, symbol)
             except Exception as e:
                 print(f"🐶 Watchdog Error: {e}")
             
-            time.sleep(10) # Check every 10 seconds
+            self.clock.sleep(10) # Check every 10 seconds
 
     def _run_websocket(self):
         """Runs the V3 SDK Streamer."""
@@ -386,14 +421,15 @@ class RobustDataFeed:
         while not self.stop_event.is_set():
             time.sleep(1)
 
-    def start_feed(self):
+    def start_feed(self, watchdog=True):
         if SDK_AVAILABLE:
             t = threading.Thread(target=self._run_websocket, daemon=True)
             t.start()
             
-            # Start Watchdog
-            w = threading.Thread(target=self._run_watchdog, daemon=True)
-            w.start()
+            # Start Watchdog (the async runtime schedules gap recovery itself)
+            if watchdog:
+                w = threading.Thread(target=self._run_watchdog, daemon=True)
+                w.start()
         else:
             print("⚠️ SDK not available. Polling fallback not implemented for multi-symbol yet.")
 
@@ -403,6 +439,14 @@ class RobustDataFeed:
             if df is None or df.empty: return None
             return df.resample(timeframe).agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}).dropna()
     
+    def get_bars(self, symbol):
+        """Raw 1m candles for a symbol (shared, do not mutate)."""
+        with self.lock:
+            return self.dfs.get(symbol)
+
+    def now(self):
+        return self.clock.now()
+
     def get_ltp(self, symbol):
         return self.ltps.get(symbol, 0.0)
 
@@ -0,0 +1,176 @@
+import math
+
+from core.clock import SYSTEM_CLOCK
+
+from Upstox.upstox import upstox
+from Upstox.base.constants import ExchangeCode
+from Upstox.base.constants import OrderType
+from Upstox.base.constants import Product
+from Upstox.base.constants import Validity
+from Upstox.base.constants import Side
+from Upstox.base.constants import Status
+from Upstox.base.constants import Order
+
+# Every NSE equity tick (0.01 / 0.05 / 0.10 bands) divides evenly into 0.05
+DEFAULT_TICK_SIZE = 0.05
+
+
+def round_trigger(stop, tick_size=DEFAULT_TICK_SIZE):
+    """
+    Rounds a strategy stop DOWN to the tick grid.
+    Prices only trade on ticks, so `ltp <= floor(stop)` fires on exactly the
+    same prints as the client-side `ltp <= stop` check.
+    """
+    return round(math.floor(stop / tick_size + 1e-9) * tick_size, 2)
+
+
+class ExchangeStopManager:
+    """
+    Keeps an SL-M SELL resting at the exchange for every open position.
+
+    - place():      called by ExecutionEngine right after a BUY fills
+    - due_update(): main loop asks whether the trailing stop moved far enough
+                    (>= 1 tick, debounced) to be worth a modify_order
+    - modify():     ratchets the resting trigger up (never down)
+    - cancel():     takes the stop down before a client SELL (False: don't sell)
+    - reconcile():  one orderbook call; fills of resting stops are booked into
+                    TradeManager / TradeRecorder exactly like a client-side SELL
+
+    The exchange triggers the exit, so there is no client or loop latency on stops.
+    Order ids are persisted in TradeManager so resting stops survive a restart.
+    """
+
+    def __init__(self, trade_manager, logger, broker_headers, tick_size=DEFAULT_TICK_SIZE, min_interval=3.0,
+                 clock=None, broker=None):
+        self.trade_manager = trade_manager
+        # The Upstox driver, or anything with its interface (core.paper_exchange.PaperExchange)
+        self.broker = broker or upstox
+        self.clock = clock or SYSTEM_CLOCK
+        self.logger = logger
+        self.broker_headers = broker_headers
+        self.tick_size = tick_size
+        self.min_interval = min_interval
+        self.last_modified = {}  # { symbol: time of last modify sent }
+
+    def place(self, symbol, qty, stop):
+        if stop <= 0 or qty <= 0:
+            print(f"⚠️ [{symbol}] No stop level at entry; exits stay client-side.")
+            return None
+
+        trigger = round_trigger(stop, self.tick_size)
+        unique_id = self.trade_manager.generate_unique_id("STOP")
+        try:
+            resp = self.broker.slm_order_eq(
+                exchange=ExchangeCode.NSE,
+                symbol=symbol.split(":")[1],
+                trigger=trigger,
+                quantity=qty,
+                side=Side.SELL,
+                unique_id=unique_id,
+                headers=self.broker_headers,
+                product=Product.NRML,
+                validity=Validity.DAY
+            )
+        except Exception as e:
+            print(f"❌ [{symbol}] Resting stop placement failed: {e}")
+            return None
+
+        if resp.get(Order.STATUS) in (Status.REJECTED, Status.CANCELLED):
+            print(f"❌ [{symbol}] Resting stop rejected: {resp.get(Order.REJECTREASON)}")
+            return None
+
+        order_id = resp.get(Order.ID)
+        self.trade_manager.register_stop(symbol, order_id, trigger)
+        self.last_modified[symbol] = self.clock.time()
+        print(f"🛡️ [{symbol}] Resting SL-M placed @ {trigger} (Order ID: {order_id})")
+        return order_id
+
+    def due_update(self, symbol, stop):
+        """Returns the new trigger if the resting stop should be modified, else None."""
+        stop_order = self.trade_manager.get_stop_order(symbol)
+        if stop_order is None or stop <= 0:
+            return None
+
+        trigger = round_trigger(stop, self.tick_size)
+        if trigger < stop_order["trigger"] + self.tick_size - 1e-9:
+            return None
+        if self.clock.time() - self.last_modified.get(symbol, 0) < self.min_interval:
+            return None
+        return trigger
+
+    def modify(self, symbol, trigger):
+        stop_order = self.trade_manager.get_stop_order(symbol)
+        if stop_order is None or trigger <= stop_order["trigger"]:
+            return
+        self.last_modified[symbol] = self.clock.time()
+        try:
+            self.broker.modify_order(
+                order_id=stop_order["order_id"],
+                headers=self.broker_headers,
+                trigger=trigger,
+                order_type=OrderType.SLM,
+            )
+            self.trade_manager.register_stop(symbol, stop_order["order_id"], trigger)
+            print(f"🛡️ [{symbol}] Resting stop raised {stop_order['trigger']} -> {trigger}")
+        except Exception as e:
+            print(f"⚠️ [{symbol}] Stop modify failed: {e}")
+
+    def cancel(self, symbol):
+        """
+        Takes the resting stop down before a client-side SELL.
+        Returns True once it is gone (the SELL may go out). False when it filled
+        (booked here) or may still be resting: the SELL must not be sent.
+        """
+        stop_order = self.trade_manager.get_stop_order(symbol)
+        if stop_order is None:
+            return True
+        order_id = stop_order["order_id"]
+        try:
+            self.broker.cancel_order(order_id=order_id, headers=self.broker_headers)
+        except Exception as e:
+            print(f"⚠️ [{symbol}] Stop cancel failed: {e}")
+            # The cancel may have lost a race with the trigger: ask the exchange what happened
+            try:
+                status = self.broker.fetch_order(order_id=order_id, headers=self.broker_headers)
+            except Exception as e:
+                print(f"⚠️ [{symbol}] Stop {order_id} status unknown ({e}); keeping it, SELL held back.")
+                return False
+            if status[Order.STATUS] == Status.FILLED:
+                self._book_fill(symbol, stop_order, status)
+                return False
+            if status[Order.STATUS] not in (Status.CANCELLED, Status.REJECTED):
+                print(f"⚠️ [{symbol}] Stop {order_id} still {status[Order.STATUS]}; keeping it, SELL held back.")
+                return False
+        self.trade_manager.clear_stop(symbol)
+        return True
+
+    def _book_fill(self, symbol, stop_order, order):
+        qty = order[Order.FILLEDQTY] or self.trade_manager.get_holdings_qty(symbol)
+        price = order[Order.AVGPRICE] or stop_order["trigger"]
+        entry_price = self.trade_manager.get_entry_price(symbol)
+        pnl = (price - entry_price) * qty
+
+        self.logger.log_trade("SELL", symbol, price, qty, pnl, f"Exchange Stop {stop_order['trigger']}")
+        self.trade_manager.cleanup_position(symbol)
+        print(f"✅ [{symbol}] Resting stop filled @ {price}. Order ID: {stop_order['order_id']}")
+
+    def reconcile(self):
+        """Books fills of resting stops; drops stops the exchange cancelled/rejected."""
+        resting = self.trade_manager.resting_stops()
+        if not resting:
+            return
+
+        orders = {o[Order.ID]: o for o in self.broker.fetch_orderbook(self.broker_headers)}
+        for symbol, stop_order in resting.items():
+            order = orders.get(stop_order["order_id"])
+            if order is None:
+                continue
+
+            status = order[Order.STATUS]
+            if status == Status.FILLED:
+                self._book_fill(symbol, stop_order, order)
+
+            elif status in (Status.CANCELLED, Status.REJECTED):
+                # Position is unprotected at the exchange again; client-side stops take over
+                print(f"⚠️ [{symbol}] Resting stop {status}; falling back to client-side stop.")
+                self.trade_manager.clear_stop(symbol)
@@ -0,0 +1,289 @@
+"""
+Recording and replay of live market-feed sessions.
+
+FeedRecorder appends everything RobustDataFeed receives to a binary log:
+every websocket message (as the SDK hands it to on_message) and every candle
+frame fetched over REST (warmup and gap fills), each stamped with its receive
+time. ReplayFeed reads such a log back through the normal RobustDataFeed code
+paths, so main.py runs unchanged on top of it.
+
+Log layout (one file per trading day, appended across restarts):
+
+    <dir>/<YYYY-MM-DD>.feed      records: header <q B I> (recv ns, kind, payload length) + payload
+    <dir>/<YYYY-MM-DD>.feed.idx  int64 pairs (minute ns, byte offset of the minute's first record)
+
+    kind 0 MESSAGE  zlib(json(message))
+    kind 1 BARS     <H symbol length> symbol, <I n>, ts int64[n], OHLCV+OI float64[6, n]
+
+Replay speed: 1 = real time, N = N x faster, 0 = lockstep. In lockstep the
+clock (core.clock.SimulatedClock) only moves when the main loop sleeps, and
+each sleep first delivers every record up to the new time, so a run is
+deterministic and as fast as the pipeline itself. Receive stamps come from the
+recording feed's clock (local wall time live, like datetime.now()).
+
+    RECORD_FEED=1 python main.py                         # record to feed_logs/
+    REPLAY_LOG=feed_logs/2025-01-02.feed REPLAY_SPEED=0 python main.py
+    REPLAY_LOG=feed_logs/2025-01-02.feed REPLAY_START="2025-01-02 13:30" REPLAY_SPEED=1 python main.py
+    python -m core.feed_recorder feed_logs/2025-01-02.feed
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import threading
+import zlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.clock import SYSTEM_CLOCK, SimulatedClock, make_clock, to_datetime
+from core.data_feed import RobustDataFeed
+
+HEADER = struct.Struct("<qBI")
+INDEX_DTYPE = np.dtype([('minute', '<i8'), ('offset', '<i8')])
+MESSAGE, BARS = 0, 1
+MINUTE_NS = 60 * 10**9
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'OI']
+
+
+def log_path(directory, day=None):
+    return os.path.join(directory, f"{(day or datetime.now()).strftime('%Y-%m-%d')}.feed")
+
+
+def encode_bars(symbol, df):
+    name = symbol.encode()
+    ts = df.index.values.astype('datetime64[ns]').view(np.int64)
+    values = np.vstack([df[c].to_numpy(dtype=np.float64) if c in df else np.zeros(len(df)) for c in BAR_COLUMNS])
+    return struct.pack("<H", len(name)) + name + struct.pack("<I", len(df)) + ts.tobytes() + values.tobytes()
+
+
+def decode_bars(payload):
+    (name_len,) = struct.unpack_from("<H", payload, 0)
+    symbol = payload[2:2 + name_len].decode()
+    offset = 2 + name_len
+    (n,) = struct.unpack_from("<I", payload, offset)
+    offset += 4
+    ts = np.frombuffer(payload, dtype=np.int64, count=n, offset=offset)
+    values = np.frombuffer(payload, dtype=np.float64, count=6 * n, offset=offset + 8 * n).reshape(6, n)
+    index = pd.DatetimeIndex(ts.astype('datetime64[ns]'), name='timestamp')
+    return symbol, pd.DataFrame(dict(zip(BAR_COLUMNS, values)), index=index)
+
+
+# --- RECORDING ---
+
+class FeedRecorder:
+    """
+    Appends feed records from any thread. Writes are buffered; the buffer is
+    flushed at every minute boundary (together with the index entry) and on close.
+    """
+
+    def __init__(self, directory="feed_logs", day=None, clock=None):
+        # Receive stamps come from the feed's clock, so a log recorded under a
+        # scaled/simulated clock replays on the same time axis
+        self.clock = clock or SYSTEM_CLOCK
+        os.makedirs(directory, exist_ok=True)
+        self.path = log_path(directory, day or self.clock.now())
+        self.file = open(self.path, 'ab')
+        self.index = open(self.path + ".idx", 'ab')
+        self.lock = threading.Lock()
+        self.minute = None
+        self.records = 0
+
+    def _append(self, kind, payload, recv_ns=None):
+        recv_ns = recv_ns if recv_ns is not None else self.clock.time_ns()
+        with self.lock:
+            if self.file.closed:
+                return
+            minute = recv_ns // MINUTE_NS
+            if minute != self.minute:
+                self.file.flush()
+                self.index.write(np.array([(minute * MINUTE_NS, self.file.tell())], dtype=INDEX_DTYPE).tobytes())
+                self.index.flush()
+                self.minute = minute
+            self.file.write(HEADER.pack(recv_ns, kind, len(payload)))
+            self.file.write(payload)
+            self.records += 1
+
+    def record_message(self, message, recv_ns=None):
+        payload = zlib.compress(json.dumps(message, separators=(',', ':')).encode(), 1)
+        self._append(MESSAGE, payload, recv_ns)
+
+    def record_bars(self, symbol, df, recv_ns=None):
+        self._append(BARS, encode_bars(symbol, df), recv_ns)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+            self.index.close()
+
+
+# --- READING ---
+
+class FeedLog:
+    """Sequential reader; skipping a record only reads its header."""
+
+    def __init__(self, path):
+        self.path = path
+        self.index = np.zeros(0, dtype=INDEX_DTYPE)
+        if os.path.exists(path + ".idx"):
+            self.index = np.fromfile(path + ".idx", dtype=INDEX_DTYPE)
+
+    def offset_at(self, ns):
+        """Byte offset of the first indexed minute at or after ns (0 without an index)."""
+        if not len(self.index):
+            return 0
+        i = int(np.searchsorted(self.index['minute'], (ns // MINUTE_NS) * MINUTE_NS))
+        return int(self.index['offset'][i]) if i < len(self.index) else os.path.getsize(self.path)
+
+    def records(self, start_offset=0, kinds=(MESSAGE, BARS)):
+        """Yields (recv_ns, kind, decoded value) in file order."""
+        with open(self.path, 'rb') as f:
+            f.seek(start_offset)
+            while True:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    return
+                recv_ns, kind, length = HEADER.unpack(header)
+                if kind not in kinds:
+                    f.seek(length, os.SEEK_CUR)
+                    continue
+                payload = f.read(length)
+                if len(payload) < length:
+                    # Torn final record from a crash mid-write
+                    return
+                if kind == MESSAGE:
+                    yield recv_ns, kind, json.loads(zlib.decompress(payload))
+                else:
+                    yield recv_ns, kind, decode_bars(payload)
+
+    def summary(self):
+        counts = {MESSAGE: 0, BARS: 0}
+        first = last = None
+        with open(self.path, 'rb') as f:
+            while True:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    break
+                recv_ns, kind, length = HEADER.unpack(header)
+                f.seek(length, os.SEEK_CUR)
+                counts[kind] = counts.get(kind, 0) + 1
+                first = recv_ns if first is None else first
+                last = recv_ns
+        return {"messages": counts[MESSAGE], "bar_frames": counts[BARS],
+                "first": to_datetime(first) if first else None, "last": to_datetime(last) if last else None,
+                "minutes": len(self.index), "mb": round(os.path.getsize(self.path) / 1024 / 1024, 2)}
+
+
+# --- REPLAY ---
+
+class ReplayFeed(RobustDataFeed):
+    """
+    RobustDataFeed driven from a FeedLog instead of the websocket and REST.
+
+    Recorded BARS frames are merged exactly like live warmup / gap fills and
+    messages go through the unmodified on_message(), so tick listeners, LTPs and
+    freshness stamps see what they saw live. The feed owns the replay clock
+    (core.clock), starting at the first replayed message: share it with the
+    rest of the runtime.
+    """
+
+    def __init__(self, log, symbol_map, speed=0.0, start=None):
+        self.log = log if isinstance(log, FeedLog) else FeedLog(log)
+        # start: local wall time ("2025-01-02 13:30"), matching the receive stamps
+        self.start_ns = int(pd.Timestamp(start).floor("us").to_pydatetime().timestamp() * 1e9) if start is not None else None
+        self.speed = speed
+        first_ns = self._first_message_ns()
+        super().__init__(None, symbol_map, clock=make_clock(first_ns, speed) if first_ns else SYSTEM_CLOCK)
+        if isinstance(self.clock, SimulatedClock):
+            self.clock.on_advance.append(self.pump)
+        self.finished = threading.Event()
+        self.delivered = 0
+        self.pending = None
+        self.records = None
+
+    def _replayed(self, kinds=(MESSAGE, BARS)):
+        """Records from the start point on: seek to its minute, then skip what came before it."""
+        if self.start_ns is None:
+            return self.log.records(kinds=kinds)
+        records = self.log.records(self.log.offset_at(self.start_ns), kinds=kinds)
+        return (record for record in records if record[0] >= self.start_ns)
+
+    def _first_message_ns(self):
+        for recv_ns, _, _ in self._replayed(kinds=(MESSAGE,)):
+            return recv_ns
+        return None
+
+    def initialize_data(self):
+        """Applies every recorded candle frame up to the first message replayed."""
+        if self.start_ns is not None:
+            # Frames before the start point are still needed for warmup
+            for recv_ns, _, (symbol, df) in self.log.records(kinds=(BARS,)):
+                if recv_ns >= self.start_ns:
+                    break
+                self._apply_bars(symbol, df)
+        self.records = self._replayed()
+
+        self.pending = next(self.records, None)
+        while self.pending is not None and self.pending[1] == BARS:
+            self._deliver(self.pending)
+            self.pending = next(self.records, None)
+
+        if self.pending is None:
+            self.finished.set()
+            return False
+        self.is_healthy = any(not df.empty for df in self.dfs.values())
+        if self.is_healthy:
+            print(f"✅ Replay warmup from {self.log.path}: sim start {self.now():%Y-%m-%d %H:%M:%S}")
+        return self.is_healthy
+
+    def _deliver(self, record):
+        recv_ns, kind, value = record
+        if kind == BARS:
+            self._apply_bars(*value)
+        else:
+            self.on_message(value)
+            self.delivered += 1
+
+    def pump(self, until_ns):
+        """Delivers every pending record received at or before until_ns."""
+        lockstep = isinstance(self.clock, SimulatedClock)
+        while self.pending is not None and self.pending[0] <= until_ns:
+            if lockstep:
+                # Listeners see each record at its own receive time
+                self.clock.set(self.pending[0])
+            self._deliver(self.pending)
+            self.pending = next(self.records, None)
+        if self.pending is None:
+            self.finished.set()
+
+    def _run_paced(self):
+        while self.pending is not None and not self.stop_event.is_set():
+            lag = (self.pending[0] - self.clock.time_ns()) / 1e9
+            if lag > 0:
+                self.clock.sleep(lag)
+            self.pump(self.clock.time_ns())
+        self.finished.set()
+
+    def _recover_sync(self, symbol):
+        # Gap fills were recorded as BARS frames and are replayed in order
+        pass
+
+    def start_feed(self, watchdog=True):
+        print(f"⏯️ Replaying {self.log.path} at {'lockstep' if self.speed <= 0 else f'{self.speed:g}x'}")
+        if self.speed > 0:
+            threading.Thread(target=self._run_paced, daemon=True).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a recorded feed log.")
+    parser.add_argument("log")
+    args = parser.parse_args()
+    for key, value in FeedLog(args.log).summary().items():
+        print(f"   {key:>10}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Bulk 1m candle downloader into a local data lake.
+
+Layout (one directory per partition, one .npy file per column):
+
+    <root>/manifest.json
+    <root>/<SYMBOL>/<YYYY-MM>/ts.npy        int64 ns, IST wall time, ascending
+    <root>/<SYMBOL>/<YYYY-MM>/open.npy ...  float64 (open, high, low, close, volume, oi)
+
+Each partition is exactly one V3 historical-candle call (1-minute candles are
+served at most one month per request). Months are fetched concurrently under a
+shared rate limiter; a month is marked complete in the manifest only after its
+files are in place, the whole calendar month was fetched and it is over, so an
+interrupted or repeated run only fetches what is missing. Reads use
+np.load(mmap_mode='r').
+
+    python -m core.history_downloader --from 2023-01-01 --to 2024-12-31 \
+        --symbols "NSE_EQ:MARUTI=NSE_EQ|INE585B01010" --root data_lake
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.rate_limit import RateLimiter
+
+BASE_URL = "https://api.upstox.com/v3"
+COLUMNS = ["open", "high", "low", "close", "volume", "oi"]
+MANIFEST = "manifest.json"
+# Upstox standard API limits are 50/sec and 500/min; stay under both
+DEFAULT_LIMITS = [(25, 1.0), (400, 60.0)]
+
+
+# --- PARTITIONS ---
+
+def month_chunks(start, end):
+    """[(month 'YYYY-MM', from_date, to_date)] covering [start, end] inclusive."""
+    chunks = []
+    cursor = date(start.year, start.month, 1)
+    while cursor <= end:
+        next_month = date(cursor.year + cursor.month // 12, cursor.month % 12 + 1, 1)
+        chunks.append((cursor.strftime("%Y-%m"), max(cursor, start), min(next_month - timedelta(days=1), end)))
+        cursor = next_month
+    return chunks
+
+
+def partition_dir(root, symbol, month):
+    return os.path.join(root, symbol.split(":")[-1], month)
+
+
+def write_partition(root, symbol, month, candles):
+    """Writes one month atomically (tmp dir + rename). candles: Upstox rows, any order."""
+    df = pd.DataFrame(candles, columns=['timestamp'] + COLUMNS)
+    ts = pd.to_datetime(df['timestamp'])
+    if ts.dt.tz is not None:
+        ts = ts.dt.tz_localize(None)
+    df['timestamp'] = ts
+    df = df.drop_duplicates('timestamp', keep='last').sort_values('timestamp')
+
+    final = partition_dir(root, symbol, month)
+    tmp = final + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "ts.npy"), df['timestamp'].values.astype('datetime64[ns]').view(np.int64))
+    for col in COLUMNS:
+        np.save(os.path.join(tmp, f"{col}.npy"), df[col].to_numpy(dtype=np.float64))
+    shutil.rmtree(final, ignore_errors=True)
+    os.replace(tmp, final)
+    return len(df)
+
+
+# --- READS ---
+
+class DataLake:
+    """Read side of the lake: manifest lookups and memory-mapped partition reads."""
+
+    def __init__(self, root):
+        self.root = root
+        path = os.path.join(root, MANIFEST)
+        self.manifest = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.manifest = json.load(f)
+
+    def symbols(self):
+        return list(self.manifest.get("symbols", {}))
+
+    def months(self, symbol):
+        return sorted(self.manifest.get("symbols", {}).get(symbol, {}).get("months", {}))
+
+    def load_arrays(self, symbol, start=None, end=None):
+        """{ 'ts', 'open', ... } for [start, end); single-month reads stay memory-mapped."""
+        months = self.months(symbol)
+        if start is not None:
+            months = [m for m in months if m >= pd.Timestamp(start).strftime("%Y-%m")]
+        if end is not None:
+            months = [m for m in months if m <= pd.Timestamp(end).strftime("%Y-%m")]
+
+        parts = {col: [] for col in ["ts"] + COLUMNS}
+        for month in months:
+            folder = partition_dir(self.root, symbol, month)
+            for col in parts:
+                parts[col].append(np.load(os.path.join(folder, f"{col}.npy"), mmap_mode='r'))
+        if not months:
+            return None
+        arrays = {col: chunks[0] if len(chunks) == 1 else np.concatenate(chunks) for col, chunks in parts.items()}
+
+        lo, hi = 0, len(arrays["ts"])
+        if start is not None:
+            lo = int(np.searchsorted(arrays["ts"], pd.Timestamp(start).value))
+        if end is not None:
+            hi = int(np.searchsorted(arrays["ts"], pd.Timestamp(end).value))
+        return {col: arr[lo:hi] for col, arr in arrays.items()}
+
+    def load_bars(self, symbol, start=None, end=None):
+        """OHLCV DataFrame in the layout RobustDataFeed and the backtests use."""
+        arrays = self.load_arrays(symbol, start, end)
+        if arrays is None:
+            return None
+        index = pd.DatetimeIndex(np.asarray(arrays["ts"]).astype('datetime64[ns]'), name='timestamp')
+        return pd.DataFrame({'Open': arrays["open"], 'High': arrays["high"], 'Low': arrays["low"],
+                             'Close': arrays["close"], 'Volume': arrays["volume"], 'OI': arrays["oi"]},
+                            index=index)
+
+
+# --- DOWNLOADER ---
+
+class HistoryDownloader:
+    """
+    Fetches every missing (symbol, month) partition concurrently.
+
+    - One HTTP call per partition, gated by a shared RateLimiter
+    - 429 / 5xx / network errors retry with exponential backoff
+    - Manifest is rewritten atomically after every partition, so progress
+      survives a crash at any point
+    """
+
+    def __init__(self, access_token, root="data_lake", workers=8, limits=DEFAULT_LIMITS,
+                 base_url=BASE_URL, max_retries=5, session=None):
+        self.root = root
+        self.workers = workers
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.limiter = RateLimiter(limits)
+        self.lock = threading.Lock()
+
+        if session is None:
+            # Imported here so backtests can read the lake without the HTTP stack
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+        self.session = session
+        self.session.headers.update({"Authorization": f"Bearer {access_token}", "Accept": "application/json"})
+
+        os.makedirs(root, exist_ok=True)
+        self.manifest_path = os.path.join(root, MANIFEST)
+        self.manifest = DataLake(root).manifest or {"symbols": {}}
+        self.stats = {"fetched": 0, "skipped": 0, "failed": 0, "rows": 0, "retries": 0}
+
+    def save_manifest(self):
+        # Atomic write so an interrupted run never leaves a truncated manifest
+        temp_file = self.manifest_path + ".tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        shutil.move(temp_file, self.manifest_path)
+
+    def is_complete(self, symbol, month):
+        entry = self.manifest["symbols"].get(symbol, {}).get("months", {}).get(month)
+        return bool(entry and entry.get("complete"))
+
+    def _fetch(self, instrument_key, from_date, to_date):
+        encoded_key = urllib.parse.quote(instrument_key)
+        url = f"{self.base_url}/historical-candle/{encoded_key}/minutes/1/{to_date}/{from_date}"
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                response = self.session.get(url, timeout=15)
+                if response.status_code == 200:
+                    return response.json().get('data', {}).get('candles', [])
+                if response.status_code != 429 and response.status_code < 500:
+                    raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+            except RuntimeError:
+                raise
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+            with self.lock:
+                self.stats["retries"] += 1
+            time.sleep(min(30.0, 0.5 * 2 ** attempt))
+        raise RuntimeError(f"gave up after {self.max_retries} retries")
+
+    def _download(self, symbol, instrument_key, month, from_date, to_date):
+        candles = self._fetch(instrument_key, from_date, to_date)
+        rows = write_partition(self.root, symbol, month, candles) if candles else 0
+        # Complete only if the whole calendar month was fetched and it is over: the current
+        # month keeps growing, and a chunk clipped by --from/--to would skip the rest for good
+        month_start = date(from_date.year, from_date.month, 1)
+        month_end = date(month_start.year + month_start.month // 12, month_start.month % 12 + 1, 1) - timedelta(days=1)
+        month_over = from_date == month_start and to_date == month_end and month_end < date.today()
+        with self.lock:
+            sym_entry = self.manifest["symbols"].setdefault(symbol, {"instrument_key": instrument_key, "months": {}})
+            if rows:
+                sym_entry["months"][month] = {"rows": rows, "from": str(from_date), "to": str(to_date),
+                                              "complete": month_over,
+                                              "fetched_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+            elif month_over:
+                # Nothing traded (holiday month / pre-listing): remember so we do not ask again
+                sym_entry.setdefault("empty_months", [])
+                if month not in sym_entry["empty_months"]:
+                    sym_entry["empty_months"].append(month)
+            self.save_manifest()
+            self.stats["fetched"] += 1
+            self.stats["rows"] += rows
+        return rows
+
+    def run(self, symbol_map, start, end):
+        """symbol_map: { "NSE_EQ:MARUTI": "NSE_EQ|INE585B01010" }; start/end: date."""
+        tasks = []
+        for symbol, key in symbol_map.items():
+            empty = set(self.manifest["symbols"].get(symbol, {}).get("empty_months", []))
+            for month, from_date, to_date in month_chunks(start, end):
+                if self.is_complete(symbol, month) or month in empty:
+                    self.stats["skipped"] += 1
+                    continue
+                # A partition is rewritten whole, so fetch the whole month (up to today),
+                # not just the part inside [start, end]
+                _, from_date, to_date = month_chunks(from_date.replace(day=1), date.today())[0]
+                tasks.append((symbol, key, month, from_date, to_date))
+
+        print(f"📥 Downloading {len(tasks)} partitions ({self.stats['skipped']} already in {self.root})...")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._download, *task): task for task in tasks}
+            for future in as_completed(futures):
+                symbol, _, month, _, _ = futures[future]
+                try:
+                    rows = future.result()
+                    print(f"   ✅ {symbol} {month}: {rows} candles")
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    print(f"   ❌ {symbol} {month}: {e}")
+
+        elapsed = time.perf_counter() - started
+        print(f"✅ Done in {elapsed:.1f}s | {self.stats} | rate-limit wait {self.limiter.waited:.1f}s")
+        return self.stats
+
+
+def parse_symbols(values):
+    """['NSE_EQ:MARUTI=NSE_EQ|INE585B01010', ...] or a JSON file path -> symbol map."""
+    if len(values) == 1 and values[0].endswith(".json"):
+        with open(values[0]) as f:
+            return json.load(f)
+    return dict(v.split("=", 1) for v in values)
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Download 1m candles into the local data lake.")
+    parser.add_argument("--symbols", nargs="+", required=True, help="SYMBOL=INSTRUMENT_KEY pairs or a JSON map file")
+    parser.add_argument("--from", dest="start", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", default=date.today().strftime("%Y-%m-%d"))
+    parser.add_argument("--root", default="data_lake")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--per-second", type=int, default=DEFAULT_LIMITS[0][0])
+    parser.add_argument("--per-minute", type=int, default=DEFAULT_LIMITS[1][0])
+    parser.add_argument("--base-url", default=BASE_URL)
+    args = parser.parse_args()
+
+    token = os.getenv("UPSTOX_PROD_TOKEN")
+    if not token:
+        print("❌ UPSTOX_PROD_TOKEN missing in .env")
+        return
+
+    downloader = HistoryDownloader(token, args.root, args.workers,
+                                   [(args.per_second, 1.0), (args.per_minute, 60.0)], args.base_url)
+    downloader.run(parse_symbols(args.symbols),
+                   datetime.strptime(args.start, "%Y-%m-%d").date(),
+                   datetime.strptime(args.end, "%Y-%m-%d").date())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import threading
+import numpy as np
+import pandas as pd
+
+# --- INDICATOR SPECS ---
+# A spec is a hashable (kind, params) tuple, e.g. ("rsi", (("period", 9),)).
+# Two strategies asking for the same kind + params share one graph node.
+
+def spec(kind, **params):
+    """Builds a hashable indicator spec: spec("rsi", period=9)."""
+    if kind not in INDICATORS:
+        raise KeyError(f"Unknown indicator: {kind}, Possible Values: {list(INDICATORS)}")
+    return (kind, tuple(sorted(params.items())))
+
+
+# --- INDICATOR MATH ---
+# Same formulas the live strategies have always used (Wilder smoothing via ewm(com=n-1),
+# epsilon on the loss leg), so moving a strategy onto the graph does not change its signals.
+
+def rsi(df, period):
+    delta = df['Close'].diff()
+    gain = (delta.where(delta > 0, 0)).ewm(com=period-1).mean()
+    loss = (-delta.where(delta < 0, 0)).ewm(com=period-1).mean()
+    rs = gain / (loss + 1e-10)
+    return 100 - (100/(1+rs))
+
+def true_range(df):
+    high_low = df['High'] - df['Low']
+    high_close = np.abs(df['High'] - df['Close'].shift())
+    low_close = np.abs(df['Low'] - df['Close'].shift())
+    return pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+
+def atr(df, period):
+    return true_range(df).ewm(com=period-1).mean()
+
+def highest_high(df, period):
+    return df['High'].rolling(period).max()
+
+INDICATORS = {
+    "rsi": rsi,
+    "atr": atr,
+    "highest_high": highest_high,
+}
+
+def compute_indicator(df, indicator_spec):
+    kind, params = indicator_spec
+    return INDICATORS[kind](df, **dict(params))
+
+def compute_indicators(df, specs):
+    """Graph-less fallback: computes every spec directly on df."""
+    return {s: compute_indicator(df, s) for s in specs}
+
+
+# --- SHARED GRAPH ---
+
+class IndicatorGraph:
+    """
+    Per-symbol indicator graph shared by every strategy trading that symbol.
+
+    Strategies subscribe with the specs they need; each unique
+    (symbol, timeframe, spec) node is computed once per bar and the result is
+    handed to every subscriber. Results are memoized by
+    (symbol, timeframe, bar timestamp, spec); a node keeps only its latest bar
+    and is dropped as soon as its last subscriber goes away.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # { (symbol, timeframe, spec): set(subscriber ids) }
+        self.nodes = {}
+        # { (symbol, timeframe, spec): (bar_ts, fingerprint, series) }
+        self.memo = {}
+        self.hits = 0
+        self.misses = 0
+
+    def subscribe(self, symbol, timeframe, subscriber, specs):
+        with self.lock:
+            for s in specs:
+                self.nodes.setdefault((symbol, timeframe, s), set()).add(id(subscriber))
+
+    def unsubscribe(self, symbol, timeframe, subscriber):
+        with self.lock:
+            for node in [n for n in self.nodes if n[0] == symbol and n[1] == timeframe]:
+                subs = self.nodes[node]
+                subs.discard(id(subscriber))
+                if not subs:
+                    # Evict unused node together with its cached values
+                    del self.nodes[node]
+                    self.memo.pop(node, None)
+
+    @staticmethod
+    def _fingerprint(df):
+        # The last bar of a resampled frame is still forming, so the bar
+        # timestamp alone cannot tell us whether its OHLC changed.
+        last = df.iloc[-1]
+        return (len(df), last['High'], last['Low'], last['Close'])
+
+    def compute(self, symbol, timeframe, df, specs):
+        """Returns { spec: Series } for df, computing each node at most once per bar."""
+        if df is None or df.empty:
+            return {}
+
+        bar_ts = df.index[-1]
+        fingerprint = self._fingerprint(df)
+        results = {}
+
+        with self.lock:
+            for s in specs:
+                node = (symbol, timeframe, s)
+                cached = self.memo.get(node)
+                if cached is not None and cached[0] == bar_ts and cached[1] == fingerprint:
+                    self.hits += 1
+                    results[s] = cached[2]
+                    continue
+
+                self.misses += 1
+                series = compute_indicator(df, s)
+                results[s] = series
+                # Only memoize nodes somebody subscribed to; ad-hoc lookups stay uncached
+                if node in self.nodes:
+                    self.memo[node] = (bar_ts, fingerprint, series)
+
+        return results
+
+    def stats(self):
+        with self.lock:
+            return {"nodes": len(self.nodes), "hits": self.hits, "misses": self.misses}
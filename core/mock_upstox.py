@@ -0,0 +1,530 @@
+"""
+Local stand-in for the Upstox REST and market-feed websocket APIs, for
+end-to-end load tests of main.py with no network.
+
+One threaded HTTP server serves, on a single port:
+
+    GET  /v3/historical-candle/<key>/minutes/1/<to>/<from>     1m candles, past sessions
+    GET  /v3/historical-candle/intraday/<key>/minutes/1        1m candles, today
+    GET  /v2|v3/market-quote/ltp|ohlc|quotes?instrument_key=   quotes
+    POST /v2/order/place, /v2/order/multi/place                orders (matched by core.paper_exchange)
+    GET  /v2/order/details, /v2/order/retrieve-all
+    PUT  /v2/order/modify     DELETE /v2/order/cancel
+    GET  /v2/portfolio/short-term-positions, long-term-holdings
+    GET  /market-quote/instruments/exchange/complete.csv.gz    instrument master (driver's eq_tokens)
+    GET  /v3/feed/market-data-feed/authorize                   -> ws://<host>/v3/feed/market-data-feed
+    WS   /v3/feed/market-data-feed                             V3 protobuf FeedResponse ticks
+    GET  /mock/stats                                           request / tick counters
+
+Prices follow a deterministic per-instrument model (a few superimposed
+waves around a base price), so REST candles, websocket ticks and order
+fills all agree with each other. The mock market is always open: "today"
+is the 375 minutes up to now, past sessions are weekdays 09:15-15:29.
+
+Feed messages are protobuf-encoded by hand (only the fields RobustDataFeed
+reads: feeds -> key -> fullFeed -> marketFF -> ltpc), so neither the SDK nor
+protobuf is needed on the server side.
+
+    python -m core.mock_upstox --symbols 300 --tick-rate 5 --write-symbols mock_symbols.json
+    UPSTOX_API_BASE=http://127.0.0.1:8765 SYMBOLS_FILE=mock_symbols.json PAPER_TRADING=0 python main.py
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import urllib.parse
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.paper_exchange import PaperExchange
+
+from Upstox.upstox import upstox
+from Upstox.base.constants import ExchangeCode
+from Upstox.base.constants import OrderType
+from Upstox.base.constants import Product
+from Upstox.base.constants import Side
+from Upstox.base.constants import Validity
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+SESSION_MINUTES = 375     # 09:15 - 15:29
+FEEDS_PER_MESSAGE = 100
+IST_SUFFIX = "+05:30"
+# Raw Upstox order types ("MARKET", "LIMIT", "SL", "SL-M") -> unified OrderType
+RAW_ORDER_TYPE = {raw: unified for unified, raw in upstox.req_order_type.items()}
+
+
+# --- PRICE MODEL ---
+
+class PriceModel:
+    """Deterministic price paths: base * (1 + sum of waves), one path per instrument key."""
+
+    WAVES = [(0.010, 47 * 60), (0.004, 11 * 60), (0.001, 97)]   # (amplitude, period seconds)
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        seeds = np.array([zlib.crc32(key.encode()) for key in self.keys], dtype=np.float64)
+        self.base = 100.0 + (seeds % 4900.0)
+        self.phases = np.stack([(seeds / (k + 1)) % (2 * np.pi) for k in range(len(self.WAVES))])
+
+    def prices(self, t, rows=None):
+        """t: epoch seconds (scalar or array broadcast against the rows)."""
+        rows = np.arange(len(self.keys)) if rows is None else rows
+        moves = np.zeros(np.broadcast(np.asarray(t), rows).shape)
+        for k, (amplitude, period) in enumerate(self.WAVES):
+            moves = moves + amplitude * np.sin(2 * np.pi * np.asarray(t) / period + self.phases[k][rows])
+        return np.round(self.base[rows] * (1 + moves) / 0.05) * 0.05
+
+    def candles(self, key, minutes):
+        """minutes: epoch seconds of each bar's start -> [ts, open, high, low, close, volume, oi] rows."""
+        row = self.index[key]
+        samples = np.asarray(minutes, dtype=np.float64)[:, None] + np.array([0, 15, 30, 45, 59])
+        paths = self.prices(samples, row)
+        volume = (1000 + (np.asarray(minutes) // 60 * 7919 + row) % 5000).astype(int)
+        return [
+            [datetime.fromtimestamp(m).strftime("%Y-%m-%dT%H:%M:%S") + IST_SUFFIX,
+             round(p[0], 2), round(p.max(), 2), round(p.min(), 2), round(p[-1], 2), int(v), 0]
+            for m, p, v in zip(minutes, paths, volume)
+        ]
+
+
+# --- PROTOBUF (MarketDataFeedV3.FeedResponse subset) ---
+
+def _varint(n):
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(number, wire_type):
+    return _varint(number << 3 | wire_type)
+
+
+def _message(number, payload):
+    return _field(number, 2) + _varint(len(payload)) + payload
+
+
+def encode_feed_response(ltps, ts_ms):
+    """
+    FeedResponse{type=live_feed, feeds: {key: Feed{fullFeed: FullFeed{marketFF:
+    MarketFullFeed{ltpc: LTPC{ltp, ltt, ltq, cp}}}, requestMode=full_d5}}, currentTs}
+    """
+    out = bytearray(_field(1, 0) + _varint(1))
+    for key, (ltp, cp) in ltps.items():
+        ltpc = (_field(1, 1) + struct.pack("<d", ltp) + _field(2, 0) + _varint(ts_ms)
+                + _field(3, 0) + _varint(1) + _field(4, 1) + struct.pack("<d", cp))
+        feed = _message(2, _message(1, _message(1, ltpc))) + _field(4, 0) + _varint(1)
+        out += _message(2, _message(1, key.encode()) + _message(2, feed))
+    out += _field(3, 0) + _varint(ts_ms)
+    return bytes(out)
+
+
+# --- WEBSOCKET (RFC 6455, server side) ---
+
+def ws_frame(payload, opcode=0x2):
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def ws_read(rfile):
+    """-> (opcode, payload) of the next client frame, or (None, b"") at EOF."""
+    head = rfile.read(2)
+    if len(head) < 2:
+        return None, b""
+    opcode = head[0] & 0x0F
+    length = head[1] & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", rfile.read(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", rfile.read(8))
+    mask = rfile.read(4) if head[1] & 0x80 else b"\0\0\0\0"
+    data = np.frombuffer(rfile.read(length), dtype=np.uint8)
+    key = np.resize(np.frombuffer(mask, dtype=np.uint8), len(data))
+    return opcode, (data ^ key).tobytes()
+
+
+class FeedConnection:
+    def __init__(self, sock):
+        self.sock = sock
+        self.keys = set()
+        self.lock = threading.Lock()
+        self.alive = True
+
+    def send(self, payload, opcode=0x2):
+        with self.lock:
+            try:
+                self.sock.sendall(ws_frame(payload, opcode))
+            except OSError:
+                self.alive = False
+
+
+# --- SERVER ---
+
+class MockUpstox(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, symbol_map, host="127.0.0.1", port=8765, tick_rate=5.0, latency_ms=0, slippage_bps=0.0):
+        """symbol_map: { "NSE_EQ:SYMBOL": "NSE_EQ|INSTRUMENT_KEY" }, like main.py's SYMBOLS_MAP."""
+        super().__init__((host, port), MockHandler)
+        self.symbol_map = dict(symbol_map)
+        self.key_to_symbol = {key: symbol for symbol, key in self.symbol_map.items()}
+        self.model = PriceModel(self.symbol_map.values())
+        self.tick_rate = tick_rate
+        self.latency = latency_ms / 1000.0
+        self.exchange = PaperExchange(slippage_bps=slippage_bps)
+        self.ws_url = f"ws://{host}:{self.server_address[1]}/v3/feed/market-data-feed"
+        self.connections = []
+        self.stop_event = threading.Event()
+        self.prev_close = dict(zip(self.model.keys, self.model.prices(time.time() - 86400)))
+
+        # Observability
+        self.requests = Counter()
+        self.ticks_sent = 0
+        self.messages_sent = 0
+        self._tick()
+
+    # --- MARKET ---
+
+    def ltps(self, now=None):
+        return dict(zip(self.model.keys, self.model.prices(now if now is not None else time.time())))
+
+    def _tick(self):
+        ltps = self.ltps()
+        self.exchange.on_ticks({self.key_to_symbol[key]: ltp for key, ltp in ltps.items()})
+        return ltps
+
+    def _run_ticker(self):
+        interval = 1.0 / self.tick_rate
+        next_at = time.monotonic()
+        while not self.stop_event.is_set():
+            ltps = self._tick()
+            ts_ms = int(time.time() * 1000)
+            for conn in list(self.connections):
+                if not conn.alive:
+                    self.connections.remove(conn)
+                    continue
+                keys = [key for key in conn.keys if key in ltps]
+                for start in range(0, len(keys), FEEDS_PER_MESSAGE):
+                    chunk = keys[start:start + FEEDS_PER_MESSAGE]
+                    conn.send(encode_feed_response({k: (ltps[k], self.prev_close[k]) for k in chunk}, ts_ms))
+                    self.messages_sent += 1
+                    self.ticks_sent += len(chunk)
+            next_at += interval
+            self.stop_event.wait(max(0.0, next_at - time.monotonic()))
+
+    def candles(self, key, start, end):
+        """1m bars with start <= bar < end (epoch seconds), newest first like Upstox."""
+        first = int(start // 60 * 60)
+        minutes = np.arange(first, int(end), 60)
+        return self.model.candles(key, minutes[::-1])
+
+    def history(self, key, to_date, from_date):
+        """Weekday sessions from from_date to to_date, excluding today (Upstox serves today as intraday)."""
+        day = datetime.strptime(from_date, "%Y-%m-%d")
+        last = min(datetime.strptime(to_date, "%Y-%m-%d"), datetime.now() - timedelta(days=1))
+        rows = []
+        while day.date() <= last.date():
+            if day.weekday() < 5:
+                open_at = day.replace(hour=9, minute=15).timestamp()
+                rows = self.candles(key, open_at, open_at + SESSION_MINUTES * 60) + rows
+            day += timedelta(days=1)
+        return rows
+
+    def intraday(self, key):
+        now = time.time()
+        return self.candles(key, now - SESSION_MINUTES * 60, now // 60 * 60)
+
+    def instruments_csv(self):
+        lines = ["instrument_key,exchange_token,tradingsymbol,name,last_price,expiry,strike,tick_size,lot_size,"
+                 "instrument_type,option_type,exchange"]
+        ltps = self.ltps()
+        for i, (symbol, key) in enumerate(self.symbol_map.items()):
+            exchange, name = symbol.split(":")
+            lines.append(f"{key},{100000 + i},{name},{name},{ltps[key]:.2f},,0,0.05,1,EQUITY,,{exchange}")
+        return gzip.compress(("\n".join(lines) + "\n").encode())
+
+    def stats(self):
+        return {"requests": dict(self.requests), "connections": len(self.connections),
+                "ticks_sent": self.ticks_sent, "messages_sent": self.messages_sent,
+                "exchange": self.exchange.summary()}
+
+    def start(self):
+        threading.Thread(target=self._run_ticker, daemon=True).start()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        print(f"🧪 Mock Upstox on http://{self.server_address[0]}:{self.server_address[1]} "
+              f"({len(self.symbol_map)} symbols, {self.tick_rate:g} ticks/s)")
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.shutdown()
+        self.server_close()
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- PLUMBING ---
+
+    def _reply(self, payload, status=200, content_type="application/json"):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _ok(self, data, status=200):
+        self._reply({"status": "success", "data": data}, status)
+
+    def _error(self, message, status=400, code="UDAPI100500"):
+        self._reply({"status": "error", "errors": [{"errorCode": code, "message": message}]}, status)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def _dispatch(self, method):
+        url = urllib.parse.urlsplit(self.path)
+        parts = [urllib.parse.unquote(p) for p in url.path.strip("/").split("/")]
+        query = {k: v[-1] for k, v in urllib.parse.parse_qs(url.query).items()}
+        route = "/".join(p for p in parts if "|" not in p and not p[:1].isdigit())
+        self.server.requests[f"{method} {route}"] += 1
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+        try:
+            self._route(method, parts, query)
+        except (KeyError, ValueError, TypeError) as e:
+            self._error(f"Invalid request: {e}")
+        except Exception as e:
+            self._error(str(e))
+
+    def do_GET(self):
+        if self.headers.get("Upgrade", "").lower() == "websocket":
+            return self._websocket()
+        self._dispatch("GET")
+
+    def do_HEAD(self):
+        # Connection warmup (Broker.warm_connections)
+        self.server.requests["HEAD"] += 1
+        self._reply(b"", content_type="text/plain")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    # --- ROUTES ---
+
+    def _route(self, method, parts, query):
+        server = self.server
+        path = "/".join(parts)
+
+        if path == "mock/stats":
+            return self._reply(server.stats())
+        if path.endswith("complete.csv.gz"):
+            return self._reply(server.instruments_csv(), content_type="application/gzip")
+        if path.endswith("feed/market-data-feed/authorize"):
+            return self._ok({"authorizedRedirectUri": server.ws_url, "authorized_redirect_uri": server.ws_url})
+
+        if parts[:2] == ["v3", "historical-candle"] or parts[:2] == ["v2", "historical-candle"]:
+            if parts[2] == "intraday":
+                key = parts[3]
+                return self._ok({"candles": server.intraday(key) if key in server.model.index else []})
+            key, to_date, from_date = parts[2], parts[-2], parts[-1]
+            return self._ok({"candles": server.history(key, to_date, from_date) if key in server.model.index else []})
+
+        if parts[1:3] == ["market-quote", "ltp"] or parts[1:3] == ["market-quote", "ohlc"] \
+                or parts[1:3] == ["market-quote", "quotes"]:
+            ltps = server.ltps()
+            data = {}
+            for key in query.get("instrument_key", "").split(","):
+                if key in ltps:
+                    ohlc = server.intraday(key)
+                    quote = {"instrument_token": key, "last_price": ltps[key]}
+                    if parts[2] != "ltp" and ohlc:
+                        quote["ohlc"] = {"open": ohlc[-1][1], "high": max(c[2] for c in ohlc),
+                                         "low": min(c[3] for c in ohlc), "close": ohlc[0][4]}
+                    data[server.key_to_symbol[key]] = quote
+            return self._ok(data)
+
+        if parts[1:3] == ["order", "place"] and method == "POST":
+            order = self._place(self._body())
+            if order["status"] == "rejected":
+                return self._error(order["status_message_raw"])
+            return self._ok({"order_id": order["order_id"]})
+
+        if parts[1:4] == ["order", "multi", "place"] and method == "POST":
+            placed, errors = [], []
+            for leg in self._body():
+                order = self._place(leg)
+                if order["status"] == "rejected":
+                    errors.append({"correlation_id": leg.get("correlation_id"), "message": order["status_message_raw"],
+                                   "instrument_key": leg.get("instrument_token")})
+                else:
+                    placed.append({"correlation_id": leg.get("correlation_id"), "order_id": order["order_id"]})
+            status = "success" if not errors else "partial_success" if placed else "error"
+            return self._reply({"status": status, "data": placed, "errors": errors,
+                                "summary": {"total": len(placed) + len(errors), "success": len(placed),
+                                            "error": len(errors)}}, 207 if status == "partial_success" else
+                               200 if placed else 400)
+
+        if parts[1:3] == ["order", "details"]:
+            order = server.exchange.orders.get(query.get("order_id"))
+            if order is None:
+                return self._error("Order not found", 404, "UDAPI100010")
+            server.exchange.fetch_order(order["order_id"], headers=None)
+            return self._ok(dict(order))
+
+        if parts[1:3] == ["order", "retrieve-all"]:
+            server.exchange.fetch_orderbook(headers=None)
+            return self._ok([dict(order) for order in server.exchange.orders.values()])
+
+        if parts[1:3] == ["order", "modify"] and method == "PUT":
+            body = self._body()
+            server.exchange.modify_order(
+                body["order_id"], headers=None, price=body.get("price"), trigger=body.get("trigger_price"),
+                quantity=body.get("quantity"),
+                order_type=RAW_ORDER_TYPE.get(body.get("order_type")),
+                validity=body.get("validity"))
+            return self._ok({"order_id": body["order_id"]})
+
+        if parts[1:3] == ["order", "cancel"] and method == "DELETE":
+            server.exchange.cancel_order(query["order_id"], headers=None)
+            return self._ok({"order_id": query["order_id"]})
+
+        if parts[1:3] == ["portfolio", "short-term-positions"]:
+            return self._ok(server.exchange.fetch_day_positions(headers=None)["data"])
+
+        if parts[1:3] == ["portfolio", "long-term-holdings"]:
+            return self._ok([])
+
+        return self._error(f"No mock route for {method} /{path}", 404, "UDAPI100060")
+
+    def _place(self, body):
+        """Raw Upstox order payload -> paper exchange order (raw dict)."""
+        server = self.server
+        symbol = server.key_to_symbol.get(body.get("instrument_token"))
+        if symbol is None:
+            return {"status": "rejected", "status_message_raw": f"Invalid instrument {body.get('instrument_token')}"}
+        exchange = server.exchange
+        side = Side.BUY if body["transaction_type"] == "BUY" else Side.SELL
+        order_type = RAW_ORDER_TYPE.get(body.get("order_type", "MARKET"), OrderType.MARKET)
+        product = upstox.resp_product.get(body.get("product", "I"), Product.MIS)
+        validity = Validity.IOC if body.get("validity") == "IOC" else Validity.DAY
+        with exchange.lock:
+            order = exchange._new_order(
+                exchange=ExchangeCode.NSE, symbol=symbol.split(":")[-1], quantity=body["quantity"], side=side,
+                unique_id=body.get("tag", ""), order_type=order_type, price=body.get("price", 0.0),
+                trigger=body.get("trigger_price", 0.0), product=product, validity=validity,
+                instrument_token=body["instrument_token"])
+            exchange._match(order["trading_symbol"])
+        return order
+
+    # --- WEBSOCKET ---
+
+    def _websocket(self):
+        server = self.server
+        server.requests["WS v3/feed/market-data-feed"] += 1
+        accept = base64.b64encode(hashlib.sha1((self.headers["Sec-WebSocket-Key"] + WS_GUID).encode()).digest())
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept.decode())
+        self.end_headers()
+        self.wfile.flush()
+
+        conn = FeedConnection(self.connection)
+        server.connections.append(conn)
+        try:
+            while conn.alive and not server.stop_event.is_set():
+                opcode, payload = ws_read(self.rfile)
+                if opcode is None or opcode == 0x8:
+                    break
+                if opcode == 0x9:
+                    conn.send(payload, 0xA)
+                elif opcode in (0x1, 0x2):
+                    self._on_ws_request(conn, payload)
+        except (OSError, ValueError):
+            pass
+        finally:
+            conn.alive = False
+            self.close_connection = True
+
+    def _on_ws_request(self, conn, payload):
+        """SDK requests: {"guid", "method": "sub"|"unsub"|"change_mode", "data": {"mode", "instrumentKeys"}}."""
+        request = json.loads(payload)
+        keys = set(request.get("data", {}).get("instrumentKeys", []))
+        if request.get("method") == "unsub":
+            conn.keys -= keys
+        else:
+            conn.keys |= keys
+
+
+def load_symbols(path=None, count=0):
+    """Symbol map from a JSON file ({ "NSE_EQ:SYMBOL": "NSE_EQ|KEY" }) or `count` generated MOCKnnnn symbols."""
+    if path:
+        with open(path) as f:
+            return json.load(f)
+    return {f"NSE_EQ:MOCK{i:04d}": f"NSE_EQ|MOCK{i:04d}" for i in range(count)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Upstox REST and market-feed APIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--symbols", type=int, default=100, help="generate this many MOCKnnnn symbols")
+    parser.add_argument("--symbols-file", help="serve main.py's symbol map (JSON) instead")
+    parser.add_argument("--write-symbols", help="write the served symbol map here (for SYMBOLS_FILE=)")
+    parser.add_argument("--tick-rate", type=float, default=5.0, help="ticks per second per symbol")
+    parser.add_argument("--latency-ms", type=int, default=0, help="added to every REST response")
+    parser.add_argument("--slippage-bps", type=float, default=0.0)
+    args = parser.parse_args()
+
+    symbol_map = load_symbols(args.symbols_file, args.symbols)
+    if args.write_symbols:
+        with open(args.write_symbols, "w") as f:
+            json.dump(symbol_map, f, indent=1)
+    server = MockUpstox(symbol_map, args.host, args.port, args.tick_rate, args.latency_ms, args.slippage_bps).start()
+    try:
+        while True:
+            time.sleep(10)
+            stats = server.stats()
+            print(f"   {sum(stats['requests'].values())} requests | {stats['connections']} feeds | "
+                  f"{stats['ticks_sent']:,} ticks | {stats['exchange']['orders']} orders")
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
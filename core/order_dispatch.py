@@ -0,0 +1,213 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+
+# Broker HTTP calls per task: every order call is followed by a fetch_order
+# (Upstox driver's _create_order_parser); a modify of a cached open order is one
+# PUT (upstox.order_cache); reconcile is one orderbook call.
+# A task may carry its own count in task["calls"] (baskets do).
+TASK_CALLS = {"BUY": 2, "SELL": 2, "MODIFY_STOP": 1, "RECONCILE_STOPS": 1}
+
+# Priority classes, most urgent first. A task may name its class in
+# task["priority"] (stop hits do); otherwise it follows from the action.
+PRIORITIES = ["stop", "exit", "protect", "reconcile", "entry"]
+ACTION_PRIORITY = {"SELL": "exit", "MODIFY_STOP": "protect", "RECONCILE_STOPS": "reconcile", "BUY": "entry"}
+# Every AGING_SECS a task waits, it is treated as one class more urgent (no starvation).
+# Aging stops at AGING_FLOOR: entries and reconciles never overtake stops, exits or
+# stop modifies, however long they wait; those protective classes don't age at all.
+AGING_SECS = 2.0
+AGING_FLOOR = PRIORITIES.index("reconcile")
+
+
+def priority_of(task):
+    return task.get("priority") or ACTION_PRIORITY.get(task.get("action"), "entry")
+
+
+def symbols_of(task):
+    """Symbols a task holds while it runs: task["symbols"] (baskets) or [task["symbol"]]; None = barrier."""
+    if task.get("symbols"):
+        return task["symbols"]
+    return [task["symbol"]] if task.get("symbol") is not None else None
+
+
+def calls_of(task):
+    return task.get("calls") or TASK_CALLS.get(task.get("action"), 1)
+
+
+class OrderDispatcher:
+    """
+    Runs ExecutionEngine tasks on N worker threads.
+
+    - The next task is the most urgent runnable one: stop hits, then other
+      exits, stop modifies, reconciles, entries; waiting ages an entry up to
+      reconcile level, never past a protective class
+    - Tasks for one symbol run one at a time, in submit order; different
+      symbols run concurrently. A basket task holds all of its symbols
+    - Tasks without a symbol (RECONCILE_STOPS) run alone: once one is the most
+      urgent task, workers let in-flight tasks drain and start nothing less urgent
+    - Each task takes its broker calls' worth of tokens from a shared limiter
+      (core.rate_limit.RateLimiter) right before it runs, so bursts go out as
+      fast as the API quota allows instead of one per fixed sleep
+    """
+
+    def __init__(self, process, workers=4, limiter=None, name="exec", aging_secs=AGING_SECS):
+        self.process = process
+        self.limiter = limiter
+        self.aging_secs = aging_secs
+        self.pending = []          # (seq, rank, submitted_at, task), in submit order
+        self.seq = 0
+        self.busy = set()          # symbols with a task in flight
+        self.exclusive = False     # a barrier task is running
+        self.cond = threading.Condition()
+        self.running = True
+        # Called with each finished task (e.g. the async runtime's state refresh)
+        self.on_done = []
+
+        # Observability
+        self.submitted = 0
+        self.completed = 0
+        self.max_in_flight = 0
+        self.queue_wait = 0.0
+        self.waits = {cls: deque(maxlen=1000) for cls in PRIORITIES}  # seconds queued, by class
+
+        self.threads = [threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True)
+                        for i in range(max(1, workers))]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, task):
+        rank = PRIORITIES.index(priority_of(task)) if priority_of(task) in PRIORITIES else len(PRIORITIES) - 1
+        with self.cond:
+            self.seq += 1
+            self.pending.append((self.seq, rank, time.perf_counter(), task))
+            self.submitted += 1
+            self.cond.notify()
+
+    def _pick(self):
+        """Index of the most urgent runnable pending task (caller holds cond), or None."""
+        if self.exclusive or not self.pending:
+            return None
+        now = time.perf_counter()
+        best, best_key = None, None
+        seen = set()
+        for i, (seq, rank, submitted_at, task) in enumerate(self.pending):
+            symbols = symbols_of(task)
+            if symbols is not None:
+                # Only a symbol's oldest pending task may run (per-symbol order)
+                blocked = any(symbol in seen or symbol in self.busy for symbol in symbols)
+                seen.update(symbols)
+                if blocked:
+                    continue
+            urgency = rank if rank < AGING_FLOOR else max(AGING_FLOOR, rank - (now - submitted_at) / self.aging_secs)
+            key = (urgency, seq)
+            if best_key is None or key < best_key:
+                best, best_key = i, key
+        if best is not None and symbols_of(self.pending[best][3]) is None and self.busy:
+            return None  # drain in-flight tasks first
+        return best
+
+    def _take(self):
+        best = self._pick()
+        if best is None:
+            return None
+        seq, rank, submitted_at, task = self.pending.pop(best)
+        symbols = symbols_of(task)
+        if symbols is None:
+            self.exclusive = True
+        else:
+            self.busy.update(symbols)
+        self.max_in_flight = max(self.max_in_flight, len(self.busy) + self.exclusive)
+        waited = time.perf_counter() - submitted_at
+        self.queue_wait += waited
+        self.waits[PRIORITIES[rank]].append(waited)
+        return task
+
+    def _reserve(self):
+        """Tokens taken before picking a task: enough for any single order, never more than the limiter holds."""
+        reserve = max(TASK_CALLS.values())
+        capacity = getattr(self.limiter, "capacity", None)
+        if capacity is not None:
+            reserve = max(1, min(reserve, int(capacity)))
+        return reserve
+
+    def _worker(self):
+        reserve = self._reserve()
+        while self.running:
+            with self.cond:
+                while self.running and self._pick() is None:
+                    self.cond.wait(1.0)
+            if not self.running:
+                return
+
+            # Quota first, task second: whatever is most urgent when tokens free up goes
+            # next, so a stop hit never waits behind entries already holding tokens
+            try:
+                if self.limiter is not None:
+                    self.limiter.acquire(reserve)
+            except Exception as e:
+                # Never let the worker die: its queued orders (stop exits too) would go unsent
+                print(f"❌ Dispatcher quota error: {e}")
+                time.sleep(1.0)
+                continue
+            with self.cond:
+                task = self._take()
+            if task is None:
+                if self.limiter is not None:
+                    self.limiter.release(reserve)
+                continue
+
+            try:
+                unused = reserve - calls_of(task)
+                if self.limiter is not None and unused > 0:
+                    self.limiter.release(unused)
+                elif self.limiter is not None and unused < 0:
+                    # Baskets (and orders under a tiny quota): the rest of their calls wait
+                    # for quota one at a time, as a big basket may need more than a bucket holds
+                    for _ in range(-unused):
+                        self.limiter.acquire()
+                self.process(task)
+            except Exception as e:
+                print(f"❌ Dispatcher error [{task.get('action')} {task.get('symbol')}]: {e}")
+            finally:
+                with self.cond:
+                    symbols = symbols_of(task)
+                    if symbols is None:
+                        self.exclusive = False
+                    else:
+                        self.busy.difference_update(symbols)
+                    self.completed += 1
+                    self.cond.notify_all()
+                for callback in self.on_done:
+                    try:
+                        callback(task)
+                    except Exception as e:
+                        print(f"❌ Dispatcher on_done error: {e}")
+
+    def join(self, timeout=None):
+        """Waits until everything submitted so far has finished."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while self.pending or self.busy or self.exclusive:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.cond.wait(remaining if remaining is not None else 1.0)
+        return True
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+    def stats(self):
+        done = max(self.completed, 1)
+        stats = {"submitted": self.submitted, "completed": self.completed, "pending": len(self.pending),
+                 "max_in_flight": self.max_in_flight, "avg_queue_wait_ms": round(self.queue_wait / done * 1000, 2),
+                 "rate_wait_s": round(self.limiter.waited, 2) if self.limiter is not None else 0.0}
+        with self.cond:
+            waits = {cls: np.array(w) * 1000 for cls, w in self.waits.items() if w}
+        for cls, w in waits.items():
+            stats[f"wait_{cls}_ms"] = {"n": len(w), "p50": round(float(np.percentile(w, 50)), 2),
+                                       "p99": round(float(np.percentile(w, 99)), 2)}
+        return stats
@@ -0,0 +1,165 @@
+import json
+import threading
+import time
+
+from Upstox.upstox import upstox
+from Upstox.base.constants import Order
+from Upstox.base.constants import Status
+
+try:
+    import upstox_client
+    from upstox_client.feeder.portfolio_data_streamer import PortfolioDataStreamer
+    STREAM_AVAILABLE = True
+except ImportError:
+    STREAM_AVAILABLE = False
+
+TERMINAL = (Status.FILLED, Status.REJECTED, Status.CANCELLED)
+
+
+def parse_update(message):
+    """Portfolio-stream order update (same fields as an orderbook row) -> unified order dict."""
+    try:
+        return upstox._orderbook_json_parser(message)
+    except (KeyError, TypeError, ValueError):
+        # Partial payloads: keep what the confirmation path needs
+        return {
+            Order.ID: message.get("order_id"),
+            Order.STATUS: upstox.resp_status.get(message.get("status"), message.get("status")),
+            Order.AVGPRICE: message.get("average_price"),
+            Order.FILLEDQTY: message.get("filled_quantity"),
+            Order.REJECTREASON: message.get("status_message_raw", message.get("status_message", "")),
+            Order.INFO: message,
+        }
+
+
+class OrderTracker:
+    """
+    Completes orders that were placed without a synchronous fetch_order
+    (upstox.confirm_orders = False returns the placement ack right away).
+
+    - track(order_id, callback): callback(order) runs once, with the unified
+      order dict, when the order reaches FILLED / REJECTED / CANCELLED
+    - Fills normally arrive on the portfolio websocket stream (order updates)
+    - Polling fallback: an order still open `poll_after` seconds after it was
+      tracked (or any order while the stream is down) is fetched every `poll_every`
+    """
+
+    def __init__(self, broker_headers, access_token=None, poll_after=2.0, poll_every=1.0, use_stream=True,
+                 broker=None):
+        self.broker_headers = broker_headers
+        self.broker = broker or upstox
+        self.access_token = access_token
+        self.poll_after = poll_after
+        self.poll_every = poll_every
+        self.use_stream = use_stream and STREAM_AVAILABLE and access_token is not None
+        self.lock = threading.Lock()
+        self.pending = {}     # order_id -> (callback, tracked_at)
+        self.early = {}       # terminal updates that beat track() (stream is faster than the ack)
+        self.stop_event = threading.Event()
+        self.streamer = None
+        self.stream_healthy = False
+
+        # Observability
+        self.confirmed = {"stream": 0, "poll": 0}
+        self.latencies = []   # track() -> terminal status (seconds)
+
+    # --- REGISTRATION ---
+
+    def track(self, order_id, callback):
+        with self.lock:
+            order = self.early.pop(order_id, None)
+            if order is None:
+                self.pending[order_id] = (callback, time.monotonic())
+                return
+        callback(order)
+
+    def _resolve(self, order, source):
+        """Hands a terminal update to its callback (or parks it until track())."""
+        order_id = order.get(Order.ID)
+        if order.get(Order.STATUS) not in TERMINAL:
+            return
+        with self.lock:
+            entry = self.pending.pop(order_id, None)
+            if entry is None:
+                if len(self.early) > 1000:
+                    self.early.clear()
+                self.early[order_id] = order
+                return
+            self.confirmed[source] += 1
+            self.latencies.append(time.monotonic() - entry[1])
+        try:
+            entry[0](order)
+        except Exception as e:
+            print(f"❌ Order confirmation handler failed [{order_id}]: {e}")
+
+    # --- STREAM ---
+
+    def _on_message(self, message):
+        try:
+            if isinstance(message, (bytes, str)):
+                message = json.loads(message)
+            if message.get("update_type", "order") != "order":
+                return
+            # Every order update keeps the driver's open-order cache current (single-request modify)
+            self.broker.cache_order(message)
+            self._resolve(parse_update(message), "stream")
+        except Exception as e:
+            print(f"⚠️ Order Update Parse Error: {e}")
+
+    def _on_open(self):
+        print("📡 Order update stream connected.")
+        self.stream_healthy = True
+
+    def _on_down(self, *args):
+        print(f"🔌 Order update stream down: {args[-1] if args else ''}")
+        self.stream_healthy = False
+
+    def _run_stream(self):
+        config = upstox_client.Configuration()
+        config.access_token = self.access_token
+        self.streamer = PortfolioDataStreamer(upstox_client.ApiClient(config), order_update=True,
+                                              position_update=False, holding_update=False)
+        self.streamer.on("open", self._on_open)
+        self.streamer.on("message", self._on_message)
+        self.streamer.on("error", self._on_down)
+        self.streamer.on("close", self._on_down)
+        self.streamer.connect()
+
+    # --- POLLING FALLBACK ---
+
+    def _poll(self):
+        now = time.monotonic()
+        with self.lock:
+            due = [order_id for order_id, (_, tracked_at) in self.pending.items()
+                   if not self.stream_healthy or now - tracked_at >= self.poll_after]
+        for order_id in due:
+            try:
+                self._resolve(self.broker.fetch_order(order_id=order_id, headers=self.broker_headers), "poll")
+            except Exception as e:
+                print(f"⚠️ Order poll failed [{order_id}]: {e}")
+
+    def _run_poller(self):
+        while not self.stop_event.is_set():
+            self._poll()
+            self.stop_event.wait(self.poll_every)
+
+    def start(self):
+        if hasattr(self.broker, "order_listeners"):
+            # In-process exchange: order updates are pushed straight to us
+            self.broker.order_listeners.append(self._on_message)
+            self.stream_healthy = True
+        elif self.use_stream:
+            threading.Thread(target=self._run_stream, daemon=True).start()
+        else:
+            print("⚠️ Order update stream unavailable; confirming orders by polling.")
+        threading.Thread(target=self._run_poller, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def stats(self):
+        with self.lock:
+            lat = sorted(self.latencies)
+        p50 = round(lat[len(lat) // 2] * 1000, 1) if lat else None
+        return {"pending": len(self.pending), **self.confirmed, "confirm_p50_ms": p50}
@@ -0,0 +1,412 @@
+"""
+In-process paper-trading exchange with the Upstox driver's order interface.
+
+PaperExchange stands in for `upstox` wherever the runtime takes a broker
+(ExecutionEngine, ExchangeStopManager, OrderTracker): the same order calls
+(market / limit / SL / SL-M, basket, modify, cancel) and reads return what
+the driver returns (unified order dicts; raw Upstox position / holding rows in
+the response envelope), with no network.
+
+- Prices come from the feed: register on_ticks as a RobustDataFeed tick
+  listener (live or replayed), or call set_price() directly in load tests
+- An order becomes matchable `latency` seconds after it is placed; market
+  orders and triggered SL-M orders fill at the LTP moved `slippage_bps`
+  against the order, rounded to the tick
+- LIMIT orders rest until the LTP crosses their price (IOC ones cancel
+  instead); SL / SL-M orders rest until the LTP crosses their trigger
+- Orders are kept in Upstox's raw order format and parsed with the driver's
+  own parser; every status change is pushed to `order_listeners` like a
+  portfolio-stream order update (OrderTracker subscribes itself)
+- Matching runs on every tick and before every read; time is the injected
+  clock (core.clock), so replays in lockstep stay deterministic
+
+    PAPER_TRADING=1 PAPER_LATENCY_MS=50 PAPER_SLIPPAGE_BPS=2 python main.py
+"""
+import itertools
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.clock import SYSTEM_CLOCK
+
+from Upstox.upstox import upstox
+from Upstox.base.constants import OrderType
+from Upstox.base.constants import Product
+from Upstox.base.constants import Validity
+from Upstox.base.constants import Variety
+from Upstox.base.constants import Order
+from Upstox.base.errors import InputError
+from Upstox.base.errors import ResponseError
+
+DEFAULT_TICK_SIZE = 0.05
+OPEN_STATUSES = ("open pending", "open", "trigger pending")
+
+
+def round_tick(price, tick_size=DEFAULT_TICK_SIZE):
+    return round(round(price / tick_size) * tick_size, 2)
+
+
+class PaperExchange:
+    """
+    Matching engine for one paper account. Thread-safe: orders may be placed
+    from dispatcher workers while ticks arrive on the feed thread.
+    """
+
+    id = "paper"
+    multi_order_limit = upstox.multi_order_limit
+
+    def __init__(self, latency=0.0, slippage_bps=0.0, tick_size=DEFAULT_TICK_SIZE, clock=None, confirm_orders=True):
+        self.latency = latency
+        self.slippage = slippage_bps / 1e4
+        self.tick_size = tick_size
+        self.clock = clock or SYSTEM_CLOCK
+        # Same meaning as upstox.confirm_orders: order calls wait for the order's state (one `latency`),
+        # or return the PENDING acknowledgement and leave the fill to order updates
+        self.confirm_orders = confirm_orders
+        self.lock = threading.RLock()
+        self.ltps = {}            # trading symbol -> last price
+        self.orders = {}          # order_id -> raw order (Upstox format)
+        self.book = {}            # trading symbol -> {order_id: order} still open (what matching scans)
+        self.active_at = {}       # order_id -> clock time from which it may match
+        # trading symbol -> {product, buy_qty, buy_value, sell_qty, sell_value, exchange, instrument_token}
+        self.positions = {}
+        self.ids = itertools.count(1)
+        self.order_listeners = []
+
+        # Observability
+        self.stats = {"orders": 0, "fills": 0, "rejected": 0, "cancelled": 0, "modified": 0, "slippage_paid": 0.0}
+
+    # --- PRICES ---
+
+    def on_ticks(self, ticks):
+        """RobustDataFeed tick listener: { "NSE_EQ:SYMBOL": ltp }."""
+        updates = []
+        with self.lock:
+            for key, ltp in ticks.items():
+                symbol = key.split(":")[-1]
+                self.ltps[symbol] = ltp
+                updates += self._match(symbol)
+        self._publish(updates)
+
+    def set_price(self, symbol, ltp):
+        self.on_ticks({symbol: ltp})
+
+    # --- ORDER BOOK ---
+
+    def _new_order(self, exchange, symbol, quantity, side, unique_id, order_type, price=0.0, trigger=0.0,
+                   product=Product.MIS, validity=Validity.DAY, variety=Variety.REGULAR, instrument_token=None):
+        order_id = f"PAPER{next(self.ids):08d}"
+        order = {
+            "order_id": order_id,
+            "tag": unique_id,
+            "order_timestamp": self.clock.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "trading_symbol": symbol,
+            "instrument_token": instrument_token or f"{exchange}_EQ|{symbol}",
+            "transaction_type": upstox._key_mapper(upstox.req_side, side, "side"),
+            "order_type": upstox.req_order_type[order_type],
+            "average_price": 0.0,
+            "price": price or 0.0,
+            "trigger_price": trigger or 0.0,
+            "quantity": int(quantity),
+            "filled_quantity": 0,
+            "pending_quantity": int(quantity),
+            "status": "open pending",
+            "status_message_raw": "",
+            "disclosed_quantity": 0,
+            "product": upstox._key_mapper(upstox.req_product, product, "product"),
+            "exchange": exchange,
+            "validity": upstox._key_mapper(upstox.req_validity, validity, "validity"),
+            "variety": variety,
+        }
+        self.stats["orders"] += 1
+        if order["quantity"] <= 0:
+            return self._reject(order, "quantity must be positive")
+        if order_type == OrderType.LIMIT and order["price"] <= 0:
+            return self._reject(order, "limit order without a price")
+        if order_type in (OrderType.SL, OrderType.SLM) and order["trigger_price"] <= 0:
+            return self._reject(order, "stop order without a trigger price")
+        if order_type == OrderType.MARKET and symbol not in self.ltps:
+            return self._reject(order, f"no price for {symbol}")
+
+        if order_type in (OrderType.SL, OrderType.SLM):
+            order["status"] = "trigger pending"
+        self.orders[order_id] = order
+        self.book.setdefault(symbol, {})[order_id] = order
+        self.active_at[order_id] = self.clock.time() + self.latency
+        return order
+
+    def _reject(self, order, reason):
+        order.update(status="rejected", status_message_raw=reason, pending_quantity=0)
+        self.orders[order["order_id"]] = order
+        self.stats["rejected"] += 1
+        return order
+
+    def _fill_price(self, order, ltp):
+        move = ltp * self.slippage
+        return round_tick(ltp + move if order["transaction_type"] == "BUY" else ltp - move, self.tick_size)
+
+    def _close(self, order, **fields):
+        order.update(pending_quantity=0, **fields)
+        self.book.get(order["trading_symbol"], {}).pop(order["order_id"], None)
+        self.active_at.pop(order["order_id"], None)
+
+    def _fill(self, order, price):
+        qty = order["pending_quantity"]
+        self._close(order, status="complete", average_price=price, filled_quantity=order["quantity"])
+        pos = self.positions.setdefault(order["trading_symbol"], {"product": order["product"], "buy_qty": 0,
+                                                                   "buy_value": 0.0, "sell_qty": 0,
+                                                                   "sell_value": 0.0,
+                                                                   "exchange": order["exchange"],
+                                                                   "instrument_token": order["instrument_token"]})
+        side = "buy" if order["transaction_type"] == "BUY" else "sell"
+        pos[f"{side}_qty"] += qty
+        pos[f"{side}_value"] += qty * price
+        self.stats["fills"] += 1
+        self.stats["slippage_paid"] += abs(price - self.ltps[order["trading_symbol"]]) * qty
+
+    def _match(self, symbol):
+        """Fills / triggers every active order on symbol at its LTP; returns the orders that changed."""
+        ltp = self.ltps.get(symbol)
+        if ltp is None:
+            return []
+        now = self.clock.time()
+        changed = []
+        for order_id, order in list(self.book.get(symbol, {}).items()):
+            if self.active_at.get(order_id, 0.0) > now:
+                continue
+            buy = order["transaction_type"] == "BUY"
+            kind = order["order_type"]
+
+            if order["status"] == "trigger pending":
+                trigger = order["trigger_price"]
+                if not (ltp >= trigger if buy else ltp <= trigger):
+                    continue
+                if kind == "SL-M":
+                    self._fill(order, self._fill_price(order, ltp))
+                else:
+                    # SL: the trigger turns it into a resting limit order
+                    order["status"] = "open"
+                    if ltp <= order["price"] if buy else ltp >= order["price"]:
+                        self._fill(order, round_tick(ltp, self.tick_size))
+                changed.append(order)
+            elif kind == "MARKET":
+                self._fill(order, self._fill_price(order, ltp))
+                changed.append(order)
+            elif ltp <= order["price"] if buy else ltp >= order["price"]:
+                # Marketable on arrival fills at the LTP; a resting limit at its own price
+                price = ltp if order["status"] == "open pending" else order["price"]
+                self._fill(order, round_tick(price, self.tick_size))
+                changed.append(order)
+            elif order["validity"] == "IOC":
+                self._close(order, status="cancelled")
+                self.stats["cancelled"] += 1
+                changed.append(order)
+            elif order["status"] == "open pending":
+                order["status"] = "open"
+                changed.append(order)
+        return changed
+
+    def _match_all(self):
+        updates = []
+        with self.lock:
+            for symbol in [symbol for symbol, orders in self.book.items() if orders]:
+                updates += self._match(symbol)
+        self._publish(updates)
+
+    def _publish(self, orders):
+        for order in orders:
+            message = {**order, "update_type": "order"}
+            for listener in self.order_listeners:
+                try:
+                    listener(message)
+                except Exception as e:
+                    print(f"⚠️ Paper order listener failed: {e}")
+
+    def _submit(self, **kwargs):
+        with self.lock:
+            order = self._new_order(**kwargs)
+            updates = [dict(order)] + (self._match(order["trading_symbol"]) if self.latency <= 0 else [])
+        self._publish(updates)
+        if not self.confirm_orders:
+            return {
+                Order.ID: order["order_id"],
+                Order.STATUS: upstox.resp_status.get(order["status"], order["status"]),
+                Order.FILLEDQTY: 0,
+                Order.AVGPRICE: None,
+                Order.REJECTREASON: order["status_message_raw"],
+                Order.INFO: dict(order),
+            }
+        if self.latency > 0 and order["status"] in OPEN_STATUSES:
+            # The synchronous confirm sees the order one latency later, like the driver's fetch_order
+            self.clock.sleep(self.latency)
+        return self.fetch_order(order_id=order["order_id"], headers=None)
+
+    # --- DRIVER INTERFACE: ORDERS ---
+
+    def create_order_eq(self, exchange, symbol, quantity, side, product, validity, variety, unique_id, headers,
+                        price=0.0, trigger=0.0):
+        order_type = (OrderType.SL if price else OrderType.SLM) if trigger else (
+            OrderType.LIMIT if price else OrderType.MARKET)
+        return self._submit(exchange=exchange, symbol=symbol, quantity=quantity, side=side, unique_id=unique_id,
+                            order_type=order_type, price=price, trigger=trigger, product=product,
+                            validity=validity, variety=variety)
+
+    def market_order_eq(self, exchange, symbol, quantity, side, unique_id, headers, product=Product.MIS,
+                        validity=Validity.DAY, variety=Variety.REGULAR):
+        return self._submit(exchange=exchange, symbol=symbol, quantity=quantity, side=side, unique_id=unique_id,
+                            order_type=OrderType.MARKET, product=product, validity=validity, variety=variety)
+
+    def limit_order_eq(self, exchange, symbol, price, quantity, side, unique_id, headers, product=Product.MIS,
+                       validity=Validity.DAY, variety=Variety.REGULAR):
+        return self._submit(exchange=exchange, symbol=symbol, quantity=quantity, side=side, unique_id=unique_id,
+                            order_type=OrderType.LIMIT, price=price, product=product, validity=validity,
+                            variety=variety)
+
+    def sl_order_eq(self, exchange, symbol, price, trigger, quantity, side, unique_id, headers,
+                    product=Product.MIS, validity=Validity.DAY, variety=Variety.STOPLOSS):
+        return self._submit(exchange=exchange, symbol=symbol, quantity=quantity, side=side, unique_id=unique_id,
+                            order_type=OrderType.SL, price=price, trigger=trigger, product=product,
+                            validity=validity, variety=variety)
+
+    def slm_order_eq(self, exchange, symbol, trigger, quantity, side, unique_id, headers, product=Product.MIS,
+                     validity=Validity.DAY, variety=Variety.STOPLOSS):
+        return self._submit(exchange=exchange, symbol=symbol, quantity=quantity, side=side, unique_id=unique_id,
+                            order_type=OrderType.SLM, trigger=trigger, product=product, validity=validity,
+                            variety=variety)
+
+    def basket_order_eq(self, orders, headers):
+        results = []
+        for order in orders:
+            try:
+                results.append(self._submit(
+                    exchange=order["exchange"], symbol=order["symbol"], quantity=order["quantity"],
+                    side=order["side"], unique_id=order["unique_id"],
+                    order_type=order.get("order_type", OrderType.MARKET), price=order.get("price", 0.0),
+                    trigger=order.get("trigger_price", 0.0), product=order.get("product", Product.MIS),
+                    validity=order.get("validity", Validity.DAY), variety=order.get("variety", Variety.REGULAR)))
+            except Exception as e:
+                results.append(upstox._basket_reject_parser(reason=str(e), info={}))
+        return results
+
+    def modify_order(self, order_id, headers, price=None, trigger=None, quantity=None, order_type=None,
+                     validity=None):
+        with self.lock:
+            order = self._open_order(order_id)
+            if price:
+                order["price"] = price
+            if trigger:
+                order["trigger_price"] = trigger
+            if quantity:
+                order["pending_quantity"] += int(quantity) - order["quantity"]
+                order["quantity"] = int(quantity)
+            if order_type:
+                order["order_type"] = upstox._key_mapper(upstox.req_order_type, order_type, "order_type")
+            if validity:
+                order["validity"] = upstox.req_validity.get(validity, order["validity"])
+            self.stats["modified"] += 1
+            updates = [dict(order)] + self._match(order["trading_symbol"])
+        self._publish(updates)
+        return self.fetch_order(order_id=order_id, headers=headers)
+
+    def cancel_order(self, order_id, headers):
+        with self.lock:
+            order = self._open_order(order_id)
+            self._close(order, status="cancelled")
+            self.stats["cancelled"] += 1
+        self._publish([order])
+        return self.fetch_order(order_id=order_id, headers=headers)
+
+    def _open_order(self, order_id):
+        order = self.orders.get(order_id)
+        if order is None:
+            raise InputError({"This order_id does not exist."})
+        if order["status"] not in OPEN_STATUSES:
+            raise ResponseError(f"{self.id} Order is already {order['status']}")
+        return order
+
+    def cache_order(self, order):
+        # Every read is local: there is nothing to cache
+        pass
+
+    # --- DRIVER INTERFACE: READS ---
+
+    def fetch_order(self, order_id, headers):
+        with self.lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                raise InputError({"This order_id does not exist."})
+            updates = self._match(order["trading_symbol"])
+            parsed = upstox._orderbook_json_parser(dict(order))
+        self._publish(updates)
+        return parsed
+
+    def fetch_orderbook(self, headers):
+        self._match_all()
+        with self.lock:
+            return [upstox._orderbook_json_parser(dict(order)) for order in self.orders.values()]
+
+    def fetch_orders(self, headers):
+        return self.fetch_orderbook(headers=headers)
+
+    def fetch_day_positions(self, headers):
+        """Raw Upstox short-term-positions rows, in the driver's response envelope (as upstox returns them)."""
+        with self.lock:
+            rows = []
+            for symbol, pos in self.positions.items():
+                net = pos["buy_qty"] - pos["sell_qty"]
+                ltp = self.ltps.get(symbol, 0.0)
+                pnl = pos["sell_value"] - pos["buy_value"] + net * ltp
+                buy_avg = pos["buy_value"] / pos["buy_qty"] if pos["buy_qty"] else 0.0
+                sell_avg = pos["sell_value"] / pos["sell_qty"] if pos["sell_qty"] else 0.0
+                avg = buy_avg if net > 0 else sell_avg if net < 0 else 0.0
+                # Closed quantity realises at the sell/buy spread, the open rest is marked to the LTP
+                closed = min(pos["buy_qty"], pos["sell_qty"])
+                realised = closed * (sell_avg - buy_avg)
+                rows.append({
+                    "exchange": pos["exchange"],
+                    "instrument_token": pos["instrument_token"],
+                    "tradingsymbol": symbol,
+                    "trading_symbol": symbol,
+                    "product": pos["product"],
+                    "multiplier": 1.0,
+                    "quantity": net,
+                    "average_price": round(avg, 2),
+                    "last_price": ltp,
+                    "value": round(pos["sell_value"] - pos["buy_value"], 2),
+                    "pnl": round(pnl, 2),
+                    "realised": round(realised, 2),
+                    "unrealised": round(pnl - realised, 2),
+                    "buy_price": round(buy_avg, 2),
+                    "buy_value": round(pos["buy_value"], 2),
+                    "sell_price": round(sell_avg, 2),
+                    "sell_value": round(pos["sell_value"], 2),
+                    "day_buy_quantity": pos["buy_qty"],
+                    "day_buy_price": round(buy_avg, 2),
+                    "day_buy_value": round(pos["buy_value"], 2),
+                    "day_sell_quantity": pos["sell_qty"],
+                    "day_sell_price": round(sell_avg, 2),
+                    "day_sell_value": round(pos["sell_value"], 2),
+                    "overnight_quantity": 0,
+                    "overnight_buy_quantity": 0,
+                    "overnight_buy_amount": 0.0,
+                    "overnight_sell_quantity": 0,
+                    "overnight_sell_amount": 0.0,
+                })
+        return {"status": "success", "data": rows}
+
+    def fetch_net_positions(self, headers):
+        return self.fetch_day_positions(headers=headers)
+
+    def fetch_positions(self, headers):
+        return self.fetch_day_positions(headers=headers)
+
+    def fetch_holdings(self, headers):
+        # A paper session starts flat: nothing was delivered on a previous day
+        return {"status": "success", "data": []}
+
+    def summary(self):
+        with self.lock:
+            open_orders = sum(len(orders) for orders in self.book.values())
+        return {**self.stats, "slippage_paid": round(self.stats["slippage_paid"], 2), "open_orders": open_orders}
@@ -0,0 +1,236 @@
+import zlib
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+from core.indicators import IndicatorGraph
+
+MAX_BARS = 5000  # Same cap RobustDataFeed keeps per symbol
+
+# --- PARTITIONING ---
+
+def assign_workers(symbols, n_workers):
+    """
+    Deterministic symbol -> worker assignment.
+    crc32 (unlike hash()) is stable across processes and restarts, so a symbol
+    always lands on the same worker and its strategy state stays in one place.
+    """
+    parts = [[] for _ in range(n_workers)]
+    for symbol in symbols:
+        parts[zlib.crc32(symbol.encode()) % n_workers].append(symbol)
+    return parts
+
+
+# --- SHARED MEMORY BARS ---
+
+class SharedBars:
+    """
+    Fixed-size shared-memory block holding the latest 1m bars of every symbol.
+
+    Layout (one block each):
+        ts   int64   [n_symbols, MAX_BARS]      bar open time (ns since epoch)
+        ohlc float64 [n_symbols, MAX_BARS, 4]  Open, High, Low, Close
+        meta int64   [n_symbols, 2]             [length, version]
+
+    The coordinator writes a slot only when the symbol's frame changed (version
+    bump); workers read it between evaluate() calls and never write.
+    """
+
+    def __init__(self, n_symbols, max_bars=MAX_BARS, names=None):
+        self.n_symbols = n_symbols
+        self.max_bars = max_bars
+        shapes = {
+            "ts": ((n_symbols, max_bars), np.int64),
+            "ohlc": ((n_symbols, max_bars, 4), np.float64),
+            "meta": ((n_symbols, 2), np.int64),
+        }
+        self.owner = names is None
+        self.blocks = {}
+        self.arrays = {}
+        for key, (shape, dtype) in shapes.items():
+            size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            if self.owner:
+                shm = shared_memory.SharedMemory(create=True, size=size)
+            else:
+                # Workers share the owner's resource tracker, so attaching is a no-op there;
+                # only the owner unlinks.
+                shm = shared_memory.SharedMemory(name=names[key])
+            self.blocks[key] = shm
+            self.arrays[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        if self.owner:
+            self.arrays["meta"][:] = 0
+
+    @property
+    def names(self):
+        return {key: shm.name for key, shm in self.blocks.items()}
+
+    def write(self, slot, df):
+        """Copies the tail of a 1m OHLC frame into slot and bumps its version."""
+        df = df.iloc[-self.max_bars:]
+        n = len(df)
+        self.arrays["ts"][slot, :n] = df.index.values.astype('datetime64[ns]').astype(np.int64)
+        self.arrays["ohlc"][slot, :n] = df[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=np.float64)
+        self.arrays["meta"][slot, 0] = n
+        self.arrays["meta"][slot, 1] += 1
+
+    def version(self, slot):
+        return int(self.arrays["meta"][slot, 1])
+
+    def read(self, slot):
+        n = int(self.arrays["meta"][slot, 0])
+        if n == 0:
+            return None
+        index = pd.DatetimeIndex(self.arrays["ts"][slot, :n].astype('datetime64[ns]'))
+        return pd.DataFrame(self.arrays["ohlc"][slot, :n].copy(), index=index,
+                            columns=['Open', 'High', 'Low', 'Close'])
+
+    def close(self):
+        self.arrays = {}
+        for shm in self.blocks.values():
+            shm.close()
+            if self.owner:
+                shm.unlink()
+        self.blocks = {}
+
+
+# --- WORKER ---
+
+def _worker_main(conn, names, n_symbols, max_bars, slots, strategy_cls, timeframe):
+    bars = SharedBars(n_symbols, max_bars, names=names)
+    graph = IndicatorGraph()
+    strategies = {}
+    for symbol in slots:
+        strategies[symbol] = strategy_cls(symbol)
+        strategies[symbol].bind_indicators(graph, timeframe)
+    resampled = {}  # { symbol: (version, df) } - resample only when the bars changed
+
+    while True:
+        msg = conn.recv()
+        if msg[0] == "stop":
+            break
+
+        signals = []
+        for symbol, ltp, current_qty, entry_price in msg[1]:
+            try:
+                slot = slots[symbol]
+                version = bars.version(slot)
+                cached = resampled.get(symbol)
+                if cached is None or cached[0] != version:
+                    df = bars.read(slot)
+                    if df is not None:
+                        df = df.resample(timeframe).agg(
+                            {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}).dropna()
+                    cached = (version, df)
+                    resampled[symbol] = cached
+                df = cached[1]
+                if ltp == 0 or df is None:
+                    continue
+
+                strategy = strategies[symbol]
+                action, reason = strategy.on_tick(ltp, current_qty, entry_price)
+                # on_tick exits are trailing-stop hits; the coordinator queues them as stops
+                stop_hit = action == "SELL"
+                if action is None:
+                    action, reason = strategy.on_candle_closed(df, ltp, current_qty, entry_price)
+                elif action == "SELL":
+                    # Main loop still runs candle logic after a stop to keep the trail current
+                    strategy.on_candle_closed(df, ltp, current_qty, entry_price)
+
+                signals.append((symbol, action, reason, strategy.trailing_stop,
+                                getattr(strategy, 'current_rsi', 0.0), stop_hit))
+            except Exception as e:
+                print(f"⚠️ Strategy processing error for {symbol}: {e}")
+
+        conn.send(signals)
+
+    bars.close()
+    conn.close()
+
+
+# --- COORDINATOR ---
+
+class ParallelEvaluator:
+    """
+    Evaluates strategies for a large universe across worker processes.
+
+    Symbols are partitioned deterministically (assign_workers); each worker owns
+    the strategy objects for its partition, reads bars from SharedBars and
+    returns only (symbol, action, reason, stop_level, rsi, stop_hit) tuples, so the
+    coordinator's GIL is left to the feed callback and the execution worker.
+    """
+
+    def __init__(self, symbols, strategy_cls, timeframe='3min', n_workers=2, max_bars=MAX_BARS):
+        self.symbols = list(symbols)
+        self.slot_of = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.bars = SharedBars(len(self.symbols), max_bars)
+        self.partitions = [p for p in assign_workers(self.symbols, n_workers) if p]
+        self.worker_of = {}
+        self._written = {}  # { symbol: (len, last_ts, last_close) } of the frame last copied in
+
+        # fork keeps startup cheap and avoids re-importing main.py in every worker.
+        # Create the evaluator before any threads (feed, execution worker) start.
+        try:
+            ctx = mp.get_context("fork")
+        except ValueError:
+            ctx = mp.get_context()
+
+        self.conns = []
+        self.procs = []
+        for i, part in enumerate(self.partitions):
+            parent_conn, child_conn = ctx.Pipe()
+            slots = {symbol: self.slot_of[symbol] for symbol in part}
+            proc = ctx.Process(
+                target=_worker_main,
+                args=(child_conn, self.bars.names, len(self.symbols), max_bars, slots, strategy_cls, timeframe),
+                daemon=True,
+            )
+            proc.start()
+            child_conn.close()
+            self.conns.append(parent_conn)
+            self.procs.append(proc)
+            for symbol in part:
+                self.worker_of[symbol] = i
+
+        print(f"🧮 Parallel Evaluator: {len(self.symbols)} symbols across {len(self.procs)} workers.")
+
+    def publish(self, symbol, df):
+        """Copies a symbol's 1m frame into shared memory if it changed since the last publish."""
+        if df is None or df.empty:
+            return
+        marker = (len(df), df.index[-1], df['Close'].iloc[-1])
+        if self._written.get(symbol) == marker:
+            return
+        self.bars.write(self.slot_of[symbol], df)
+        self._written[symbol] = marker
+
+    def evaluate(self, requests):
+        """
+        requests: list of (symbol, ltp, current_qty, entry_price)
+        Returns: list of (symbol, action, reason, stop_level, rsi, stop_hit) for every evaluated symbol
+        (stop_hit: the SELL came from on_tick, i.e. a trailing-stop exit).
+        """
+        batches = [[] for _ in self.conns]
+        for req in requests:
+            batches[self.worker_of[req[0]]].append(req)
+
+        busy = []
+        for conn, batch in zip(self.conns, batches):
+            if batch:
+                conn.send(("eval", batch))
+                busy.append(conn)
+
+        signals = []
+        for conn in busy:
+            signals.extend(conn.recv())
+        return signals
+
+    def close(self):
+        for conn in self.conns:
+            try:
+                conn.send(("stop",))
+            except Exception:
+                pass
+        for proc in self.procs:
+            proc.join(timeout=5)
+        self.bars.close()
@@ -0,0 +1,107 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens/second refill, bursts up to `capacity`.
+
+    acquire() blocks until a token is free (or `timeout` passes -> False);
+    try_acquire() never blocks. Asking for more than `capacity` tokens at once
+    raises ValueError (it could never be granted). Waiters sleep exactly until the next token is
+    due instead of polling on a fixed interval.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        # Observability
+        self.granted = 0
+        self.waited = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _reserve(self, n):
+        """Takes n tokens now, or returns how long until they are available."""
+        if n > self.capacity:
+            # The bucket can never hold n tokens: acquire() would wait forever
+            raise ValueError(f"cannot take {n} tokens from a bucket of capacity {self.capacity:g}")
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= n:
+                self.tokens -= n
+                self.granted += n
+                return 0.0
+            return (n - self.tokens) / self.rate
+
+    def try_acquire(self, n=1):
+        return self._reserve(n) == 0.0
+
+    def acquire(self, n=1, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._reserve(n)
+            if wait == 0.0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            self.waited += wait
+            time.sleep(wait)
+
+
+class RateLimiter:
+    """
+    Several buckets that must all grant, e.g. 25/sec AND 250/min.
+    limits: [(count, per_seconds), ...]
+    """
+
+    def __init__(self, limits):
+        self.buckets = [TokenBucket(count / per, capacity=count) for count, per in limits]
+
+    @staticmethod
+    def _refund(buckets, n=1):
+        for bucket in buckets:
+            with bucket.lock:
+                bucket.tokens = min(bucket.capacity, bucket.tokens + n)
+                bucket.granted -= n
+
+    def _check(self, n):
+        # Before any bucket grants: a later bucket refusing n outright would strand the earlier tokens
+        if n > self.capacity:
+            raise ValueError(f"cannot take {n} tokens from a limiter of capacity {self.capacity:g}")
+
+    def try_acquire(self, n=1):
+        self._check(n)
+        for i, bucket in enumerate(self.buckets):
+            if not bucket.try_acquire(n):
+                # A refusal must not burn the tokens the earlier buckets granted
+                self._refund(self.buckets[:i], n)
+                return False
+        return True
+
+    def acquire(self, n=1, timeout=None):
+        self._check(n)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for i, bucket in enumerate(self.buckets):
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not bucket.acquire(n, timeout=remaining):
+                self._refund(self.buckets[:i], n)
+                return False
+        return True
+
+    def release(self, n=1):
+        """Returns tokens acquired but not used."""
+        self._refund(self.buckets, n)
+
+    @property
+    def capacity(self):
+        """Most tokens one acquire() can ask for (the smallest bucket)."""
+        return min(b.capacity for b in self.buckets)
+
+    @property
+    def waited(self):
+        return sum(b.waited for b in self.buckets)
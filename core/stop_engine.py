@@ -0,0 +1,71 @@
+import threading
+import numpy as np
+
+class StopEngine:
+    """
+    Tick-driven trailing-stop monitor for every held symbol.
+
+    Stops live in a numpy array aligned slot-for-slot with an LTP array. The
+    feed calls on_ticks() from its message callback with each batch of new
+    prices, and the whole book is checked with one vectorized `ltp <= stop`
+    compare, so stop detection no longer waits for the main loop to reach the
+    symbol. Each hit disarms its slot and is handed to on_stop(symbol, ltp, stop, qty).
+
+    The main loop keeps the stops current via set_stop()/clear() after each
+    candle evaluation (the strategy still owns the trailing logic).
+    """
+
+    def __init__(self, symbols, on_stop):
+        self.symbols = list(symbols)
+        self.slot_of = {symbol: i for i, symbol in enumerate(self.symbols)}
+        n = len(self.symbols)
+        self.ltps = np.zeros(n, dtype=np.float64)
+        self.stops = np.zeros(n, dtype=np.float64)
+        self.qtys = np.zeros(n, dtype=np.int64)
+        self.armed = np.zeros(n, dtype=bool)
+        self.on_stop = on_stop
+        self.lock = threading.Lock()
+
+    def set_stop(self, symbol, stop, qty):
+        """Arms (or ratchets) the stop for a held position."""
+        slot = self.slot_of[symbol]
+        with self.lock:
+            if qty > 0 and stop > 0:
+                self.stops[slot] = stop
+                self.qtys[slot] = qty
+                self.armed[slot] = True
+            else:
+                self.armed[slot] = False
+
+    def clear(self, symbol):
+        slot = self.slot_of[symbol]
+        with self.lock:
+            self.armed[slot] = False
+            self.stops[slot] = 0.0
+            self.qtys[slot] = 0
+
+    def on_ticks(self, ticks):
+        """
+        ticks: { symbol: ltp } for one feed message.
+        Returns the list of (symbol, ltp, stop, qty) hits it dispatched.
+        """
+        with self.lock:
+            for symbol, ltp in ticks.items():
+                slot = self.slot_of.get(symbol)
+                if slot is not None:
+                    self.ltps[slot] = ltp
+
+            hit_slots = np.flatnonzero(self.armed & (self.ltps > 0) & (self.ltps <= self.stops))
+            hits = []
+            for slot in hit_slots:
+                # Disarm first so the next tick cannot fire the same stop again
+                self.armed[slot] = False
+                hits.append((self.symbols[slot], float(self.ltps[slot]),
+                             float(self.stops[slot]), int(self.qtys[slot])))
+
+        for symbol, ltp, stop, qty in hits:
+            try:
+                self.on_stop(symbol, ltp, stop, qty)
+            except Exception as e:
+                print(f"⚠️ Stop dispatch error for {symbol}: {e}")
+        return hits
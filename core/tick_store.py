@@ -0,0 +1,268 @@
+"""
+Compressed per-symbol daily tick store with time-range queries.
+
+    <root>/<SYMBOL>/<YYYY-MM-DD>.tks   compressed chunks, back to back
+    <root>/<SYMBOL>/<YYYY-MM-DD>.idx   one fixed-width entry per chunk (CHUNK_DTYPE)
+
+A chunk holds up to CHUNK_TICKS ticks of one symbol. Timestamps (int64 ns,
+IST wall time, as in the data lake and backtest.tick_engine) and prices
+(int32 paise) are delta-encoded, byte-shuffled and zlib-compressed
+separately; the first value of each column sits in the index entry. A range
+query reads only the index and the chunks overlapping the range.
+
+    store = TickStore("tick_store")
+    data_feed.tick_listeners.append(store.on_ticks)      # live capture (TICK_STORE=1 in main.py)
+    ts, ltp = store.query("NSE_EQ:MARUTI", "2025-01-02 13:30", "2025-01-02 13:45")
+
+    python -m core.tick_store --root tick_store --symbol NSE_EQ:MARUTI --from "2025-01-02 13:30" --to "2025-01-02 13:45"
+"""
+import argparse
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+CHUNK_TICKS = 4096
+# Partial chunks are written out at least this often, so a crash loses little
+FLUSH_SECS = 30.0
+DAY_NS = 86400 * 10**9
+CHUNK_DTYPE = np.dtype([('first_ts', '<i8'), ('last_ts', '<i8'), ('first_price', '<i4'), ('count', '<u4'),
+                        ('offset', '<i8'), ('ts_bytes', '<u4'), ('price_bytes', '<u4')])
+
+
+# --- CODEC ---
+
+def _pack(values, dtype):
+    """Delta + byte-shuffle + zlib. values: integer array, first element excluded from the deltas."""
+    deltas = np.diff(values).astype(dtype)
+    shuffled = deltas.view(np.uint8).reshape(-1, deltas.itemsize).T.tobytes()
+    return zlib.compress(shuffled, 6)
+
+
+def _unpack(blob, first, count, dtype):
+    width = np.dtype(dtype).itemsize
+    raw = np.frombuffer(zlib.decompress(blob), dtype=np.uint8).reshape(width, count - 1)
+    deltas = np.ascontiguousarray(raw.T).view(dtype).ravel()
+    values = np.empty(count, dtype=np.int64)
+    values[0] = first
+    np.cumsum(deltas, out=values[1:])
+    values[1:] += first
+    return values
+
+
+def encode_chunk(ts, paise):
+    """-> (index entry without offset, ts blob, price blob)."""
+    entry = np.zeros(1, dtype=CHUNK_DTYPE)
+    entry['first_ts'], entry['last_ts'] = ts[0], ts[-1]
+    entry['first_price'], entry['count'] = paise[0], len(ts)
+    # Gaps between ticks fit in int64 ns; paise moves between ticks fit in int32
+    ts_blob = _pack(ts, np.int64)
+    price_blob = _pack(paise.astype(np.int64), np.int32)
+    entry['ts_bytes'], entry['price_bytes'] = len(ts_blob), len(price_blob)
+    return entry, ts_blob, price_blob
+
+
+def decode_chunk(entry, data):
+    count = int(entry['count'])
+    ts_bytes = int(entry['ts_bytes'])
+    ts = _unpack(data[:ts_bytes], int(entry['first_ts']), count, np.int64)
+    paise = _unpack(data[ts_bytes:], int(entry['first_price']), count, np.int32)
+    return ts, paise
+
+
+def wall_ns(value):
+    """datetime / str / Timestamp -> int64 ns on the store's wall-time axis."""
+    return pd.Timestamp(value).value
+
+
+# --- STORE ---
+
+class TickStore:
+    """
+    Append side buffers ticks per symbol and writes whole chunks; query side
+    reads straight from disk. One writer process per root.
+    """
+
+    def __init__(self, root="tick_store", chunk_ticks=CHUNK_TICKS, flush_secs=FLUSH_SECS, now=datetime.now):
+        self.root = root
+        self.chunk_ticks = chunk_ticks
+        self.flush_secs = flush_secs
+        self.now = now
+        self.lock = threading.Lock()
+        self.buffers = {}      # symbol -> ([ts], [paise], opened_at)
+        self.stats = {"ticks": 0, "chunks": 0, "bytes": 0}
+        os.makedirs(root, exist_ok=True)
+
+    def _paths(self, symbol, day):
+        folder = os.path.join(self.root, symbol.split(":")[-1])
+        return os.path.join(folder, f"{day}.tks"), os.path.join(folder, f"{day}.idx")
+
+    @staticmethod
+    def _day(ns):
+        return str(np.datetime64(ns // DAY_NS, 'D'))
+
+    # --- WRITE ---
+
+    def on_ticks(self, ticks):
+        """RobustDataFeed tick listener: { symbol: ltp } stamped with the feed clock."""
+        ns = wall_ns(self.now())
+        for symbol, ltp in ticks.items():
+            self.append(symbol, ns, ltp)
+        # Symbols that stopped ticking still get their partial chunk out on time
+        self.flush_aged()
+
+    def append(self, symbol, ts_ns, ltp):
+        paise = int(round(ltp * 100))
+        with self.lock:
+            buf = self.buffers.get(symbol)
+            if buf is not None and buf[0] and self._day(buf[0][-1]) != self._day(ts_ns):
+                self._flush(symbol)
+                buf = None
+            if buf is None:
+                buf = self.buffers[symbol] = ([], [], time.monotonic())
+            buf[0].append(ts_ns)
+            buf[1].append(paise)
+            self.stats["ticks"] += 1
+            if len(buf[0]) >= self.chunk_ticks or time.monotonic() - buf[2] > self.flush_secs:
+                self._flush(symbol)
+
+    def write(self, symbol, ts, ltp):
+        """Bulk write of already-collected ticks (e.g. from a .ticks file or a feed log)."""
+        ts = np.asarray(ts).astype('datetime64[ns]').view(np.int64)
+        paise = np.rint(np.asarray(ltp, dtype=np.float64) * 100).astype(np.int64)
+        order = np.argsort(ts, kind='stable')
+        ts, paise = ts[order], paise[order]
+        days = ts // DAY_NS
+        bounds = np.flatnonzero(np.diff(days)) + 1
+        with self.lock:
+            for d_ts, d_paise in zip(np.split(ts, bounds), np.split(paise, bounds)):
+                for i in range(0, len(d_ts), self.chunk_ticks):
+                    self._write_chunk(symbol, d_ts[i:i + self.chunk_ticks], d_paise[i:i + self.chunk_ticks])
+                self.stats["ticks"] += len(d_ts)
+
+    def _flush(self, symbol):
+        buf = self.buffers.pop(symbol, None)
+        if buf and buf[0]:
+            self._write_chunk(symbol, np.array(buf[0], dtype=np.int64), np.array(buf[1], dtype=np.int64))
+
+    def _write_chunk(self, symbol, ts, paise):
+        data_path, idx_path = self._paths(symbol, self._day(int(ts[0])))
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        entry, ts_blob, price_blob = encode_chunk(ts, paise)
+        with open(data_path, 'ab') as f:
+            entry['offset'] = f.tell()
+            f.write(ts_blob)
+            f.write(price_blob)
+        # Index entry last: a crash between the two leaves an unindexed tail, never a bad entry
+        with open(idx_path, 'ab') as f:
+            f.write(entry.tobytes())
+        self.stats["chunks"] += 1
+        self.stats["bytes"] += len(ts_blob) + len(price_blob) + CHUNK_DTYPE.itemsize
+
+    def flush_aged(self):
+        """Writes out every buffer older than flush_secs, whichever symbol it belongs to."""
+        cutoff = time.monotonic() - self.flush_secs
+        with self.lock:
+            for symbol in [s for s, buf in self.buffers.items() if buf[2] < cutoff]:
+                self._flush(symbol)
+
+    def flush(self):
+        with self.lock:
+            for symbol in list(self.buffers):
+                self._flush(symbol)
+
+    def close(self):
+        self.flush()
+
+    # --- READ ---
+
+    def days(self, symbol):
+        folder = os.path.join(self.root, symbol.split(":")[-1])
+        if not os.path.isdir(folder):
+            return []
+        return sorted(name[:-4] for name in os.listdir(folder) if name.endswith(".idx"))
+
+    def index(self, symbol, day):
+        _, idx_path = self._paths(symbol, day)
+        return np.fromfile(idx_path, dtype=CHUNK_DTYPE) if os.path.exists(idx_path) else np.zeros(0, CHUNK_DTYPE)
+
+    def query(self, symbol, start=None, end=None):
+        """(ts int64 ns, ltp float64) for start <= ts < end; open ends cover everything stored."""
+        lo = wall_ns(start) if start is not None else None
+        hi = wall_ns(end) if end is not None else None
+        days = self.days(symbol)
+        if lo is not None:
+            days = [d for d in days if d >= self._day(lo)]
+        if hi is not None:
+            days = [d for d in days if d <= self._day(hi - 1)]
+
+        ts_parts, paise_parts = [], []
+        for day in days:
+            entries = self.index(symbol, day)
+            mask = np.ones(len(entries), dtype=bool)
+            if lo is not None:
+                mask &= entries['last_ts'] >= lo
+            if hi is not None:
+                mask &= entries['first_ts'] < hi
+            if not mask.any():
+                continue
+            data_path, _ = self._paths(symbol, day)
+            with open(data_path, 'rb') as f:
+                for entry in entries[mask]:
+                    f.seek(int(entry['offset']))
+                    ts, paise = decode_chunk(entry, f.read(int(entry['ts_bytes']) + int(entry['price_bytes'])))
+                    ts_parts.append(ts)
+                    paise_parts.append(paise)
+
+        if not ts_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        ts = np.concatenate(ts_parts)
+        paise = np.concatenate(paise_parts)
+        # Chunks of one day are time-ordered unless the clock stepped back; keep order stable
+        if len(ts) > 1 and (np.diff(ts) < 0).any():
+            order = np.argsort(ts, kind='stable')
+            ts, paise = ts[order], paise[order]
+        keep = np.ones(len(ts), dtype=bool)
+        if lo is not None:
+            keep &= ts >= lo
+        if hi is not None:
+            keep &= ts < hi
+        return ts[keep], paise[keep] / 100.0
+
+    def disk_usage(self, symbol=None):
+        """Bytes on disk (one symbol or the whole store)."""
+        folder = os.path.join(self.root, symbol.split(":")[-1]) if symbol else self.root
+        total = 0
+        for dirpath, _, files in os.walk(folder):
+            total += sum(os.path.getsize(os.path.join(dirpath, name)) for name in files)
+        return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the compressed tick store.")
+    parser.add_argument("--root", default="tick_store")
+    parser.add_argument("--symbol", required=True)
+    parser.add_argument("--from", dest="start")
+    parser.add_argument("--to", dest="end")
+    parser.add_argument("--out", help="write the ticks to a backtest.tick_engine .ticks file")
+    args = parser.parse_args()
+
+    store = TickStore(args.root)
+    started = time.perf_counter()
+    ts, ltp = store.query(args.symbol, args.start, args.end)
+    elapsed = time.perf_counter() - started
+    print(f"✅ {len(ts):,} ticks for {args.symbol} in {elapsed * 1000:.1f}ms "
+          f"({store.disk_usage(args.symbol) / 1024 / 1024:.1f} MB on disk over {len(store.days(args.symbol))} days)")
+    if len(ts):
+        print(f"   {pd.Timestamp(ts[0])} -> {pd.Timestamp(ts[-1])} | low {ltp.min():.2f} high {ltp.max():.2f}")
+    if args.out:
+        from backtest.tick_engine import write_ticks
+        write_ticks(args.out, ts, ltp)
+        print(f"   -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,12 @@
-
 import os
 import time
 import math
 import random
 import json
-import queue
 import threading
 import shutil
 import traceback
+from contextlib import nullcontext
 from datetime import datetime
 from dotenv import load_dotenv
 import ssl
@@ -22,18 +21,86 @@ else:
 # Local Imports
 from Upstox.upstox import upstox
 from core.data_feed import RobustDataFeed
+from core.indicators import IndicatorGraph
+from core.parallel_eval import ParallelEvaluator
+from core.stop_engine import StopEngine
+from core.exchange_stops import ExchangeStopManager
+from core.async_runtime import AsyncRuntime
+from core.clock import SYSTEM_CLOCK, SimulatedClock
+from core.order_dispatch import OrderDispatcher
+from core.order_dispatch import PRIORITIES
+from core.order_dispatch import priority_of
+from core.order_dispatch import calls_of
+from core.order_tracker import OrderTracker
+from core.paper_exchange import PaperExchange
+from core.rate_limit import RateLimiter
+from core.feed_recorder import FeedRecorder, ReplayFeed
+from core.tick_store import TickStore
 from Strategies.rsi_chandelier_tight import RSIChandelierStrategy
 from trade_logger import TradeRecorder
 from Upstox.base.constants import ExchangeCode
 from Upstox.base.constants import Product
 from Upstox.base.constants import Validity
 from Upstox.base.constants import Side
+from Upstox.base.constants import Status
+from Upstox.base.constants import Order
 
 # --- CONFIGURATION ---
 load_dotenv()
 API_TOKEN = os.getenv("UPSTOX_PROD_TOKEN") 
 SANDBOX_TOKEN = os.getenv("UPSTOX_SANDBOX_TOKEN")
 ALLOCATED_CAPITAL = float(os.getenv("ALLOCATED_CAPITAL", 100000))
+TIMEFRAME = '3min'
+# Number of strategy worker processes (0 = evaluate in the main loop)
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", 0))
+# Check trailing stops on every websocket tick instead of once per main-loop pass
+TICK_STOPS = os.getenv("TICK_STOPS", "1") == "1"
+# "client": stops are checked locally and exited with a market order
+# "exchange": an SL-M order rests at the exchange and is trailed with modify_order
+STOP_MODE = os.getenv("STOP_MODE", "client")
+STOP_RECONCILE_SECS = float(os.getenv("STOP_RECONCILE_SECS", 5))
+# "threaded": 0.5s polling main loop | "async": event-driven asyncio runtime
+RUNTIME = os.getenv("RUNTIME", "threaded")
+# Append every feed message and REST candle frame to FEED_LOG_DIR/<date>.feed
+RECORD_FEED = os.getenv("RECORD_FEED", "0") == "1"
+FEED_LOG_DIR = os.getenv("FEED_LOG_DIR", "feed_logs")
+# Order dispatch: parallel workers (one task per symbol at a time) under the broker's order-rate quota
+ORDER_WORKERS = int(os.getenv("ORDER_WORKERS", 4))
+ORDER_RATE_LIMITS = [(int(os.getenv("ORDER_RATE_PER_SEC", 10)), 1.0),
+                     (int(os.getenv("ORDER_RATE_PER_MIN", 250)), 60.0)]
+# Broker quotas per endpoint family, enforced on every HTTP call from every thread
+# (the order family also paces the order dispatcher; baskets use the multi-order quota)
+BROKER_RATE_LIMITS = {
+    "orders": ORDER_RATE_LIMITS,
+    "basket": [(int(os.getenv("BASKET_RATE_PER_SEC", 4)), 1.0), (int(os.getenv("BASKET_RATE_PER_MIN", 40)), 60.0)],
+    "history": [(int(os.getenv("HISTORY_RATE_PER_SEC", 25)), 1.0), (int(os.getenv("HISTORY_RATE_PER_MIN", 250)), 60.0)],
+    "quotes": [(int(os.getenv("QUOTE_RATE_PER_SEC", 25)), 1.0), (int(os.getenv("QUOTE_RATE_PER_MIN", 250)), 60.0)],
+    "portfolio": [(int(os.getenv("PORTFOLIO_RATE_PER_SEC", 10)), 1.0), (int(os.getenv("PORTFOLIO_RATE_PER_MIN", 250)), 60.0)],
+}
+# "block": calls over quota wait for a token | "reject": they raise RateLimitError
+BROKER_RATE_MODE = os.getenv("BROKER_RATE_MODE", "block")
+# Collect BUY/SELL orders arriving within ORDER_BASKET_MS into one multi-order request (0 = off)
+ORDER_BASKET_MS = int(os.getenv("ORDER_BASKET_MS", 0))
+# Re-open idle broker connections every BROKER_KEEPALIVE_SECS so orders never pay connection setup (0 = off)
+BROKER_KEEPALIVE_SECS = float(os.getenv("BROKER_KEEPALIVE_SECS", 30))
+# Return from order calls on the placement ack; fills arrive on the order-update stream (polling fallback)
+ASYNC_CONFIRM = os.getenv("ASYNC_CONFIRM", "0") == "1"
+# Trade against the in-process paper exchange (fills at the feed's LTP) instead of the broker
+PAPER_TRADING = os.getenv("PAPER_TRADING", "0") == "1"
+PAPER_LATENCY_MS = int(os.getenv("PAPER_LATENCY_MS", 0))
+PAPER_SLIPPAGE_BPS = float(os.getenv("PAPER_SLIPPAGE_BPS", 0))
+# Point REST, the market feed and the order driver at another Upstox API host (core.mock_upstox load tests)
+UPSTOX_API_BASE = os.getenv("UPSTOX_API_BASE")
+# JSON symbol map ({ "NSE_EQ:SYMBOL": "NSE_EQ|KEY" }) replacing SYMBOLS_MAP below
+SYMBOLS_FILE = os.getenv("SYMBOLS_FILE")
+# Keep every tick in the compressed per-symbol daily store under TICK_STORE_DIR
+TICK_STORE = os.getenv("TICK_STORE", "0") == "1"
+TICK_STORE_DIR = os.getenv("TICK_STORE_DIR", "tick_store")
+# Drive the system from a recorded .feed log instead of Upstox market data
+# (speed: 1 = real time, N = N x faster, 0 = lockstep / as fast as possible)
+REPLAY_LOG = os.getenv("REPLAY_LOG")
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", 0))
+REPLAY_START = os.getenv("REPLAY_START")  # e.g. "2025-01-02 13:30"; warmup still uses earlier candles
 
 # Define your Universe here
 SYMBOLS_MAP = {
@@ -89,6 +156,18 @@ SYMBOLS_MAP = {
     # Add more symbols here
 }
 
+if SYMBOLS_FILE:
+    with open(SYMBOLS_FILE) as f:
+        SYMBOLS_MAP = json.load(f)
+    print(f"📄 Universe: {len(SYMBOLS_MAP)} symbols from {SYMBOLS_FILE}")
+
+if UPSTOX_API_BASE:
+    # Any token works against a stand-in server
+    API_TOKEN = API_TOKEN or "mock"
+    SANDBOX_TOKEN = SANDBOX_TOKEN or "mock"
+    upstox.use_base_url(UPSTOX_API_BASE, assets_base=UPSTOX_API_BASE)
+    print(f"🧪 Upstox API base: {UPSTOX_API_BASE}")
+
 # --- MONKEY PATCH: FORCE V3 PRODUCTION URLS ---
 # Since we cannot edit upstox.py, we overwrite the URLs here at runtime.
 print("🔧 Patching Upstox Driver to V3 Production...")
@@ -99,19 +178,26 @@ print("🔧 Patching Upstox Driver to V3 Production...")
 # Defining a Class which will store different symbols, allocated percentage capital and finally place trades
 
 class TradeManager:
-    def __init__(self, state_file="trade_state.json"):
+    def __init__(self, state_file="trade_state.json", clock=None):
         self.state_file = state_file
+        self.clock = clock or SYSTEM_CLOCK
         self.positions = {} # { "SYMBOL": { "qty": 10, "order_id": "...", "entry_price": ... } }
         self.pending_locks = set() # Lock for pending orders
+        # Locks are taken from the main loop and from the feed thread (tick stops)
+        self.lock_guard = threading.Lock()
+        # Order workers update positions concurrently
+        self.state_lock = threading.RLock()
         self.load_state()
 
     def acquire_lock(self, symbol):
-        if symbol in self.pending_locks: return False
-        self.pending_locks.add(symbol)
-        return True
+        with self.lock_guard:
+            if symbol in self.pending_locks: return False
+            self.pending_locks.add(symbol)
+            return True
 
     def release_lock(self, symbol):
-        self.pending_locks.discard(symbol)
+        with self.lock_guard:
+            self.pending_locks.discard(symbol)
 
     def load_state(self):
         if os.path.exists(self.state_file):
@@ -128,28 +214,55 @@ class TradeManager:
     def save_state(self):
         # Atomic write to avoid corrupted state if process crashes during write
         try:
-            temp_file = self.state_file + ".tmp"
-            with open(temp_file, 'w') as f:
-                json.dump(self.positions, f, indent=4)
-            shutil.move(temp_file, self.state_file)
+            with self.state_lock:
+                temp_file = self.state_file + ".tmp"
+                with open(temp_file, 'w') as f:
+                    json.dump(self.positions, f, indent=4)
+                shutil.move(temp_file, self.state_file)
         except Exception as e:
             print(f"⚠️ Error saving state: {e}")
 
     def register_buy(self, symbol, qty, order_id, entry_price):
-        self.positions[symbol] = {
-            "qty": qty,
-            "order_id": order_id,
-            "entry_price": entry_price,
-            "entry_time": time.time()
-        }
-        self.save_state()
+        with self.state_lock:
+            self.positions[symbol] = {
+                "qty": qty,
+                "order_id": order_id,
+                "entry_price": entry_price,
+                "entry_time": self.clock.time()
+            }
+            self.save_state()
         print(f"💾 State Saved: Bought {symbol} (Qty: {qty})")
 
     def cleanup_position(self, symbol):
-        if symbol in self.positions:
+        with self.state_lock:
+            if symbol not in self.positions:
+                return
             del self.positions[symbol]
             self.save_state()
-            print(f"💾 State Saved: Sold {symbol}")
+        print(f"💾 State Saved: Sold {symbol}")
+
+    def register_stop(self, symbol, order_id, trigger):
+        with self.state_lock:
+            if symbol in self.positions:
+                self.positions[symbol]["stop_order_id"] = order_id
+                self.positions[symbol]["stop_trigger"] = trigger
+                self.save_state()
+
+    def clear_stop(self, symbol):
+        with self.state_lock:
+            if symbol in self.positions and "stop_order_id" in self.positions[symbol]:
+                del self.positions[symbol]["stop_order_id"]
+                del self.positions[symbol]["stop_trigger"]
+                self.save_state()
+
+    def get_stop_order(self, symbol):
+        pos = self.positions.get(symbol, {})
+        if not pos.get("stop_order_id"):
+            return None
+        return {"order_id": pos["stop_order_id"], "trigger": pos["stop_trigger"]}
+
+    def resting_stops(self):
+        return {s: self.get_stop_order(s) for s in list(self.positions) if self.get_stop_order(s)}
 
     def get_holdings_qty(self, symbol):
         return self.positions.get(symbol, {}).get('qty', 0)
@@ -158,24 +271,39 @@ class TradeManager:
         return self.positions.get(symbol, {}).get('entry_price', 0.0)
 
     def generate_unique_id(self, prefix="Algo"):
-        timestamp = int(time.time() * 1000)
+        timestamp = int(self.clock.time() * 1000)
         rand_num = random.randint(1000, 9999)
         return f"{prefix}_{timestamp}_{rand_num}"
 
 class ExecutionEngine:
-    def __init__(self, trade_manager, logger, broker_headers):
-        self.queue = queue.Queue()
+    def __init__(self, trade_manager, logger, broker_headers, stop_manager=None, workers=ORDER_WORKERS,
+                 limiter=None, tracker=None, basket_ms=ORDER_BASKET_MS, broker=None):
         self.trade_manager = trade_manager
+        # The Upstox driver, or anything with its interface (core.paper_exchange.PaperExchange)
+        self.broker = broker or upstox
         self.logger = logger
         self.broker_headers = broker_headers
-        self.running = True
-        self.worker_thread = threading.Thread(target=self._worker, daemon=True)
-        self.worker_thread.start()
+        self.stop_manager = stop_manager
+        # OrderTracker: orders still open when the call returns are completed when their fill lands
+        self.tracker = tracker
+        # N workers, per-symbol ordering, paced by the shared order-rate limiter
+        self.dispatcher = OrderDispatcher(self.process, workers, limiter)
+        # The dispatcher took the task's tokens from the driver's own order bucket: its calls spend those
+        self.prepaid = limiter is not None and getattr(self.broker, "rate_limiters", {}).get("orders") is limiter
+        self.dispatch = self.dispatcher.submit
+        # Basket mode: BUY/SELL tasks wait up to basket_ms for company, then go out as one BASKET task
+        self.basket_window = basket_ms / 1000.0
+        self.basket = []
+        self.basket_timer = None
+        self.basket_lock = threading.Lock()
+        self.basket_stats = {"baskets": 0, "legs": 0}
+        print(f"⚙️ Execution Engine Started ({len(self.dispatcher.threads)} workers"
+              f"{f', {basket_ms}ms baskets' if basket_ms > 0 else ''}).")
 
     def submit_order(self, task):
         """
         task = { 
-            "action": "BUY" | "SELL", 
+            "action": "BUY" | "SELL" | "MODIFY_STOP" | "RECONCILE_STOPS", 
             "symbol": str, 
             "qty": int, 
             "ltp": float, 
@@ -183,45 +311,104 @@ class ExecutionEngine:
             "strategy": object 
         }
         """
-        self.queue.put(task)
-
-    def _worker(self):
-        print("⚙️ Execution Engine Started (Threaded).")
-        while self.running:
-            try:
-                task = self.queue.get(timeout=1)
-            except queue.Empty:
-                continue
-
-            symbol = task.get("symbol")
-            action = task.get("action")
-            qty = task.get("qty")
-            ltp = task.get("ltp")
-            reason = task.get("reason")
-            strategy = task.get("strategy")
-            
-            # print(f"⚙️ Processing {action} for {symbol}...")
-            
-            try:
+        # Stop hits never wait for a basket to fill up
+        if self.basket_window > 0 and task.get("action") in ("BUY", "SELL") and priority_of(task) != "stop":
+            self._collect(task)
+        else:
+            self.dispatch(task)
+
+    def _collect(self, task):
+        with self.basket_lock:
+            self.basket.append(task)
+            if len(self.basket) >= self.broker.multi_order_limit:
+                self._flush_locked()
+            elif self.basket_timer is None:
+                self.basket_timer = threading.Timer(self.basket_window, self.flush_basket)
+                self.basket_timer.daemon = True
+                self.basket_timer.start()
+
+    def flush_basket(self):
+        with self.basket_lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self.basket_timer is not None:
+            self.basket_timer.cancel()
+            self.basket_timer = None
+        legs, self.basket = self.basket, []
+        if len(legs) == 1:
+            self.dispatch(legs[0])
+        elif legs:
+            self.basket_stats["baskets"] += 1
+            self.basket_stats["legs"] += len(legs)
+            chunks = math.ceil(len(legs) / self.broker.multi_order_limit)
+            self.dispatch({
+                "action": "BASKET",
+                "symbols": [leg["symbol"] for leg in legs],
+                "legs": legs,
+                # As urgent as its most urgent leg
+                "priority": min((priority_of(leg) for leg in legs), key=PRIORITIES.index),
+                "calls": chunks + (len(legs) if self.broker.confirm_orders else 0),
+            })
+
+    def stop(self):
+        self.flush_basket()
+        self.dispatcher.stop()
+
+    def process(self, task):
+        """Executes one task (blocking broker calls)."""
+        symbol = task.get("symbol")
+        action = task.get("action")
+        qty = task.get("qty")
+        ltp = task.get("ltp")
+        reason = task.get("reason")
+        strategy = task.get("strategy")
+        
+        # print(f"⚙️ Processing {action} for {symbol}...")
+        
+        deferred = False
+        # Broker calls spend the tokens the dispatcher took for this task; unspent ones go back
+        prepaid = self.broker.prepaid("orders", calls_of(task)) if self.prepaid else nullcontext()
+        try:
+            with prepaid:
                 if action == "BUY":
-                    self._execute_buy(symbol, qty, ltp, reason, strategy)
+                    deferred = self._execute_buy(symbol, qty, ltp, reason, strategy)
                 elif action == "SELL":
-                    self._execute_sell(symbol, qty, ltp, reason, strategy)
-            except Exception as e:
-                print(f"❌ Execution Error [{symbol}]: {e}")
+                    deferred = self._execute_sell(symbol, qty, ltp, reason, strategy)
+                elif action == "BASKET":
+                    self._execute_basket(task["legs"])
+                elif action == "MODIFY_STOP":
+                    self.stop_manager.modify(symbol, task.get("trigger"))
+                elif action == "RECONCILE_STOPS":
+                    self.stop_manager.reconcile()
+        except Exception as e:
+            print(f"❌ Execution Error [{symbol}]: {e}")
+        finally:
+            # Release Lock (only order tasks take one); a deferred order keeps it until its fill lands
+            if action in ("BUY", "SELL") and not deferred:
+                self.trade_manager.release_lock(symbol)
+
+    def _defer(self, action, symbol, order_id, on_fill):
+        """Hands an open order to the tracker; on_fill(order) runs when it fills."""
+        def confirm(order):
+            try:
+                if order.get(Order.STATUS) == Status.FILLED:
+                    on_fill(order)
+                else:
+                    print(f"❌ {action} FAILED [{symbol}]. {order.get(Order.STATUS)}: {order.get(Order.REJECTREASON)}")
             finally:
-                # Release Lock
                 self.trade_manager.release_lock(symbol)
-            
-            self.queue.task_done()
-            time.sleep(0.2) # Rate Limit Safety (5 req/sec max)
+
+        self.tracker.track(order_id, confirm)
+        print(f"⏳ {action} SENT [{symbol}]. Order ID: {order_id} (awaiting fill)")
+        return True
 
     def _execute_buy(self, symbol, qty, ltp, reason, strategy):
         print(f"\n⚡ [{symbol}] Executing BUY Order for {qty} Qty...")
         try:
             unique_id = self.trade_manager.generate_unique_id("BUY")
             # Note: Using SANDBOX_TOKEN for Buy as per original code, change if needed
-            resp = upstox.market_order_eq(
+            resp = self.broker.market_order_eq(
                 exchange=ExchangeCode.NSE,
                 symbol=symbol.split(":")[1], 
                 quantity=qty,
@@ -232,24 +419,43 @@ class ExecutionEngine:
                 validity=Validity.DAY
             )
             print(f"in main.py buy response: {resp}")
-            if resp.get('status') == 'FILLED':
-                order_id = resp.get('id', {})
-                self.logger.log_trade("BUY", symbol, ltp, qty, 0.0, reason)
-                
-                # Update Persistent State
-                self.trade_manager.register_buy(symbol, qty, order_id, ltp)
-                
-                print(f"✅ BUY SUCCESS [{symbol}]. Order ID: {order_id}")
-            else:
-                print(f"❌ BUY FAILED [{symbol}]. Response: {resp}")
+            return self._on_buy_response(symbol, qty, ltp, reason, strategy, resp)
         except Exception as e:
             print(f"❌ BUY Exception [{symbol}]: {e}")
+        return False
+
+    def _on_buy_response(self, symbol, qty, ltp, reason, strategy, resp):
+        """Books a filled BUY; returns True when the fill is left to the tracker."""
+        order_id = resp.get('id', {})
+        if resp.get('status') == 'FILLED':
+            self._buy_filled(symbol, qty, ltp, reason, strategy, order_id)
+        elif self.tracker is not None and resp.get('status') in (Status.PENDING, Status.OPEN):
+            return self._defer("BUY", symbol, order_id,
+                               lambda order: self._buy_filled(symbol, qty, ltp, reason, strategy, order_id))
+        else:
+            print(f"❌ BUY FAILED [{symbol}]. Response: {resp}")
+        return False
+
+    def _buy_filled(self, symbol, qty, ltp, reason, strategy, order_id):
+        self.logger.log_trade("BUY", symbol, ltp, qty, 0.0, reason)
+        
+        # Update Persistent State
+        self.trade_manager.register_buy(symbol, qty, order_id, ltp)
+        
+        print(f"✅ BUY SUCCESS [{symbol}]. Order ID: {order_id}")
+
+        # Hand the exit to the exchange right away
+        if self.stop_manager is not None:
+            self.stop_manager.place(symbol, qty, getattr(strategy, 'trailing_stop', 0.0))
 
     def _execute_sell(self, symbol, qty, ltp, reason, strategy):
         print(f"\n⚡ [{symbol}] Executing SELL Order for {qty} Qty...")
         try:
+            # Never leave a resting stop behind that could sell the same shares twice
+            if self.stop_manager is not None and not self.stop_manager.cancel(symbol):
+                return False
             unique_id = self.trade_manager.generate_unique_id("SELL")
-            resp = upstox.market_order_eq(
+            resp = self.broker.market_order_eq(
                 exchange=ExchangeCode.NSE,
                 symbol=symbol.split(":")[1], 
                 quantity=qty,
@@ -260,29 +466,124 @@ class ExecutionEngine:
                 validity=Validity.DAY
             )
             print(f"in main.py sell response: {resp}")
-            if resp.get('status') == 'FILLED':
-                order_id = resp.get('id', {})
-                
-                entry_price = self.trade_manager.get_entry_price(symbol)
-                pnl = (ltp - entry_price) * qty
-                
-                self.logger.log_trade("SELL", symbol, ltp, qty, pnl, reason)
-                
-                # Update Persistent State
-                self.trade_manager.cleanup_position(symbol)
-                
-                print(f"✅ SELL SUCCESS [{symbol}]. Order ID: {order_id}")
-            else:
-                print(f"❌ SELL FAILED [{symbol}]. Response: {resp}")
+            return self._on_sell_response(symbol, qty, ltp, reason, resp)
         except Exception as e:
             print(f"❌ SELL Exception [{symbol}]: {e}")
+        return False
+
+    def _on_sell_response(self, symbol, qty, ltp, reason, resp):
+        """Books a filled SELL; returns True when the fill is left to the tracker."""
+        order_id = resp.get('id', {})
+        if resp.get('status') == 'FILLED':
+            self._sell_filled(symbol, qty, ltp, reason, order_id)
+        elif self.tracker is not None and resp.get('status') in (Status.PENDING, Status.OPEN):
+            return self._defer("SELL", symbol, order_id,
+                               lambda order: self._sell_filled(symbol, qty, ltp, reason, order_id))
+        else:
+            print(f"❌ SELL FAILED [{symbol}]. Response: {resp}")
+        return False
+
+    def _execute_basket(self, legs):
+        """Places the legs in one multi-order request; each leg is booked (and unlocked) on its own."""
+        print(f"\n⚡ Executing BASKET of {len(legs)} Orders...")
+        orders, placed = [], []
+        for leg in legs:
+            if leg["action"] == "SELL" and self.stop_manager is not None:
+                # Never leave a resting stop behind that could sell the same shares twice
+                if not self.stop_manager.cancel(leg["symbol"]):
+                    self.trade_manager.release_lock(leg["symbol"])
+                    continue
+            placed.append(leg)
+            orders.append({
+                "exchange": ExchangeCode.NSE,
+                "symbol": leg["symbol"].split(":")[1],
+                "quantity": leg["qty"],
+                "side": Side.BUY if leg["action"] == "BUY" else Side.SELL,
+                "unique_id": self.trade_manager.generate_unique_id(leg["action"]),
+                "product": Product.NRML,
+                "validity": Validity.DAY,
+            })
+
+        if not orders:
+            return
+        try:
+            results = self.broker.basket_order_eq(orders, headers=self.broker_headers)
+        except Exception as e:
+            print(f"❌ BASKET Exception: {e}")
+            results = [{"status": Status.REJECTED, "rejectReason": str(e)}] * len(placed)
+
+        for leg, resp in zip(placed, results):
+            symbol = leg["symbol"]
+            deferred = False
+            try:
+                if leg["action"] == "BUY":
+                    deferred = self._on_buy_response(symbol, leg["qty"], leg["ltp"], leg["reason"],
+                                                     leg["strategy"], resp)
+                else:
+                    deferred = self._on_sell_response(symbol, leg["qty"], leg["ltp"], leg["reason"], resp)
+            except Exception as e:
+                print(f"❌ Execution Error [{symbol}]: {e}")
+            finally:
+                if not deferred:
+                    self.trade_manager.release_lock(symbol)
+
+    def _sell_filled(self, symbol, qty, ltp, reason, order_id):
+        entry_price = self.trade_manager.get_entry_price(symbol)
+        pnl = (ltp - entry_price) * qty
+        
+        self.logger.log_trade("SELL", symbol, ltp, qty, pnl, reason)
+        
+        # Update Persistent State
+        self.trade_manager.cleanup_position(symbol)
+        
+        print(f"✅ SELL SUCCESS [{symbol}]. Order ID: {order_id}")
+
+
+def queue_signal(signal, symbol, ltp, reason, strategy, current_qty, capital_per_symbol,
+                 trade_manager, execution_engine, priority=None):
+    """
+    Turns a strategy signal into an execution task. Returns False if the symbol is locked.
+    priority: core.order_dispatch class ("stop" for protective exits); default by action.
+    """
+    if signal == "SELL":
+        if trade_manager.get_stop_order(symbol) is not None:
+            # A resting exchange stop owns this exit
+            return True
+        qty = current_qty # Use the source of truth
+    else:
+        # Use Per-Symbol Capital
+        qty = math.floor(capital_per_symbol / ltp)
+    if qty < 1:
+        return True
 
+    if not trade_manager.acquire_lock(symbol):
+        return False
+
+    print(f"\n⚡ [{symbol}] Queuing {signal} Order for {qty} Qty...")
+    execution_engine.submit_order({
+        "action": signal,
+        "symbol": symbol,
+        "qty": qty,
+        "ltp": ltp,
+        "reason": reason,
+        "strategy": strategy,
+        "priority": priority
+    })
+    return True
+
+def sync_exchange_stop(symbol, stop, stop_manager, execution_engine):
+    """Queues a modify of the resting stop when the trailing stop ratcheted by a tick or more."""
+    trigger = stop_manager.due_update(symbol, stop)
+    if trigger is not None:
+        # Mark as sent now so the debounce holds while the task waits in the queue
+        stop_manager.last_modified[symbol] = stop_manager.clock.time()
+        execution_engine.submit_order({"action": "MODIFY_STOP", "symbol": symbol, "trigger": trigger})
 
 
 def main():
     print("🚀 Initializing OEMS (Multi-Symbol V3 Hybrid)...")
 
-    if not API_TOKEN:
+    if not API_TOKEN and not REPLAY_LOG:
         print(f"[Error] API Token not found. Please set UPSTOX_PROD_TOKEN in environment.")
         return
 
@@ -296,24 +597,89 @@ def main():
 
     # 2. Initialize Components
     # Pass the SYMBOLS_MAP to Data Feed
-    data_feed = RobustDataFeed(API_TOKEN, SYMBOLS_MAP)
+    # Shared token buckets: the driver meters its calls, the feed its history requests
+    upstox.rate_limiters = {family: RateLimiter(limits) for family, limits in BROKER_RATE_LIMITS.items()}
+    upstox.rate_mode = BROKER_RATE_MODE
+
+    if REPLAY_LOG:
+        speed = REPLAY_SPEED
+        if RUNTIME == "async" and speed <= 0:
+            # The event loop keeps its own time; only paced replay can feed it
+            print("⚠️ Lockstep replay needs RUNTIME=threaded; replaying at 1x.")
+            speed = 1.0
+        data_feed = ReplayFeed(REPLAY_LOG, SYMBOLS_MAP, speed=speed, start=REPLAY_START)
+    else:
+        data_feed = RobustDataFeed(API_TOKEN, SYMBOLS_MAP, api_base=UPSTOX_API_BASE or "https://api.upstox.com",
+                                   limiter=upstox.rate_limiters["history"])
+        if RECORD_FEED:
+            data_feed.recorder = FeedRecorder(FEED_LOG_DIR, clock=data_feed.clock)
+            print(f"⏺️ Recording feed to {data_feed.recorder.path}")
+
+    # One clock for the whole runtime: wall time live, the replay's clock when replaying
+    clock = data_feed.clock
     
-    logger = TradeRecorder("production_trades.csv", initial_capital=ALLOCATED_CAPITAL)
+    logger = TradeRecorder("production_trades.csv", initial_capital=ALLOCATED_CAPITAL, clock=clock)
     
     # Initialize Strategy for EACH symbol
     strategies = {
         symbol: RSIChandelierStrategy(symbol) for symbol in SYMBOLS_MAP
     }
+
+    # Shared indicator graph: every strategy on a symbol reuses the same RSI/ATR nodes
+    indicator_graph = IndicatorGraph()
+    for strategy in strategies.values():
+        strategy.bind_indicators(indicator_graph, TIMEFRAME)
     
-    trade_manager = TradeManager()
+    trade_manager = TradeManager(clock=clock)
+
+    broker = upstox
+    if PAPER_TRADING:
+        broker = PaperExchange(latency=PAPER_LATENCY_MS / 1000.0, slippage_bps=PAPER_SLIPPAGE_BPS, clock=clock)
+        data_feed.tick_listeners.append(broker.on_ticks)
+        print(f"📝 Paper trading: in-process exchange ({PAPER_LATENCY_MS}ms latency, {PAPER_SLIPPAGE_BPS:g}bps slippage)")
+
+    # Optional process-pool evaluation (must start before any threads are spawned)
+    evaluator = None
+    if EVAL_WORKERS > 0:
+        evaluator = ParallelEvaluator(list(SYMBOLS_MAP), RSIChandelierStrategy, TIMEFRAME, EVAL_WORKERS)
     
-    # Initialize Execution Engine
-    execution_engine = ExecutionEngine(trade_manager, logger, broker_headers)
+    stop_manager = None
+    if STOP_MODE == "exchange":
+        stop_manager = ExchangeStopManager(trade_manager, logger, broker_headers, clock=clock, broker=broker)
+        print("🛡️ Stop Mode: exchange-resident SL-M orders")
+
+    order_tracker = None
+    if ASYNC_CONFIRM:
+        broker.confirm_orders = False
+        order_tracker = OrderTracker(broker_headers, access_token=SANDBOX_TOKEN, broker=broker).start()
+        print("⏳ Order confirmation: async (order-update stream, polling fallback)")
+
+    # Initialize Execution Engine (shared by both runtimes)
+    execution_engine = ExecutionEngine(trade_manager, logger, broker_headers, stop_manager,
+                                       workers=ORDER_WORKERS, limiter=upstox.rate_limiters["orders"],
+                                       tracker=order_tracker, basket_ms=ORDER_BASKET_MS, broker=broker)
 
     # Calculate Capital Per Symbol
     CAPITAL_PER_SYMBOL = ALLOCATED_CAPITAL / len(SYMBOLS_MAP)
     print(f"💰 Capital Allocation: ₹{CAPITAL_PER_SYMBOL:.2f} per symbol")
 
+    # Tick-driven stops: SELLs are queued straight from the feed callback
+    stop_engine = None
+    if TICK_STOPS:
+        def on_stop_hit(symbol, ltp, stop, qty):
+            current_qty = trade_manager.get_holdings_qty(symbol)
+            if current_qty > 0:
+                queue_signal("SELL", symbol, ltp, f"Stop Hit {stop:.2f}", strategies[symbol], current_qty,
+                             CAPITAL_PER_SYMBOL, trade_manager, execution_engine, priority="stop")
+
+        stop_engine = StopEngine(list(SYMBOLS_MAP), on_stop_hit)
+        data_feed.tick_listeners.append(stop_engine.on_ticks)
+
+    tick_store = None
+    if TICK_STORE:
+        tick_store = TickStore(TICK_STORE_DIR, now=clock.now)
+        data_feed.tick_listeners.append(tick_store.on_ticks)
+
     # 3. Warmup & Start Data
     # Retry warmup a few times before giving up
     attempts = 0
@@ -331,175 +697,273 @@ def main():
         print("❌ Critical: Data Warmup Failed after retries. Exiting.")
         return
 
+    # Broker connections: one per order worker, opened before the first signal
+    keepalive = None
+    if hasattr(broker, "warm_connections") and not REPLAY_LOG:
+        warm = broker.warm_connections(per_host=ORDER_WORKERS)
+        print(f"🔌 Broker connections warmed: " + ", ".join(
+            f"{host} {ms:.0f}ms" if ms is not None else f"{host} unreachable" for host, ms in warm.items()))
+        if BROKER_KEEPALIVE_SECS > 0:
+            keepalive = broker.keep_warm(BROKER_KEEPALIVE_SECS, per_host=ORDER_WORKERS)
+
+    # --- PER-SYMBOL EVALUATION (shared by the threaded loop and the async runtime) ---
+
+    def evaluate_symbol(symbol, eval_requests):
+        """Runs one symbol through its strategy, or stages it for the worker pool."""
+        # Per-symbol protections: skip if tick too old or no data
+        last_tick = None
+        try:
+            last_tick = data_feed.get_last_tick_time(symbol)
+        except Exception:
+            last_tick = None
+
+        if last_tick is None or (clock.now() - last_tick).total_seconds() > 10:
+            # Data stale for this symbol -> skip
+            # print(f"⚠️ Stale data for {symbol}; skipping.")
+            return
+
+        # Get Data for THIS symbol
+        try:
+            ltp = data_feed.get_ltp(symbol)
+            if evaluator is not None:
+                # Workers resample their own copy; only raw 1m bars are shipped
+                bars_1m = data_feed.get_bars(symbol)
+                df_3m = bars_1m if bars_1m is not None and not bars_1m.empty else None
+            else:
+                df_3m = data_feed.get_resampled_data(symbol, TIMEFRAME)
+        except Exception as e:
+            print(f"⚠️ Error getting data for {symbol}: {e}")
+            return
+
+        if ltp == 0 or df_3m is None:
+            return
+
+        strategy = strategies[symbol]
+        
+        # Get Current Position State (Single Source of Truth)
+        current_qty = trade_manager.get_holdings_qty(symbol)
+        entry_price = trade_manager.get_entry_price(symbol) if current_qty > 0 else 0.0
+
+        if evaluator is not None:
+            # Worker processes own the strategy math; we only ship bars + position state
+            evaluator.publish(symbol, bars_1m)
+            eval_requests.append((symbol, ltp, current_qty, entry_price))
+            return
+
+        try:
+            # B. Fast Tick Logic (Exits)
+            signal, reason = strategy.on_tick(ltp, current_qty, entry_price)
+            
+            if signal == "SELL":
+                # on_tick exits are trailing-stop hits: they jump the order queue
+                if not queue_signal(signal, symbol, ltp, reason, strategy, current_qty,
+                                    CAPITAL_PER_SYMBOL, trade_manager, execution_engine, priority="stop"):
+                    # Order in progress for symbol
+                    return
+
+            # C. Candle Logic (Entries)
+            signal, reason = strategy.on_candle_closed(df_3m, ltp, current_qty, entry_price)
+            
+            if signal == "BUY":
+                queue_signal(signal, symbol, ltp, reason, strategy, current_qty,
+                             CAPITAL_PER_SYMBOL, trade_manager, execution_engine)
+
+            if stop_engine is not None:
+                stop_engine.set_stop(symbol, strategy.trailing_stop, current_qty)
+            if stop_manager is not None and current_qty > 0:
+                sync_exchange_stop(symbol, strategy.trailing_stop, stop_manager, execution_engine)
+        except Exception as e:
+            print(f"⚠️ Strategy processing error for {symbol}: {e}")
+            traceback.print_exc()
+
+    def evaluate_pool(eval_requests):
+        """Evaluates staged symbols in the worker pool and queues their signals."""
+        ltps = {req[0]: req[1] for req in eval_requests}
+        qtys = {req[0]: req[2] for req in eval_requests}
+        for symbol, signal, reason, stop_level, rsi, stop_hit in evaluator.evaluate(eval_requests):
+            # Mirror worker-side strategy state for the dashboard
+            strategy = strategies[symbol]
+            strategy.trailing_stop = stop_level
+            strategy.current_rsi = rsi
+            if stop_engine is not None:
+                stop_engine.set_stop(symbol, stop_level, qtys[symbol])
+            if stop_manager is not None and qtys[symbol] > 0:
+                sync_exchange_stop(symbol, stop_level, stop_manager, execution_engine)
+            if signal in ("BUY", "SELL"):
+                # Trailing-stop exits jump the order queue, as in the in-loop path
+                queue_signal(signal, symbol, ltps[symbol], reason, strategy, qtys[symbol],
+                             CAPITAL_PER_SYMBOL, trade_manager, execution_engine,
+                             priority="stop" if stop_hit else None)
+
+    def export_dashboard():
+        """Export state to JSON for external dashboard viewer."""
+        try:
+            # Calculate Account Metrics
+            realized_pnl = logger.get_total_pnl()
+
+            # Treat capital + realized PnL as current equity and then back out margin used
+            account_balance = ALLOCATED_CAPITAL + realized_pnl
+
+            used_margin = 0.0
+            for s in SYMBOLS_MAP:
+                q = trade_manager.get_holdings_qty(s)
+                e = trade_manager.get_entry_price(s)
+                if q > 0:
+                    used_margin += (q * e)
+                    
+            # Cash that is still free to deploy
+            available_cash = account_balance - used_margin
+
+            dashboard_data = {
+                "last_updated": clock.now().strftime('%H:%M:%S'),
+                "account": {
+                    "capital": ALLOCATED_CAPITAL,
+                    "balance": account_balance,
+                    "realized_pnl": realized_pnl,
+                    "used_margin": used_margin,
+                    "available_cash": available_cash
+                },
+                # Order queue health: throughput, rate-limit wait, queue wait by priority class
+                "execution": {**execution_engine.dispatcher.stats(), **execution_engine.basket_stats},
+                "paper": broker.summary() if PAPER_TRADING else None,
+                # Driver HTTP health: retries, hedged reads, deduped orders, circuit breaker
+                "broker": {**broker.fetch_stats, "breaker": broker.breaker_state()} if not PAPER_TRADING else None,
+                "symbols": {}
+            }
+            
+            for sym in SYMBOLS_MAP:
+                l = data_feed.get_ltp(sym)
+                t = data_feed.get_last_tick_time(sym)
+                ts = t.strftime('%H:%M:%S') if t else "--:--:--"
+                
+                strat = strategies[sym]
+                rsi_val = getattr(strat, 'current_rsi', 0.0)
+                sl_val = getattr(strat, 'trailing_stop', 0.0)
+                
+                qty = trade_manager.get_holdings_qty(sym)
+                entry = trade_manager.get_entry_price(sym)
+                
+                dashboard_data["symbols"][sym] = {
+                    "ltp": l,
+                    "rsi": rsi_val,
+                    "sl": sl_val,
+                    "pos": qty,
+                    "entry": entry,
+                    "last_tick": ts
+                }
+            
+            # Atomic Write
+            temp_dash = "dashboard_state.json.tmp"
+            with open(temp_dash, 'w') as f:
+                json.dump(dashboard_data, f)
+            shutil.move(temp_dash, "dashboard_state.json")
+            
+        except Exception as e:
+            pass
+
+    def reconcile_stops():
+        # Book fills of resting exchange stops
+        if stop_manager is not None:
+            execution_engine.submit_order({"action": "RECONCILE_STOPS", "symbol": None})
+
+    # --- ASYNC RUNTIME ---
+    if RUNTIME == "async":
+        runtime = AsyncRuntime(
+            data_feed, execution_engine, list(SYMBOLS_MAP), TIMEFRAME,
+            evaluate_symbol=evaluate_symbol,
+            evaluate_pool=evaluate_pool if evaluator is not None else None,
+            export_dashboard=export_dashboard,
+            reconcile=reconcile_stops if stop_manager is not None else None,
+            reconcile_every=STOP_RECONCILE_SECS,
+            clock=clock,
+        )
+        print(f"--- 🎧 System Live for {len(SYMBOLS_MAP)} Symbols (asyncio runtime) ---")
+        try:
+            runtime.run()
+        except KeyboardInterrupt:
+            print("\n🛑 Shutting down.")
+        finally:
+            data_feed.stop_event.set()
+            execution_engine.stop()
+            if order_tracker is not None:
+                order_tracker.stop()
+            if keepalive is not None:
+                keepalive.set()
+            if evaluator is not None:
+                evaluator.close()
+            if data_feed.recorder is not None:
+                data_feed.recorder.close()
+            if tick_store is not None:
+                tick_store.close()
+        return
+
     data_feed.start_feed()
     
     print(f"--- 🎧 System Live for {len(SYMBOLS_MAP)} Symbols ---")
     # Print initial blank lines for dashboard to overwrite
     print("\n" * (len(SYMBOLS_MAP) + 2))
     
+    last_reconcile = 0.0
+    replay_started = time.perf_counter()
     try:
         while True:
+            if REPLAY_LOG and data_feed.finished.is_set():
+                elapsed = time.perf_counter() - replay_started
+                print(f"\n⏹️ Replay finished: {data_feed.delivered} messages up to "
+                      f"{clock.now():%H:%M:%S} in {elapsed:.1f}s wall time.")
+                break
+
             # A. Circuit Breaker
             if not data_feed.is_healthy:
                 print("⚠️ System Paused: Waiting for Data Feed...", end='\r')
-                time.sleep(1)
+                clock.sleep(1)
                 continue
 
             try:
                 # --- MULTI-SYMBOL LOOP ---
+                eval_requests = []
                 for symbol in SYMBOLS_MAP:
-                    # Per-symbol protections: skip if tick too old or no data
-                    last_tick = None
-                    try:
-                        last_tick = data_feed.get_last_tick_time(symbol)
-                    except Exception:
-                        last_tick = None
-
-                    if last_tick is None or (datetime.now() - last_tick).total_seconds() > 10:
-                        # Data stale for this symbol -> skip
-                        # print(f"⚠️ Stale data for {symbol}; skipping.")
-                        continue
-
-                    # Get Data for THIS symbol
-                    try:
-                        ltp = data_feed.get_ltp(symbol)
-                        df_3m = data_feed.get_resampled_data(symbol, '3min')
-                    except Exception as e:
-                        print(f"⚠️ Error getting data for {symbol}: {e}")
-                        continue
-
-                    if ltp == 0 or df_3m is None:
-                        continue
-
-                    strategy = strategies[symbol]
-                    
-                    # Get Current Position State (Single Source of Truth)
-                    current_qty = trade_manager.get_holdings_qty(symbol)
-                    entry_price = trade_manager.get_entry_price(symbol) if current_qty > 0 else 0.0
-
-                    try:
-                        # B. Fast Tick Logic (Exits)
-                        signal, reason = strategy.on_tick(ltp, current_qty, entry_price)
-                        
-                        if signal == "SELL":
-                            sell_qty = current_qty # Use the source of truth
-                            if sell_qty > 0:
-                                if not trade_manager.acquire_lock(symbol):
-                                    # Order in progress for symbol
-                                    continue
-
-                                print(f"\n⚡ [{symbol}] Queuing SELL Order for {sell_qty} Qty...")
-                                execution_engine.submit_order({
-                                    "action": "SELL",
-                                    "symbol": symbol,
-                                    "qty": sell_qty,
-                                    "ltp": ltp,
-                                    "reason": reason,
-                                    "strategy": strategy
-                                })
-
-                        # C. Candle Logic (Entries)
-                        signal, reason = strategy.on_candle_closed(df_3m, ltp, current_qty, entry_price)
-                        
-                        if signal == "BUY":
-                            # Use Per-Symbol Capital
-                            qty = math.floor(CAPITAL_PER_SYMBOL / ltp)
-                            if qty < 1: 
-                                continue
-                            
-                            if not trade_manager.acquire_lock(symbol):
-                                continue
-
-                            print(f"\n⚡ [{symbol}] Queuing BUY Order for {qty} Qty...")
-                            execution_engine.submit_order({
-                                "action": "BUY",
-                                "symbol": symbol,
-                                "qty": qty,
-                                "ltp": ltp,
-                                "reason": reason,
-                                "strategy": strategy
-                            })
-                    except Exception as e:
-                        print(f"⚠️ Strategy processing error for {symbol}: {e}")
-                        traceback.print_exc()
-                        continue
+                    evaluate_symbol(symbol, eval_requests)
+
+                if evaluator is not None and eval_requests:
+                    evaluate_pool(eval_requests)
+
+                if stop_manager is not None and clock.time() - last_reconcile > STOP_RECONCILE_SECS:
+                    reconcile_stops()
+                    last_reconcile = clock.time()
 
                 # print(f"💓 Monitoring {len(SYMBOLS_MAP)} Symbols... | Healthy: {data_feed.is_healthy} | ltp: {ltp}   ", end='\r')
                 
                 # --- LIVE DASHBOARD EXPORT ---
-                # Export state to JSON for external dashboard viewer
-                try:
-                    # Calculate Account Metrics
-                    realized_pnl = logger.get_total_pnl()
-
-                    # Treat capital + realized PnL as current equity and then back out margin used
-                    account_balance = ALLOCATED_CAPITAL + realized_pnl
-
-                    used_margin = 0.0
-                    for s in SYMBOLS_MAP:
-                        q = trade_manager.get_holdings_qty(s)
-                        e = trade_manager.get_entry_price(s)
-                        if q > 0:
-                            used_margin += (q * e)
-                            
-                    # Cash that is still free to deploy
-                    available_cash = account_balance - used_margin
-
-                    dashboard_data = {
-                        "last_updated": datetime.now().strftime('%H:%M:%S'),
-                        "account": {
-                            "capital": ALLOCATED_CAPITAL,
-                            "balance": account_balance,
-                            "realized_pnl": realized_pnl,
-                            "used_margin": used_margin,
-                            "available_cash": available_cash
-                        },
-                        "symbols": {}
-                    }
-                    
-                    for sym in SYMBOLS_MAP:
-                        l = data_feed.get_ltp(sym)
-                        t = data_feed.get_last_tick_time(sym)
-                        ts = t.strftime('%H:%M:%S') if t else "--:--:--"
-                        
-                        strat = strategies[sym]
-                        rsi_val = getattr(strat, 'current_rsi', 0.0)
-                        sl_val = getattr(strat, 'trailing_stop', 0.0)
-                        
-                        qty = trade_manager.get_holdings_qty(sym)
-                        entry = trade_manager.get_entry_price(sym)
-                        
-                        dashboard_data["symbols"][sym] = {
-                            "ltp": l,
-                            "rsi": rsi_val,
-                            "sl": sl_val,
-                            "pos": qty,
-                            "entry": entry,
-                            "last_tick": ts
-                        }
-                    
-                    # Atomic Write
-                    temp_dash = "dashboard_state.json.tmp"
-                    with open(temp_dash, 'w') as f:
-                        json.dump(dashboard_data, f)
-                    shutil.move(temp_dash, "dashboard_state.json")
-                    
-                except Exception as e:
-                    pass
+                export_dashboard()
                 
                 # print(f"💓 Monitoring {len(SYMBOLS_MAP)} Symbols... | Healthy: {data_feed.is_healthy} | ltp: {ltp}   ", end='\r')
-                time.sleep(0.5)
+                # Lockstep replay: this is what advances simulated time (and delivers the ticks)
+                clock.sleep(0.5)
 
             except Exception as e:
                 # Catch-all for loop-level exceptions to avoid process exit
                 print(f"❌ Unexpected error in main loop: {e}")
                 traceback.print_exc()
-                time.sleep(5)
+                clock.sleep(5)
 
     except KeyboardInterrupt:
         print("\n🛑 Shutting down.")
+    finally:
         data_feed.stop_event.set()
-        execution_engine.running = False # Stop worker
+        execution_engine.stop() # Stop workers
+        if order_tracker is not None:
+            order_tracker.stop()
+        if keepalive is not None:
+            keepalive.set()
+        if evaluator is not None:
+            evaluator.close()
+        if data_feed.recorder is not None:
+            data_feed.recorder.close()
+        if tick_store is not None:
+            tick_store.close()
+        if isinstance(clock, SimulatedClock):
+            clock.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,6 +1,12 @@
+import os
 import pandas as pd
 from backtesting import Backtest, Strategy
 
+from backtest.cache import ContentCache, digest, frame_key, code_key
+
+# Set BACKTEST_CACHE=0 to always recompute the indicators
+_CACHE = ContentCache() if os.getenv("BACKTEST_CACHE", "1") != "0" else None
+
 
 def rsi_pd(series: pd.Series, n: int) -> pd.Series:
     """Calculates Relative Strength Index (RSI) using Wilder's smoothing."""
@@ -35,18 +41,12 @@ class RsiMeanReversion(Strategy):
     atr_period = 22
     atr_multiplier = 3.0
 
-    def init(self):
-
-        
-        # Make a copy of the original 1-minute data DataFrame
-        price_df_1m = self.data.df.copy()
-
+    def compute_indicators(self, price_df_1m):
+        """3m Dual RSI and Chandelier Exit, forward-filled onto the 1m index."""
         # Resample 1-minute data to 3-minute data.
         # We define how to aggregate the OHLC columns.
         ohlc_dict = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}
         df_3m = price_df_1m.resample('3T').agg(ohlc_dict).dropna()
-        
-
 
         # 1. Custom Dual RSI
         rsi9 = rsi_pd(df_3m['Close'], self.short_rsi_period)
@@ -63,7 +63,19 @@ class RsiMeanReversion(Strategy):
         indicators_5m['dual_rsi'] = dual_rsi_5m
         indicators_5m['chandelier_exit'] = chandelier_exit_5m
         
-        aligned_indicators = indicators_5m.reindex(price_df_1m.index, method='ffill')
+        return indicators_5m.reindex(price_df_1m.index, method='ffill')
+
+    def init(self):
+        # Make a copy of the original 1-minute data DataFrame
+        price_df_1m = self.data.df.copy()
+
+        if _CACHE is None:
+            aligned_indicators = self.compute_indicators(price_df_1m)
+        else:
+            # Same bars + same periods + same code -> reuse the arrays from an earlier run
+            params = [self.short_rsi_period, self.long_rsi_period, self.atr_period, self.atr_multiplier]
+            key = digest("RsiMeanReversion", frame_key(price_df_1m), params, code_key(RsiMeanReversion))
+            aligned_indicators = _CACHE.get_or_compute(key, lambda: self.compute_indicators(price_df_1m))
         
         self.dual_rsi = self.I(lambda: aligned_indicators['dual_rsi'])
         self.chandelier_exit = self.I(lambda: aligned_indicators['chandelier_exit'])
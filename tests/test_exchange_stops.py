@@ -0,0 +1,29 @@
+import pytest
+
+# Imports the Upstox driver (selenium, pyotp, ...): skipped where those are not installed
+exchange_stops = pytest.importorskip("core.exchange_stops")
+round_trigger = exchange_stops.round_trigger
+
+
+@pytest.mark.parametrize("stop, trigger", [
+    (99.99, 99.95),
+    (100.049, 100.0),
+    (100.05, 100.05),     # on the grid already, despite float division
+    (0.3, 0.3),
+    (1234.56, 1234.55),
+])
+def test_rounds_down_to_the_default_tick(stop, trigger):
+    assert round_trigger(stop) == trigger
+
+
+def test_custom_tick_size():
+    assert round_trigger(99.999, tick_size=0.01) == 99.99
+    assert round_trigger(101.07, tick_size=0.1) == 101.0
+
+
+def test_trigger_fires_on_the_same_prints_as_the_stop():
+    stop = 250.37
+    trigger = round_trigger(stop)
+    for paise in range(24900, 25200, 5):
+        ltp = paise / 100
+        assert (ltp <= trigger) == (ltp <= stop)
@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+
+import pytest
+
+from core.history_downloader import HistoryDownloader, month_chunks
+
+
+class FakeResponse:
+    status_code = 200
+    text = ""
+
+    def __init__(self, candles):
+        self.candles = candles
+
+    def json(self):
+        return {"status": "success", "data": {"candles": self.candles}}
+
+
+class FakeSession:
+    """Answers every historical-candle call with one candle per day of the requested range."""
+
+    def __init__(self, empty=False):
+        self.headers = {}
+        self.urls = []
+        self.empty = empty
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        to_date, from_date = (date.fromisoformat(part) for part in url.rstrip("/").split("/")[-2:])
+        candles = [] if self.empty else [
+            [f"{from_date + timedelta(days=d)}T09:15:00+05:30", 10.0, 11.0, 9.0, 10.5, 100, 0]
+            for d in range((to_date - from_date).days + 1)
+        ]
+        return FakeResponse(candles)
+
+
+def make_downloader(tmp_path, **kwargs):
+    return HistoryDownloader("token", root=str(tmp_path), workers=2, session=FakeSession(**kwargs))
+
+
+def test_month_chunks_clip_to_range():
+    assert month_chunks(date(2024, 1, 15), date(2024, 3, 10)) == [
+        ("2024-01", date(2024, 1, 15), date(2024, 1, 31)),
+        ("2024-02", date(2024, 2, 1), date(2024, 2, 29)),
+        ("2024-03", date(2024, 3, 1), date(2024, 3, 10)),
+    ]
+
+
+def test_month_chunks_year_rollover_and_single_day():
+    assert [m for m, _, _ in month_chunks(date(2023, 11, 30), date(2024, 2, 1))] == \
+        ["2023-11", "2023-12", "2024-01", "2024-02"]
+    assert month_chunks(date(2024, 5, 7), date(2024, 5, 7)) == [("2024-05", date(2024, 5, 7), date(2024, 5, 7))]
+
+
+@pytest.mark.parametrize("from_date, to_date, complete", [
+    (date(2024, 2, 1), date(2024, 2, 29), True),
+    (date(2024, 1, 15), date(2024, 1, 31), False),    # clipped start
+    (date(2024, 3, 1), date(2024, 3, 10), False),     # clipped end
+])
+def test_only_whole_finished_months_are_complete(tmp_path, from_date, to_date, complete):
+    downloader = make_downloader(tmp_path)
+    month = from_date.strftime("%Y-%m")
+    assert downloader._download("NSE_EQ:A", "NSE_EQ|X", month, from_date, to_date) > 0
+    assert downloader.is_complete("NSE_EQ:A", month) is complete
+
+
+def test_current_month_is_never_complete(tmp_path):
+    downloader = make_downloader(tmp_path)
+    _, from_date, to_date = month_chunks(date.today().replace(day=1), date.today())[0]
+    downloader._download("NSE_EQ:A", "NSE_EQ|X", from_date.strftime("%Y-%m"), from_date, to_date)
+    assert not downloader.is_complete("NSE_EQ:A", from_date.strftime("%Y-%m"))
+
+
+def test_empty_months_recorded_only_when_whole_and_over(tmp_path):
+    downloader = make_downloader(tmp_path, empty=True)
+    downloader._download("NSE_EQ:A", "NSE_EQ|X", "2024-02", date(2024, 2, 1), date(2024, 2, 29))
+    downloader._download("NSE_EQ:A", "NSE_EQ|X", "2024-03", date(2024, 3, 1), date(2024, 3, 10))
+    assert downloader.manifest["symbols"]["NSE_EQ:A"]["empty_months"] == ["2024-02"]
+
+
+def test_run_fetches_whole_months_and_skips_them_next_time(tmp_path):
+    downloader = make_downloader(tmp_path)
+    stats = downloader.run({"NSE_EQ:A": "NSE_EQ|X"}, date(2024, 1, 15), date(2024, 2, 10))
+    assert stats["fetched"] == 2
+    # The clipped months were widened to the whole calendar month (URLs end .../to/from)
+    assert sorted(url.split("/")[-2:] for url in downloader.session.urls) == [["2024-01-31", "2024-01-01"],
+                                                                           ["2024-02-29", "2024-02-01"]]
+
+    again = make_downloader(tmp_path)
+    stats = again.run({"NSE_EQ:A": "NSE_EQ|X"}, date(2024, 1, 1), date(2024, 2, 29))
+    assert stats["skipped"] == 2 and stats["fetched"] == 0
+    assert again.session.urls == []
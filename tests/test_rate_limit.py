@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from core.rate_limit import TokenBucket, RateLimiter
+
+
+def test_bucket_grants_burst_then_refuses():
+    bucket = TokenBucket(rate=1, capacity=3)
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert bucket.granted == 3
+
+
+def test_bucket_refills_at_rate_up_to_capacity():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.try_acquire(2)
+    bucket.updated -= 0.1          # 0.1s later: one token back
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    bucket.updated -= 60           # a long idle spell never overfills
+    bucket._refill(time.monotonic())
+    assert bucket.tokens == 2
+
+
+def test_acquire_waits_for_the_next_token():
+    bucket = TokenBucket(rate=20, capacity=1)
+    assert bucket.acquire()
+    started = time.monotonic()
+    assert bucket.acquire()
+    assert time.monotonic() - started >= 0.04
+    assert bucket.waited > 0
+
+
+def test_acquire_timeout():
+    bucket = TokenBucket(rate=0.1, capacity=1)
+    assert bucket.acquire()
+    assert bucket.acquire(timeout=0.05) is False
+
+
+def test_bucket_rejects_more_than_capacity():
+    bucket = TokenBucket(rate=100, capacity=3)
+    with pytest.raises(ValueError):
+        bucket.acquire(4)
+    with pytest.raises(ValueError):
+        bucket.try_acquire(4)
+    assert bucket.tokens == 3
+
+
+def test_limiter_needs_every_bucket():
+    limiter = RateLimiter([(5, 1.0), (1, 60.0)])
+    assert limiter.capacity == 1
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    # The per-second bucket's token was refunded when the per-minute one refused
+    assert limiter.buckets[0].tokens == pytest.approx(4, abs=0.01)
+    assert limiter.buckets[0].granted == 1
+
+
+def test_limiter_release_returns_tokens():
+    limiter = RateLimiter([(2, 1.0), (10, 60.0)])
+    assert limiter.acquire(2)
+    limiter.release(1)
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+
+
+def test_limiter_rejects_more_than_smallest_bucket():
+    limiter = RateLimiter([(25, 1.0), (2, 60.0)])
+    with pytest.raises(ValueError):
+        limiter.acquire(3)
+    with pytest.raises(ValueError):
+        limiter.try_acquire(3)
+    # Nothing granted by the bucket that could hold 3 either
+    assert limiter.buckets[0].tokens == pytest.approx(25, abs=0.01)
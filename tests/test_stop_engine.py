@@ -0,0 +1,56 @@
+from core.stop_engine import StopEngine
+
+
+def make_engine(symbols=("A", "B", "C")):
+    fired = []
+    engine = StopEngine(symbols, lambda *hit: fired.append(hit))
+    return engine, fired
+
+
+def test_only_armed_slots_at_or_through_their_stop_fire():
+    engine, fired = make_engine()
+    engine.set_stop("A", 100.0, 10)
+    engine.set_stop("B", 50.0, 5)
+    hits = engine.on_ticks({"A": 100.0, "B": 50.5, "C": 1.0})
+    assert hits == [("A", 100.0, 100.0, 10)]
+    assert fired == hits
+
+
+def test_hit_disarms_the_slot():
+    engine, fired = make_engine()
+    engine.set_stop("A", 100.0, 10)
+    engine.on_ticks({"A": 99.0})
+    assert engine.on_ticks({"A": 98.0}) == []
+    assert len(fired) == 1
+
+
+def test_stop_checked_against_last_known_price():
+    engine, _ = make_engine()
+    engine.on_ticks({"A": 90.0})
+    # Arming below an already-breached price fires on the next message, whichever symbol ticks
+    engine.set_stop("A", 95.0, 1)
+    assert engine.on_ticks({"B": 10.0}) == [("A", 90.0, 95.0, 1)]
+
+
+def test_no_price_yet_never_fires():
+    engine, _ = make_engine()
+    engine.set_stop("A", 100.0, 10)
+    assert engine.on_ticks({"B": 10.0}) == []
+
+
+def test_set_stop_without_qty_and_clear_disarm():
+    engine, _ = make_engine()
+    engine.set_stop("A", 100.0, 0)
+    engine.set_stop("B", 100.0, 10)
+    engine.clear("B")
+    assert engine.on_ticks({"A": 1.0, "B": 1.0}) == []
+
+
+def test_unknown_symbols_and_failing_callback():
+    def on_stop(*hit):
+        raise RuntimeError("broker down")
+
+    engine = StopEngine(["A"], on_stop)
+    engine.set_stop("A", 100.0, 1)
+    # The dispatch error is reported, not raised into the feed thread
+    assert engine.on_ticks({"A": 99.0, "ZZZ": 1.0}) == [("A", 99.0, 100.0, 1)]
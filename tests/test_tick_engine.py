@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from backtest.tick_engine import ticks_to_bars, write_ticks, read_ticks
+
+
+def stamps(*times):
+    return np.array([np.datetime64(f"2025-01-02T{t}", "ns") for t in times]).view(np.int64)
+
+
+def test_ticks_to_bars_ohlc_per_minute():
+    ts = stamps("09:15:00", "09:15:20", "09:15:40", "09:15:59.999", "09:16:00", "09:16:30")
+    ltp = np.array([100.0, 102.0, 99.0, 101.0, 101.5, 100.5])
+    bars, starts = ticks_to_bars(ts, ltp)
+    assert starts.tolist() == [0, 4]
+    assert bars.index.tolist() == [pd.Timestamp("2025-01-02 09:15"), pd.Timestamp("2025-01-02 09:16")]
+    assert bars.loc["2025-01-02 09:15"].tolist() == [100.0, 102.0, 99.0, 101.0]
+    assert bars.loc["2025-01-02 09:16"].tolist() == [101.5, 101.5, 100.5, 100.5]
+
+
+def test_minutes_without_ticks_have_no_bar():
+    ts = stamps("09:15:10", "09:18:10", "09:18:20")
+    bars, starts = ticks_to_bars(ts, np.array([10.0, 11.0, 12.0]))
+    assert [t.strftime("%H:%M") for t in bars.index] == ["09:15", "09:18"]
+    assert starts.tolist() == [0, 1]
+
+
+def test_single_tick():
+    bars, starts = ticks_to_bars(stamps("10:00:05"), np.array([42.0]))
+    assert bars.iloc[0].tolist() == [42.0] * 4
+    assert starts.tolist() == [0]
+
+
+def test_tick_file_roundtrip(tmp_path):
+    path = str(tmp_path / "A.ticks")
+    ts = stamps("09:15:00", "09:15:01")
+    write_ticks(path, ts, [100.05, 100.1])
+    write_ticks(path, stamps("09:15:02"), [99.95], append=True)
+    out_ts, out_ltp = read_ticks(path)
+    assert out_ts.tolist() == ts.tolist() + stamps("09:15:02").tolist()
+    assert out_ltp.tolist() == [100.05, 100.1, 99.95]
@@ -0,0 +1,62 @@
+import numpy as np
+
+from core.tick_store import TickStore, encode_chunk, decode_chunk, wall_ns
+
+
+def roundtrip(ts, paise):
+    entry, ts_blob, price_blob = encode_chunk(ts, paise)
+    return decode_chunk(entry[0], ts_blob + price_blob)
+
+
+def test_chunk_roundtrip():
+    rng = np.random.default_rng(7)
+    ts = wall_ns("2025-01-02 09:15") + np.cumsum(rng.integers(0, 10**9, 5000))
+    paise = 250000 + np.cumsum(rng.integers(-20, 21, 5000))
+    out_ts, out_paise = roundtrip(ts, paise)
+    np.testing.assert_array_equal(out_ts, ts)
+    np.testing.assert_array_equal(out_paise, paise)
+
+
+def test_single_tick_chunk():
+    out_ts, out_paise = roundtrip(np.array([123], dtype=np.int64), np.array([4567], dtype=np.int64))
+    assert out_ts.tolist() == [123]
+    assert out_paise.tolist() == [4567]
+
+
+def test_write_splits_days_and_query_filters_range(tmp_path):
+    store = TickStore(str(tmp_path), chunk_ticks=2)
+    ts = np.array(["2025-01-02T23:59:58", "2025-01-02T23:59:59", "2025-01-03T00:00:00",
+                   "2025-01-03T00:00:01", "2025-01-03T00:00:02"], dtype="datetime64[ns]")
+    # Unsorted input is fine
+    store.write("NSE_EQ:A", ts[::-1], [10.0, 10.05, 10.1, 10.15, 10.2][::-1])
+    assert store.days("NSE_EQ:A") == ["2025-01-02", "2025-01-03"]
+    assert len(store.index("NSE_EQ:A", "2025-01-02")) == 1
+    assert len(store.index("NSE_EQ:A", "2025-01-03")) == 2
+
+    all_ts, all_ltp = store.query("NSE_EQ:A")
+    np.testing.assert_array_equal(all_ts, ts.view(np.int64))
+    assert all_ltp.tolist() == [10.0, 10.05, 10.1, 10.15, 10.2]
+
+    part_ts, part_ltp = store.query("NSE_EQ:A", "2025-01-02 23:59:59", "2025-01-03 00:00:02")
+    assert part_ltp.tolist() == [10.05, 10.1, 10.15]
+
+
+def test_live_append_flushes_on_day_change_and_close(tmp_path):
+    store = TickStore(str(tmp_path), chunk_ticks=100, flush_secs=3600)
+    store.append("NSE_EQ:A", wall_ns("2025-01-02 15:29:59"), 10.0)
+    store.append("NSE_EQ:A", wall_ns("2025-01-03 09:15:00"), 11.0)
+    assert store.days("NSE_EQ:A") == ["2025-01-02"]
+    store.close()
+    assert store.query("NSE_EQ:A")[1].tolist() == [10.0, 11.0]
+
+
+def test_aged_buffers_flush_for_symbols_that_stopped_ticking(tmp_path):
+    clock = iter(["2025-01-02 09:15:00", "2025-01-02 09:15:01"])
+    store = TickStore(str(tmp_path), flush_secs=60, now=lambda: next(clock))
+    store.on_ticks({"NSE_EQ:A": 10.0, "NSE_EQ:B": 20.0})
+    ticks, paise, opened_at = store.buffers["NSE_EQ:B"]
+    store.buffers["NSE_EQ:B"] = (ticks, paise, opened_at - 120)   # B went quiet two minutes ago
+    store.on_ticks({"NSE_EQ:A": 10.5})
+    assert "NSE_EQ:B" not in store.buffers
+    assert store.query("NSE_EQ:B")[1].tolist() == [20.0]
+    assert len(store.buffers["NSE_EQ:A"][0]) == 2
@@ -1,12 +1,18 @@
 import os
+import threading
 import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import datetime
 import time
 
+from core.clock import SYSTEM_CLOCK
+
 class TradeRecorder:
-    def __init__(self, filename="trade_log.csv", initial_capital=100000, view_mode=False):
+    def __init__(self, filename="trade_log.csv", initial_capital=100000, view_mode=False, clock=None):
         self.filename = filename
+        self.clock = clock or SYSTEM_CLOCK  # trade timestamps follow simulated time in replays
+        # Order workers log concurrently; the running balance is read-modify-append
+        self.lock = threading.Lock()
         self.initial_capital = initial_capital
         self.view_mode = view_mode
         self.columns = ["Timestamp", "Action", "Symbol", "Price", "Quantity", "PnL", "Balance", "Reason"]
@@ -26,6 +32,10 @@ class TradeRecorder:
             self.ax.legend()
 
     def log_trade(self, action, symbol, price, qty, pnl=0.0, reason=""):
+        with self.lock:
+            self._log_trade(action, symbol, price, qty, pnl, reason)
+
+    def _log_trade(self, action, symbol, price, qty, pnl, reason):
         # Fast Append for Strategy
         last_balance = self.initial_capital
         try:
@@ -36,7 +46,7 @@ class TradeRecorder:
 
         new_balance = last_balance + pnl 
         record = {
-            "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "Timestamp": self.clock.now().strftime("%Y-%m-%d %H:%M:%S"),
             "Action": action, "Symbol": symbol, "Price": round(price, 2),
             "Quantity": qty, "PnL": round(pnl, 2), "Balance": round(new_balance, 2), "Reason": reason
         }